@@ -2,6 +2,8 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to the live agenda stream are served directly by
+``salon.streams``; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from salon import streams  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if streams.is_stream(scope):
+        await streams.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AdmissionControlMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,14 +83,92 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Per-process connection pool (see core.backends.postgresql).
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_IDLE': 300,
+            'MAX_LIFETIME': 3600,
+            'CHECK_AFTER': 30,
+        },
     }
 }
 
+# Read replicas, as comma-separated host[:port] entries sharing the
+# primary's credentials (see core.db_router). Tests mirror them to default.
+DATABASE_REPLICAS = []
+
+for index, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')),
+    start=1,
+):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+DATABASE_REPLICA_LAG_CHECK_SECONDS = 5
+DATABASE_REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+SALON_AGENDA_CACHE_TIMEOUT = int(
+    os.environ.get('SALON_AGENDA_CACHE_TIMEOUT', 300)
+)
+
+# Delta sync re-sends rows saved this many seconds before the client's
+# cursor, covering clock skew and transactions committed out of order.
+SALON_SYNC_OVERLAP_SECONDS = 5
+
+# Live agenda push: in-process fan-out, or Redis pub/sub across nodes.
+SALON_PUSH_BROKER = (
+    'salon.push.RedisBroker' if REDIS_URL else 'salon.push.InProcessBroker'
+)
+
+# Appointment reminders, by channel (see salon.reminders). No SMS provider
+# is wired in yet; SALON_SMS_BACKEND names one (the console backend in
+# docker-compose.yml). Without it no SMS reminders are recorded, so they
+# are still sent once a provider is configured.
+SALON_REMINDER_BACKENDS = {
+    'email': 'salon.reminders.EmailBackend',
+}
+if os.environ.get('SALON_SMS_BACKEND'):
+    SALON_REMINDER_BACKENDS['sms'] = os.environ['SALON_SMS_BACKEND']
+SALON_REMINDER_CONCURRENCY = 8
+SALON_REMINDER_MAX_ATTEMPTS = 3
+
+# Largest client file the import endpoint accepts (see salon.imports)
+SALON_IMPORT_MAX_BYTES = 20 * 2 ** 20
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -108,6 +188,10 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# PBKDF2 hashes run on a bounded pool so sign-up and login bursts can't
+# take every core (see core.passwords).
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 4))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
@@ -137,4 +221,94 @@ AUTH_USER_MODEL = 'core.User'
 # DRF settings
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ReadThrottle',
+        'core.throttling.WriteThrottle',
+    ],
+    # Token buckets: a client may burst up to N requests, refilled evenly
+    # over the period (see core.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'read': '1200/min',
+        'write': '300/min',
+        'login': '20/min',
+    },
+}
+
+# Admission control (see core.admission). Requests are classed by the first
+# matching path pattern, or as normal; classes with a shed_at load are
+# answered 503 while the process is at least that loaded.
+ADMISSION_CLASSES = {
+    'high': {'shed_at': None, 'db_target_ms': 50},
+    'normal': {'shed_at': 1.0, 'db_target_ms': 100},
+    'low': {'shed_at': 0.6, 'db_target_ms': 1000},
 }
+ADMISSION_RULES = [
+    (r'^/(healthz|readyz)$', 'high'),
+    (r'^/api/salon/appointments/agenda/stats/', 'low'),
+    (r'^/api/salon/(appointments|async/agenda)/', 'high'),
+    (r'^/api/salon/(analytics|payroll)/', 'low'),
+    (r'^/api/salon/branches/\d+/demand/', 'low'),
+    (r'^/api/(schema|docs)/', 'low'),
+    (r'^/api/jobs/\d+/result/', 'low'),
+]
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 32))
+ADMISSION_WINDOW_SECONDS = 10
+ADMISSION_RETRY_AFTER_SECONDS = 5
+
+# Seconds a request to a view with core.budgets.TimeBudgetMixin may spend,
+# enforced on PostgreSQL with statement_timeout. Views may set their own.
+API_TIME_BUDGET_SECONDS = 10
+
+# Coalescing of identical concurrent reads (see core.single_flight), across
+# processes when there is a shared cache.
+SINGLE_FLIGHT_CACHE_ALIAS = 'default' if REDIS_URL else None
+SINGLE_FLIGHT_WAIT_SECONDS = 10
+
+THROTTLE_STORE = (
+    'core.throttling.RedisBucketStore' if REDIS_URL
+    else 'core.throttling.LocalBucketStore'
+)
+
+# Batch API limits (see core.batch)
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_BYTES = 1024 * 1024
+BATCH_MAX_PARALLEL = 4
+
+# Background jobs (see core.jobs)
+JOBS_RETRY_BASE_SECONDS = 10
+JOBS_RETRY_MAX_SECONDS = 3600
+JOBS_LEASE_SECONDS = 1800
+JOBS_REQUEUE_INTERVAL_SECONDS = 60
+
+# Processes a payroll run spreads branches over (see salon.payroll)
+PAYROLL_WORKERS = int(
+    os.environ.get('PAYROLL_WORKERS', min(4, os.cpu_count() or 1))
+)
+
+# Appointments a technician handles per hour (see salon.demand)
+SALON_BOOKINGS_PER_TECHNICIAN_HOUR = 1
+
+# Slot an appointment takes, and the hours of branches that set none
+# (see salon.assignment)
+SALON_APPOINTMENT_MINUTES = 60
+SALON_OPENING_HOURS = ('09:00', '20:00')
+
+# Online schema changes (see core.online_schema). lint_migrations rejects
+# locking operations on these models in migrations after the baseline.
+SCHEMA_LOCK_TIMEOUT = '5s'
+BACKFILL_BATCH_SIZE = 5000
+BACKFILL_PAUSE_SECONDS = 0.1
+MIGRATION_LINT_LARGE_MODELS = [
+    'core.Appointment',
+    'core.AppointmentArchive',
+    'core.Client',
+    'core.ClientStats',
+    'core.Reminder',
+    'core.Tombstone',
+]
+MIGRATION_LINT_BASELINE = {
+    'core': '0002_branch_client_discount_payment_promo_service_skill_and_more',
+}
+
+# Where export_analytics writes its snapshots (see salon.analytics)
+ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR', str(BASE_DIR / 'analytics'))
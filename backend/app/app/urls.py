@@ -21,6 +21,8 @@ from drf_spectacular.views import (
 from django.contrib import admin
 from django.urls import path, include
 
+from core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -31,4 +33,17 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/salon/', include('salon.urls')),
+    path('api/batch/', core_views.BatchView.as_view(), name='batch'),
+    path(
+        'api/jobs/<int:pk>/',
+        core_views.JobView.as_view(),
+        name='job-detail',
+    ),
+    path(
+        'api/jobs/<int:pk>/result/',
+        core_views.JobResultView.as_view(),
+        name='job-result',
+    ),
+    path('healthz', core_views.healthz, name='healthz'),
+    path('readyz', core_views.readyz, name='readyz'),
 ]
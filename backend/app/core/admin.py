@@ -1,11 +1,23 @@
 """
 Django admin customization.
 """
+import datetime
+import json
+from urllib.parse import urlsplit
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.functions import Lower
+from django.http import HttpResponseRedirect
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from core import models
+from core.partitions import add_months
 
 
 class UserAdmin(BaseUserAdmin):
@@ -44,13 +56,167 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator counting large result sets from the planner's estimate.
+
+    On PostgreSQL, a result the planner expects to hold more than
+    EXACT_COUNT_LIMIT rows isn't counted; the page links use the estimate
+    instead, which costs no more than planning the query.
+    """
+    EXACT_COUNT_LIMIT = 10000
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        try:
+            sql, params = queryset.order_by().query.get_compiler(
+                queryset.db,
+            ).as_sql()
+        except EmptyResultSet:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        """Return the number of objects, estimated when there are many."""
+        estimate = self._estimate()
+        if estimate is None or estimate <= self.EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin for tables too large to count or scan on every page."""
+    paginator = ApproximateCountPaginator
+    # Skip the second, unfiltered count next to filtered results.
+    show_full_result_count = False
+
+
+class NameSearchAdmin(admin.ModelAdmin):
+    """Admin for small catalogs, searchable for autocomplete widgets."""
+    search_fields = ['name']
+
+
+class AppointmentChangeList(ChangeList):
+    """Change list bounding date drill-downs to a date range."""
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        year = self.params.get('date__year')
+        month = self.params.get('date__month')
+        try:
+            if year and month:
+                start = datetime.date(int(year), int(month), 1)
+                end = add_months(start, 1)
+            elif year:
+                start = datetime.date(int(year), 1, 1)
+                end = datetime.date(int(year) + 1, 1, 1)
+            else:
+                return queryset
+        except ValueError:
+            return queryset
+        # A plain range lets Postgres skip other months' partitions.
+        return queryset.filter(date__gte=start, date__lt=end)
+
+
+class AppointmentAdmin(LargeTableAdmin):
+    """Define the admin pages for appointments."""
+    list_display = [
+        'date', 'time', 'branch', 'client', 'service', 'technician',
+        'final_income',
+    ]
+    list_select_related = [
+        'branch', 'client', 'service', 'technician__user',
+    ]
+    list_filter = ['branch', 'service', 'payment']
+    date_hierarchy = 'date'
+    ordering = ['-date', '-id']
+    raw_id_fields = ['client', 'technician']
+    autocomplete_fields = ['branch', 'service', 'payment', 'discount']
+
+    def get_changelist(self, request, **kwargs):
+        return AppointmentChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        """
+        Open on the current month rather than on every appointment.
+
+        Only a plain visit from another page is redirected, so "All dates"
+        and searches within the list still work.
+        """
+        referer = urlsplit(request.META.get('HTTP_REFERER', '')).path
+        if not request.GET and referer != request.path:
+            today = datetime.date.today()
+            params = request.GET.copy()
+            params['date__year'] = today.year
+            params['date__month'] = today.month
+            return HttpResponseRedirect(f'?{params.urlencode()}')
+        return super().changelist_view(request, extra_context)
+
+
+class ClientAdmin(LargeTableAdmin):
+    """Define the admin pages for clients."""
+    list_display = ['name', 'last_name', 'phone', 'email', 'birthday']
+    ordering = ['-id']
+    search_fields = ['email', 'phone']
+    search_help_text = _('Search by exact email or phone.')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Look clients up by email or phone, through their indexes."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if '@' in term:
+            return queryset.annotate(
+                email_lower=Lower('email'),
+            ).filter(email_lower=term.lower()), False
+        digits = ''.join(char for char in term if char.isdigit())
+        if not digits:
+            return queryset.none(), False
+        return queryset.filter(phone=digits), False
+
+
+class TechnicianAdmin(LargeTableAdmin):
+    """Define the admin pages for technicians."""
+    list_display = ['name', 'email']
+    list_select_related = ['user']
+    ordering = ['user__name']
+    search_fields = ['user__name', 'user__email']
+    raw_id_fields = ['user']
+    autocomplete_fields = ['skills', 'branches']
+
+    @admin.display(ordering='user__name')
+    def name(self, technician):
+        return technician.user.name
+
+    @admin.display(ordering='user__email')
+    def email(self, technician):
+        return technician.user.email
+
+
+class PaymentAdmin(admin.ModelAdmin):
+    search_fields = ['description', 'format_code']
+
+
+class DiscountAdmin(admin.ModelAdmin):
+    search_fields = ['description']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Branch)
-admin.site.register(models.Technician)
-admin.site.register(models.Service)
-admin.site.register(models.Skill)
-admin.site.register(models.Payment)
-admin.site.register(models.Discount)
+admin.site.register(models.Branch, NameSearchAdmin)
+admin.site.register(models.Technician, TechnicianAdmin)
+admin.site.register(models.Service, NameSearchAdmin)
+admin.site.register(models.Skill, NameSearchAdmin)
+admin.site.register(models.Payment, PaymentAdmin)
+admin.site.register(models.Discount, DiscountAdmin)
 admin.site.register(models.Promo)
-admin.site.register(models.Client)
-admin.site.register(models.Appointment)
+admin.site.register(models.Client, ClientAdmin)
+admin.site.register(models.Appointment, AppointmentAdmin)
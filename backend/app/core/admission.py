@@ -0,0 +1,151 @@
+"""
+Admission control: turning away low-priority requests under load.
+
+When the database slows down, requests pile up in every worker until they
+all time out together. ``AdmissionControlMiddleware`` (see core.middleware)
+puts each request in a class by its path (ADMISSION_RULES), then measures
+this process's load as the larger of:
+
+- the requests in flight, as a fraction of ADMISSION_MAX_IN_FLIGHT;
+- for each class, its recent average query time as a multiple of the
+  class's ``db_target_ms``. Averages older than ADMISSION_WINDOW_SECONDS
+  are ignored, so a class that was shed doesn't stay shed.
+
+A class with a ``shed_at`` load is answered with 503 and Retry-After while
+the load is at least that, so reports, exports and the schema docs make
+way for booking writes and agenda reads, which are never shed. The counts
+of admitted and shed requests per class are reported by ``/healthz``.
+"""
+import re
+import threading
+import time
+
+from django.conf import settings
+
+
+CLASSES = {
+    'high': {'shed_at': None, 'db_target_ms': 50},
+    'normal': {'shed_at': 1.0, 'db_target_ms': 100},
+    'low': {'shed_at': 0.6, 'db_target_ms': 1000},
+}
+DEFAULT_CLASS = 'normal'
+MAX_IN_FLIGHT = 32
+WINDOW_SECONDS = 10
+RETRY_AFTER_SECONDS = 5
+BUSY_DETAIL = 'The server is busy, try again later.'
+
+# Weight of the latest query in a class's average query time.
+SMOOTHING = 0.2
+
+
+class _Class:
+    """Counters of one class of requests."""
+
+    def __init__(self, shed_at=None, db_target_ms=100):
+        self.shed_at = shed_at
+        self.db_target = db_target_ms / 1000
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.latency = 0.0
+        self.sampled_at = None
+
+
+class AdmissionController:
+    """Track load and decide which requests to admit."""
+
+    def __init__(self, classes=None, rules=None, max_in_flight=None,
+                 window=None, clock=time.monotonic):
+        if classes is None:
+            classes = getattr(settings, 'ADMISSION_CLASSES', CLASSES)
+        if rules is None:
+            rules = getattr(settings, 'ADMISSION_RULES', [])
+        if max_in_flight is None:
+            max_in_flight = getattr(settings, 'ADMISSION_MAX_IN_FLIGHT',
+                                    MAX_IN_FLIGHT)
+        if window is None:
+            window = getattr(settings, 'ADMISSION_WINDOW_SECONDS',
+                             WINDOW_SECONDS)
+        self.classes = {
+            name: _Class(**options) for name, options in classes.items()
+        }
+        self.rules = [(re.compile(pattern), name) for pattern, name in rules]
+        self.max_in_flight = max_in_flight
+        self.window = window
+        self.clock = clock
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def classify(self, path):
+        """Return the class of requests to path."""
+        for pattern, name in self.rules:
+            if pattern.match(path):
+                return name
+        return DEFAULT_CLASS
+
+    def load(self):
+        """Return the current load; 1 is as much as the process takes."""
+        now = self.clock()
+        load = self.in_flight / self.max_in_flight
+        for cls in self.classes.values():
+            if cls.sampled_at is not None and \
+                    now - cls.sampled_at < self.window:
+                load = max(load, cls.latency / cls.db_target)
+        return load
+
+    def admit(self, name):
+        """Count a request of class name in; return False to shed it."""
+        cls = self.classes[name]
+        with self._lock:
+            if cls.shed_at is not None and self.load() >= cls.shed_at:
+                cls.shed += 1
+                return False
+            cls.admitted += 1
+            cls.in_flight += 1
+            self.in_flight += 1
+        return True
+
+    def release(self, name):
+        """Count an admitted request of class name out."""
+        with self._lock:
+            self.classes[name].in_flight -= 1
+            self.in_flight -= 1
+
+    def record_query(self, name, seconds):
+        """Add the time a query of a class name request took."""
+        cls = self.classes[name]
+        now = self.clock()
+        with self._lock:
+            if cls.sampled_at is None or now - cls.sampled_at >= self.window:
+                cls.latency = seconds
+            else:
+                cls.latency += SMOOTHING * (seconds - cls.latency)
+            cls.sampled_at = now
+
+    def stats(self):
+        """Return the load and the counters of each class."""
+        with self._lock:
+            return {
+                'load': round(self.load(), 3),
+                'in_flight': self.in_flight,
+                'classes': {
+                    name: {
+                        'in_flight': cls.in_flight,
+                        'admitted': cls.admitted,
+                        'shed': cls.shed,
+                        'db_latency_ms': round(cls.latency * 1000, 2),
+                    }
+                    for name, cls in self.classes.items()
+                },
+            }
+
+
+_controller = None
+
+
+def get_controller():
+    """Return the process's admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
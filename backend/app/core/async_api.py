@@ -0,0 +1,91 @@
+"""
+Helpers for async JSON endpoints served under ASGI.
+
+DRF views are synchronous, so the async read endpoints are plain Django
+async views. These helpers give them the same token authentication,
+throttling and error responses as the DRF API.
+"""
+import functools
+import math
+
+from asgiref.sync import sync_to_async
+
+from django.http import HttpResponse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+def _get_token_user(key):
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+async def authenticate(request):
+    """Return the user of the request's ``Authorization: Token`` header."""
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) != 2 or parts[0].lower() != 'token':
+        return None
+    return await sync_to_async(_get_token_user)(parts[1])
+
+
+def _throttle_wait(request):
+    """Return the seconds to wait if a throttle rejects request, else 0."""
+    waits = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            waits.append(throttle.wait() or 0)
+    return max(waits, default=0)
+
+
+def json_bytes_response(content, status=200):
+    """Return pre-rendered JSON bytes as a response."""
+    return HttpResponse(content, status=status,
+                        content_type='application/json')
+
+
+def json_response(data, status=200):
+    """Return data rendered exactly as the DRF JSON renderer would."""
+    return json_bytes_response(JSONRenderer().render(data), status=status)
+
+
+def async_api_view(methods=('GET',)):
+    """
+    Make an async view token-authenticated, throttled and restricted to
+    methods.
+
+    The authenticated user is set as ``request.user`` before the view
+    runs. Requests are throttled by DEFAULT_THROTTLE_CLASSES, as DRF views
+    are.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=405,
+                )
+            user = await authenticate(request)
+            if user is None:
+                return json_response(
+                    {'detail': 'Authentication credentials were not '
+                               'provided.'},
+                    status=401,
+                )
+            request.user = user
+            wait = await sync_to_async(_throttle_wait)(request)
+            if wait:
+                response = json_response(
+                    {'detail': Throttled(wait).detail}, status=429,
+                )
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
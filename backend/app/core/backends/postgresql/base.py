@@ -0,0 +1,68 @@
+"""
+PostgreSQL backend that checks connections out of a process-wide pool.
+
+Configure it with a ``POOL`` entry in the database settings::
+
+    'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 5, 'MAX_IDLE': 300,
+             'MAX_LIFETIME': 3600, 'CHECK_AFTER': 30}
+
+Closing a connection, which Django does at the end of every request,
+returns it to the pool instead. Without ``POOL`` the backend behaves like
+Django's own. Session settings changed with a plain ``SET`` outlive the
+request on a pooled connection, so use ``SET LOCAL`` inside a transaction.
+"""
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+
+from core.backends.postgresql.pool import get_pool, pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Postgres won't drop a database with open connections.
+        for key, pool in pools().items():
+            if key[1] == test_database_name:
+                pool.close()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        """Return this database's pool, or None if it isn't pooled."""
+        options = self.settings_dict.get('POOL')
+        if options is None or self.alias == NO_DB_ALIAS:
+            return None
+        key = (
+            self.alias,
+            self.settings_dict['NAME'],
+            self.settings_dict['HOST'],
+            self.settings_dict['PORT'],
+            self.settings_dict['USER'],
+        )
+        return get_pool(key, **{
+            name.lower(): value for name, value in options.items()
+        })
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.checkout(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params,
+            ),
+        )
+        # Set by the parent on connect; a reused connection keeps its own.
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.checkin(self.connection)
@@ -0,0 +1,194 @@
+"""
+A bounded pool of PostgreSQL connections shared by a process's threads.
+"""
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolExhausted(psycopg2.OperationalError):
+    """No connection became free before the checkout timeout."""
+
+
+class _Entry:
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class ConnectionPool:
+    """
+    Hand out up to max_size connections, reusing idle ones.
+
+    Idle connections are closed after max_idle seconds, and any connection
+    after max_lifetime seconds. On checkout a connection is checked for a
+    broken state, and pinged if it sat idle longer than check_after
+    seconds; bad connections are replaced with fresh ones.
+    """
+
+    def __init__(self, max_size=10, timeout=5, max_idle=300,
+                 max_lifetime=3600, check_after=30):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+    def checkout(self, connect):
+        """Return a connection, calling connect() if a new one is needed."""
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            self._prune()
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(
+                        f'No free connection after {self.timeout} seconds '
+                        f'({self.max_size} in use).'
+                    )
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                self._prune()
+            if self._idle:
+                entry = self._idle.pop()
+            else:
+                # Hold the slot while connecting outside the lock.
+                entry = None
+                self._size += 1
+
+        if entry is not None and not self._healthy(entry):
+            self._close(entry.connection)
+            entry = None
+        if entry is None:
+            try:
+                entry = _Entry(connect())
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+        with self._condition:
+            self._in_use[id(entry.connection)] = entry
+        return entry.connection
+
+    def checkin(self, connection):
+        """Return connection to the pool, or close it if it is unusable."""
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            self._close(connection)
+            return
+        reusable = self._reset(entry)
+        if not reusable:
+            self._close(connection)
+        with self._condition:
+            if reusable:
+                entry.returned_at = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+            self._condition.notify()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for entry in idle:
+            self._close(entry.connection)
+
+    def stats(self):
+        """Return the pool's current size and saturation."""
+        with self._condition:
+            idle = len(self._idle)
+            in_use = self._size - idle
+            waiting = self._waiting
+        return {
+            'max_size': self.max_size,
+            'in_use': in_use,
+            'idle': idle,
+            'waiting': waiting,
+            'saturation': round(in_use / self.max_size, 3),
+        }
+
+    def _prune(self):
+        """Close connections idle or open for too long (lock held)."""
+        now = time.monotonic()
+        keep = []
+        for entry in self._idle:
+            if now - entry.returned_at > self.max_idle or \
+                    now - entry.created_at > self.max_lifetime:
+                self._close(entry.connection)
+                self._size -= 1
+            else:
+                keep.append(entry)
+        self._idle = keep
+
+    def _healthy(self, entry):
+        connection = entry.connection
+        if connection.closed or connection.get_transaction_status() != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - entry.returned_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _reset(self, entry):
+        """Make a returned connection ready for reuse; False if it isn't."""
+        connection = entry.connection
+        if connection.closed or \
+                time.monotonic() - entry.created_at > self.max_lifetime:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, **options):
+    """Return the pool for key, creating it with options."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def pools():
+    """Return every pool, by key."""
+    with _pools_lock:
+        return dict(_pools)
@@ -0,0 +1,158 @@
+"""
+Execution of batched API sub-requests.
+
+Each sub-request is resolved against the project URLconf and dispatched to
+its view as a regular request, authenticated as the user of the batch
+request. Sub-requests of one batch share a per-batch cache (see
+``cached``), and runs of consecutive reads can execute in parallel.
+"""
+import contextvars
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from core import admission
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Forwarded from the batch request so sub-requests see the same client.
+FORWARDED_META = (
+    'SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'HTTP_HOST',
+    'HTTP_ACCEPT_LANGUAGE', 'HTTP_USER_AGENT', 'HTTP_AUTHORIZATION',
+)
+
+_request_cache = contextvars.ContextVar('batch_request_cache', default=None)
+
+
+def cached(key, compute):
+    """
+    Return compute(), memoized for the rest of the current batch.
+
+    Outside of a batch this simply calls compute().
+    """
+    store = _request_cache.get()
+    if store is None:
+        return compute()
+    try:
+        return store[key]
+    except KeyError:
+        value = store[key] = compute()
+        return value
+
+
+def _build_request(parent, item):
+    url = urlsplit(item['path'])
+    body = b''
+    if item.get('body') is not None:
+        body = json.dumps(item['body']).encode()
+    environ = {
+        key: parent.META[key]
+        for key in FORWARDED_META if key in parent.META
+    }
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': parent.scheme,
+    })
+    environ.setdefault('SERVER_NAME', 'localhost')
+    environ.setdefault('SERVER_PORT', '80')
+    request = WSGIRequest(environ)
+    # Picked up by DRF's Request, so sub-requests skip authentication.
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def _decode(response):
+    content = getattr(response, 'content', b'')
+    if 'json' in response.get('Content-Type', '') and content:
+        return json.loads(content)
+    return content.decode(response.charset or 'utf-8')
+
+
+def _execute_one(parent, item):
+    request = _build_request(parent, item)
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+    # Admitted like a request of its own, so a batch can't carry reports
+    # past the admission control shedding them.
+    controller = admission.get_controller()
+    name = controller.classify(request.path_info)
+    if not controller.admit(name):
+        return {'status': 503, 'body': {'detail': admission.BUSY_DETAIL}}
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    finally:
+        controller.release(name)
+    return {'status': response.status_code, 'body': _decode(response)}
+
+
+def _execute_in_thread(context, parent, item):
+    try:
+        return context.run(_execute_one, parent, item)
+    finally:
+        connections.close_all()
+
+
+def _segments(items):
+    """Split items into runs of consecutive reads and single writes."""
+    run = []
+    for item in items:
+        if item['method'] in SAFE_METHODS:
+            run.append(item)
+            continue
+        if run:
+            yield True, run
+            run = []
+        yield False, [item]
+    if run:
+        yield True, run
+
+
+def execute(parent, items, parallel=False):
+    """
+    Execute the sub-requests in items and return their responses in order.
+
+    parent is the DRF request of the batch. With parallel, each run of
+    consecutive reads is spread over a thread pool; writes always run alone
+    and in order, and clear the batch cache so later reads see them.
+    """
+    token = _request_cache.set({})
+    try:
+        responses = []
+        workers = getattr(settings, 'BATCH_MAX_PARALLEL', 4)
+        for reads, run in _segments(items):
+            if reads and parallel and len(run) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = [
+                        pool.submit(
+                            _execute_in_thread,
+                            contextvars.copy_context(),
+                            parent,
+                            item,
+                        )
+                        for item in run
+                    ]
+                    responses.extend(future.result() for future in futures)
+            else:
+                responses.extend(_execute_one(parent, item) for item in run)
+            if not reads:
+                _request_cache.get().clear()
+        return responses
+    finally:
+        _request_cache.reset(token)
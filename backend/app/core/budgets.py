@@ -0,0 +1,156 @@
+"""
+Time budgets for API requests.
+
+A view with ``TimeBudgetMixin`` runs within a budget of seconds, per view
+or per action. On PostgreSQL every query of the request runs with a
+``statement_timeout`` of at most the time left, so the server cancels a
+query that would overrun the budget; with any database, no query starts
+once the budget is spent. Either way the request fails with 503 and the
+connection is freed for other requests.
+
+Lowering the timeout takes a ``SET``, so it is only lowered once it
+exceeds the time left by more than a tenth of the budget. A cancelled
+query is logged with its plan, from ``EXPLAIN``, once the request is done.
+"""
+import logging
+import math
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+logger = logging.getLogger(__name__)
+
+BUDGET_SECONDS = 10
+
+# SQLSTATE of a statement cancelled by statement_timeout.
+QUERY_CANCELED = '57014'
+
+
+class TimeBudgetExceeded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The request took longer than its time budget.'
+    default_code = 'time_budget_exceeded'
+
+
+class Deadline:
+    """Execute wrapper holding a request's queries to its budget."""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires = clock() + seconds
+        self.timeouts = {}
+        self.cancelled = None
+
+    def remaining(self):
+        return self.expires - self.clock()
+
+    def exceeded(self):
+        return TimeBudgetExceeded(
+            f'The request took longer than its {self.seconds:g}s budget.'
+        )
+
+    def _limit(self, connection, cursor, remaining):
+        """Lower the connection's statement timeout to the time left."""
+        timeout = math.ceil(remaining * 1000)
+        current = self.timeouts.get(connection.alias)
+        if current is not None and current - timeout <= self.seconds * 100:
+            return
+        # On the DB-API cursor, so this wrapper doesn't see it.
+        with connection.wrap_database_errors:
+            cursor.cursor.execute('SET statement_timeout = %s', [timeout])
+        self.timeouts[connection.alias] = timeout
+
+    def __call__(self, execute, sql, params, many, context):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise self.exceeded()
+        connection = context['connection']
+        if connection.vendor == 'postgresql':
+            self._limit(connection, context['cursor'], remaining)
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if getattr(exc.__cause__, 'pgcode', None) != QUERY_CANCELED:
+                raise
+            if not many:
+                self.cancelled = (connection.alias, sql, params)
+            raise self.exceeded() from exc
+
+    def close(self):
+        """Restore the statement timeouts of the connections used."""
+        for alias in self.timeouts:
+            connection = connections[alias]
+            if connection.connection is None:
+                continue
+            try:
+                with connection.wrap_database_errors, \
+                        connection.connection.cursor() as cursor:
+                    cursor.execute('RESET statement_timeout')
+            except DatabaseError:
+                # The connection is broken and won't be reused.
+                pass
+
+
+def explain(alias, sql, params):
+    """Return the plan of a query, or None if it can't be had."""
+    connection = connections[alias]
+    if connection.in_atomic_block:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+    except DatabaseError:
+        return None
+
+
+@contextmanager
+def limit(seconds, name=''):
+    """Run the queries of the block within a budget of seconds."""
+    deadline = Deadline(seconds)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(deadline)
+                )
+            yield deadline
+    finally:
+        deadline.close()
+        if deadline.cancelled is not None:
+            alias, sql, params = deadline.cancelled
+            logger.warning(
+                'Query of %s cancelled after its %gs budget:\n%s\n%s',
+                name, seconds, sql, explain(alias, sql, params),
+            )
+
+
+class TimeBudgetMixin:
+    """
+    Run a view's queries within a time budget.
+
+    time_budgets maps actions (or methods, for plain views) to seconds;
+    others get time_budget, or API_TIME_BUDGET_SECONDS if that's None.
+    """
+
+    time_budget = None
+    time_budgets = {}
+
+    def get_time_budget(self, request):
+        name = getattr(self, 'action', None) or request.method.lower()
+        budget = self.time_budgets.get(name, self.time_budget)
+        if budget is None:
+            budget = getattr(settings, 'API_TIME_BUDGET_SECONDS',
+                             BUDGET_SECONDS)
+        return budget
+
+    def dispatch(self, request, *args, **kwargs):
+        with limit(self.get_time_budget(request),
+                   name=self.__class__.__name__):
+            return super().dispatch(request, *args, **kwargs)
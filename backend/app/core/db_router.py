@@ -0,0 +1,175 @@
+"""
+Database routing of reads to replicas.
+
+Reads go to a replica only inside a read-only scope: a safe (GET, HEAD,
+OPTIONS) request opened by ``ReplicaRoutingMiddleware``, or a report run
+under ``read_from_replica``. Everything else, including every write and
+every read inside a transaction, uses the primary.
+
+A client that wrote is pinned to the primary for
+DATABASE_REPLICA_STICKY_SECONDS so that it reads its own writes, and a
+replica lagging more than DATABASE_REPLICA_MAX_LAG seconds behind is
+skipped until it catches up.
+
+Users and tokens are always read from the primary. A client is known by
+its token, which it only has after logging in, so the pin set by the
+login can't cover the first requests made with the new token.
+"""
+import contextlib
+import contextvars
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+LAG_SQL = (
+    'SELECT CASE WHEN NOT pg_is_in_recovery() '
+    'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+# Read by authentication, before the client can be pinned.
+PRIMARY_MODELS = ('authtoken.token', 'core.user')
+
+_route = contextvars.ContextVar('db_route', default=None)
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+class Route:
+    """Routing state of one read-only scope."""
+
+    def __init__(self, replica_ok):
+        self.replica_ok = replica_ok
+        self.alias = None
+        self.wrote = False
+
+
+def replicas():
+    """Return the aliases of the configured replicas."""
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def replica_lag(alias):
+    """Return how many seconds alias is behind the primary, or None."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        lag = cursor.fetchone()[0]
+    return None if lag is None else float(lag)
+
+
+def is_healthy(alias):
+    """Return whether alias is reachable and within the allowed lag."""
+    interval = getattr(settings, 'DATABASE_REPLICA_LAG_CHECK_SECONDS', 5)
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, False))
+        if checked_at is not None and now - checked_at < interval:
+            return healthy
+        # Claim the check so concurrent requests keep the previous answer.
+        _health[alias] = (now, healthy)
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError:
+        lag = None
+    healthy = lag is not None and \
+        lag <= getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 5)
+    with _health_lock:
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def reset_health():
+    """Forget the replica health checks."""
+    with _health_lock:
+        _health.clear()
+
+
+def _sticky_key(client):
+    return f'db_router:sticky:{client}'
+
+
+def client_key(request):
+    """Return an opaque key identifying the client of request."""
+    identity = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+def pin(client):
+    """Send client's reads to the primary for the sticky window."""
+    timeout = getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10)
+    cache.set(_sticky_key(client), True, timeout)
+
+
+def is_pinned(client):
+    """Return whether client recently wrote."""
+    return bool(cache.get(_sticky_key(client)))
+
+
+@contextlib.contextmanager
+def route(replica_ok):
+    """Open a routing scope; yield its Route."""
+    state = Route(replica_ok and bool(replicas()))
+    token = _route.set(state)
+    try:
+        yield state
+    finally:
+        _route.reset(token)
+
+
+def read_from_replica():
+    """Send the reads of the block to a replica, e.g. for reports."""
+    return route(True)
+
+
+def use_primary():
+    """Send the reads of the block to the primary."""
+    return route(False)
+
+
+class ReplicaRouter:
+    """Send reads in read-only scopes to a replica, the rest to primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _route.get()
+        if state is None or not state.replica_ok or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.alias is None:
+            # Stick to one replica per scope, so reads stay consistent.
+            healthy = [alias for alias in replicas() if is_healthy(alias)]
+            state.alias = random.choice(healthy) if healthy else \
+                DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _route.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
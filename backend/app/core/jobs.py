@@ -0,0 +1,152 @@
+"""
+Background jobs stored in the database.
+
+Work is registered under a name with ``@task('name')`` in an app's
+``tasks`` module and queued with ``enqueue``. Workers (``run_worker``)
+claim queued jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of them can poll the same table without handing a job out twice.
+
+A task receives the job's payload as keyword arguments and returns a
+JSON-serializable result. A task that raises is retried with exponential
+backoff until the job runs out of attempts. A job left running by a
+worker that died is queued again once JOBS_LEASE_SECONDS have passed, or
+failed if that was its last attempt; workers check for such jobs every
+JOBS_REQUEUE_INTERVAL_SECONDS.
+"""
+import datetime
+import random
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+
+_tasks = {}
+
+
+class UnknownTask(LookupError):
+    """No task is registered under the job's kind."""
+
+
+def task(name):
+    """Register the decorated function as the task called name."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def autodiscover():
+    """Import the tasks module of every installed app."""
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    """Return the task registered as name."""
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise UnknownTask(name)
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=3, delay=0):
+    """Queue a job to run kind with payload, and return it."""
+    get_task(kind)
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        created_by=user,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    """Return the seconds to wait before retrying after attempts tries."""
+    base = getattr(settings, 'JOBS_RETRY_BASE_SECONDS', 10)
+    ceiling = getattr(settings, 'JOBS_RETRY_MAX_SECONDS', 3600)
+    delay = min(base * 2 ** (attempts - 1), ceiling)
+    # Jitter keeps jobs failing together from retrying together.
+    return delay * random.uniform(0.5, 1)
+
+
+def requeue_stale():
+    """
+    Queue again the jobs whose worker stopped reporting; return count.
+
+    Jobs that have used all their attempts fail instead, so a job that
+    kills its worker isn't run forever.
+    """
+    lease = getattr(settings, 'JOBS_LEASE_SECONDS', 1800)
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=now - datetime.timedelta(seconds=lease),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        error='The worker running the job stopped.',
+        finished_at=now,
+    )
+    return stale.update(status=Job.QUEUED, run_after=now)
+
+
+def claim():
+    """Mark the next runnable job as running and return it, or None."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=timezone.now())
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'started_at'])
+    return job
+
+
+def run(job):
+    """Run a claimed job and record its outcome."""
+    try:
+        result = get_task(job.kind)(**job.payload)
+    except Exception as exc:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts and \
+                not isinstance(exc, UnknownTask):
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + datetime.timedelta(
+                seconds=backoff(job.attempts),
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'result', 'error', 'run_after', 'finished_at',
+    ])
+    return job
+
+
+def run_pending(limit=None):
+    """Run runnable jobs until none is left (or limit); return the count."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim()
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
@@ -0,0 +1,68 @@
+"""
+Django command to fill a nullable column in batches, without long locks.
+"""
+import time
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from core import online_schema
+
+
+class Command(BaseCommand):
+    """Django command to backfill a column."""
+
+    help = (
+        'Set a column to its default (or --value) wherever it is NULL, a '
+        'batch of ids at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='Model label, e.g. core.Appointment')
+        parser.add_argument('field', help='Name of the field to fill.')
+        parser.add_argument(
+            '--value', help='Value to set instead of the field default.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, help='Ids per batch.',
+        )
+        parser.add_argument(
+            '--pause', type=float, help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            model = apps.get_model(options['model'])
+            field = model._meta.get_field(options['field'])
+        except (LookupError, ValueError, FieldDoesNotExist) as exc:
+            raise CommandError(str(exc))
+        if options['value'] is not None:
+            value = field.to_python(options['value'])
+        elif field.has_default():
+            value = field.get_default()
+        else:
+            raise CommandError(
+                f'{options["field"]} has no default; pass --value.'
+            )
+
+        began = time.perf_counter()
+
+        def progress(updated, position, high):
+            self.stdout.write(
+                f'{updated} rows updated, ids up to {position} of {high} '
+                f'({position / high:.0%}), {time.perf_counter() - began:.1f}s'
+            )
+
+        updated = online_schema.backfill(
+            model, field.name, value,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(
+            f'{updated} rows of {options["model"]} backfilled in '
+            f'{time.perf_counter() - began:.2f}s.'
+        )
+        self.stdout.write(self.style.SUCCESS('Backfill complete.'))
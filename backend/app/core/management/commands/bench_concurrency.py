@@ -0,0 +1,123 @@
+"""
+Django command comparing concurrent-request capacity under WSGI and ASGI.
+
+Both handlers are driven in-process, so the numbers measure the
+application stack rather than a particular server: WSGI requests run on a
+fixed pool of worker threads (like ``gunicorn --threads``), ASGI requests
+run as concurrent tasks on one event loop.
+"""
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark WSGI against ASGI."""
+
+    help = 'Compare concurrent-request capacity under WSGI and ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+',
+                            help='Paths to request, e.g. /api/user/me/.')
+        parser.add_argument('--token', required=True,
+                            help='Auth token sent with every request.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per path and handler.')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Requests in flight at once.')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='WSGI worker threads.')
+
+    def _report(self, label, path, latencies, elapsed):
+        self.stdout.write(
+            f'{label:<5} {path:<40} '
+            f'{len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+            f'p95 {_percentile(latencies, 0.95) * 1000:7.1f} ms'
+        )
+
+    def _bench_wsgi(self, path, options):
+        handler = WSGIHandler()
+        url = urlsplit(path)
+
+        def request(_):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': url.path,
+                'QUERY_STRING': url.query,
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'HTTP_HOST': 'localhost',
+                'HTTP_AUTHORIZATION': f'Token {options["token"]}',
+                'wsgi.input': io.BytesIO(),
+                'wsgi.url_scheme': 'http',
+            }
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            response.close()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            latencies = list(pool.map(request, range(options['requests'])))
+        return latencies, time.perf_counter() - start
+
+    async def _bench_asgi(self, path, options):
+        from app.asgi import application
+        url = urlsplit(path)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def request():
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': url.path,
+                'raw_path': url.path.encode(),
+                'query_string': url.query.encode(),
+                'headers': [
+                    (b'host', b'localhost'),
+                    (b'authorization',
+                     f'Token {options["token"]}'.encode()),
+                ],
+                'server': ('localhost', 80),
+            }
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                pass
+
+            async with semaphore:
+                start = time.perf_counter()
+                await application(scope, receive, send)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(request() for _ in range(options['requests']))
+        )
+        return latencies, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for path in options['paths']:
+            latencies, elapsed = self._bench_wsgi(path, options)
+            self._report('WSGI', path, latencies, elapsed)
+            latencies, elapsed = asyncio.run(self._bench_asgi(path, options))
+            self._report('ASGI', path, latencies, elapsed)
@@ -0,0 +1,30 @@
+"""
+Django command to export the columnar analytics snapshot.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from salon import analytics
+
+
+class Command(BaseCommand):
+    """Django command to export analytics; run it nightly."""
+
+    help = 'Write appointments to a new columnar analytics snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=3,
+            help='Number of snapshots to keep on disk.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        began = time.perf_counter()
+        name = analytics.export(keep=max(options['keep'], 1))
+        snapshot = analytics.current()
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported snapshot {name}: {snapshot.rows} appointments '
+            f'in {time.perf_counter() - began:.2f}s.'
+        ))
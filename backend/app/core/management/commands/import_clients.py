@@ -0,0 +1,51 @@
+"""
+Django command to import clients from a CSV or Excel file.
+"""
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from salon import imports
+
+
+class Command(BaseCommand):
+    """Django command to import clients."""
+
+    help = 'Import clients from a CSV or .xlsx file, skipping duplicates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or .xlsx file to import.')
+        parser.add_argument(
+            '--report',
+            help='Write the rows not imported, and why, to this CSV file.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        began = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                result = imports.import_clients(file, options['path'])
+        except OSError as exc:
+            raise CommandError(f'Can\'t read {options["path"]}: {exc}')
+        except imports.InvalidFile as exc:
+            raise CommandError(str(exc))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['row', 'status', 'detail'])
+                for item in result['report']:
+                    writer.writerow([
+                        item['row'],
+                        item['status'],
+                        json.dumps(item.get('errors', item.get('client'))),
+                    ])
+        self.stdout.write(
+            f'{result["rows"]} rows: {result["inserted"]} imported, '
+            f'{result["duplicates"]} duplicates, {result["invalid"]} '
+            f'invalid, in {time.perf_counter() - began:.2f}s.'
+        )
+        self.stdout.write(self.style.SUCCESS('Import complete.'))
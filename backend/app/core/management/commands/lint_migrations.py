@@ -0,0 +1,34 @@
+"""
+Django command to reject migrations that would lock large tables.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.migrations.loader import MigrationLoader
+
+from core import online_schema
+
+
+class Command(BaseCommand):
+    """Django command to lint migrations."""
+
+    help = (
+        'Fail if a migration would lock a large table for a rewrite or '
+        'scan (see core.online_schema).'
+    )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        problems = online_schema.lint(
+            loader.disk_migrations[key]
+            for key in sorted(loader.disk_migrations)
+        )
+        for migration, operation, reason in problems:
+            self.stderr.write(
+                f'{migration.app_label}.{migration.name}: '
+                f'{operation.describe()} {reason}.'
+            )
+        if problems:
+            raise CommandError(
+                f'{len(problems)} operations would lock large tables.'
+            )
+        self.stdout.write(self.style.SUCCESS('Migrations are safe.'))
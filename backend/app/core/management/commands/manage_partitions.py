@@ -0,0 +1,137 @@
+"""
+Django command to maintain the monthly appointment partitions.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import partitions
+from core.models import AppointmentArchive
+from salon import client_stats
+
+
+def _parse_month(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Invalid month "{value}", expected YYYY-MM.')
+
+
+class Command(BaseCommand):
+    """Django command to create, archive and restore partitions."""
+
+    help = (
+        'Create upcoming appointment partitions and move old ones into '
+        'the compressed archive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='Months ahead of the current one to create partitions for.',
+        )
+        parser.add_argument(
+            '--retain-months', type=int, default=None,
+            help='Archive partitions older than this many months.',
+        )
+        parser.add_argument(
+            '--detach-only', action='store_true',
+            help=(
+                'Detach old partitions but keep them as plain tables, to '
+                'be archived by the next run without this option.'
+            ),
+        )
+        parser.add_argument(
+            '--restore', metavar='YYYY-MM',
+            help='Load an archived month back into the live table.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if not partitions.is_supported(connection):
+            raise CommandError('Partitioning requires PostgreSQL.')
+        with connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                raise CommandError(
+                    f'{partitions.TABLE} is not partitioned; run migrate.'
+                )
+
+        if options['restore']:
+            self.restore(_parse_month(options['restore']))
+            return
+
+        current = partitions.month_start(datetime.date.today())
+        created = partitions.ensure_partitions(
+            connection,
+            current,
+            partitions.add_months(current, options['ahead']),
+        )
+        for name in created:
+            self.stdout.write(f'Created {name}')
+
+        if options['retain_months'] is not None:
+            cutoff = partitions.add_months(current, -options['retain_months'])
+            self.archive_before(cutoff, options['detach_only'])
+
+        self.stdout.write(self.style.SUCCESS('Partitions up to date.'))
+
+    def archive_before(self, cutoff, detach_only):
+        """
+        Archive every monthly partition before cutoff.
+
+        Tables left detached, by --detach-only or by a run that stopped
+        between detaching and archiving, are archived too.
+        """
+        with connection.cursor() as cursor:
+            months = sorted(
+                month for month in map(
+                    partitions.month_of_partition,
+                    partitions.list_partitions(cursor),
+                )
+                if month is not None and month < cutoff
+            )
+        for month in months:
+            name = partitions.detach_partition(connection, month)
+            if detach_only:
+                self.stdout.write(f'Detached {name}')
+        if detach_only:
+            return
+
+        with connection.cursor() as cursor:
+            detached = [
+                name for name in partitions.list_detached(cursor)
+                if partitions.month_of_partition(name) < cutoff
+            ]
+        for name in detached:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'SELECT count(*) FROM {name}')
+                row_count = cursor.fetchone()[0]
+                AppointmentArchive.objects.create(
+                    month=partitions.month_of_partition(name),
+                    row_count=row_count,
+                    payload=partitions.dump_table(cursor, name),
+                )
+                client_ids = client_stats.archive(cursor, name)
+                cursor.execute(f'DROP TABLE {name}')
+            client_stats.recompute(client_ids)
+            self.stdout.write(f'Archived {name} ({row_count} rows)')
+
+    def restore(self, month):
+        """Move an archived month back into the live table."""
+        archive = AppointmentArchive.objects.filter(month=month).first()
+        if archive is None:
+            raise CommandError(f'No archive for {month:%Y-%m}.')
+        partitions.create_partition(connection, month)
+        with transaction.atomic(), connection.cursor() as cursor:
+            partitions.load_table(
+                cursor, partitions.TABLE, bytes(archive.payload),
+            )
+            client_ids = client_stats.unarchive(
+                cursor, partitions.partition_name(month),
+            )
+            archive.delete()
+        client_stats.recompute(client_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {archive.row_count} appointments for {month:%Y-%m}.'
+        ))
@@ -0,0 +1,65 @@
+"""
+Django command to create technicians in bulk from a CSV file.
+"""
+import csv
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from salon import onboarding
+from salon.serializers import OnboardingSerializer
+
+
+def _ids(value):
+    """Return the ids in a cell such as "1;4" or "1 4"."""
+    return [int(item) for item in re.split(r'[;\s]+', value or '') if item]
+
+
+class Command(BaseCommand):
+    """Django command to onboard technicians."""
+
+    help = (
+        'Create technicians from a CSV file with email, name and password '
+        'columns, and optionally skills and branches (ids separated by ";").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file of technicians.')
+        parser.add_argument(
+            '--branch', type=int, action='append', default=[],
+            help='Add every technician to this branch (repeatable).',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        began = time.perf_counter()
+        try:
+            with open(options['path'], newline='',
+                      encoding='utf-8-sig') as file:
+                rows = list(csv.DictReader(file))
+            technicians = [
+                {
+                    'email': row.get('email'),
+                    'name': row.get('name') or '',
+                    'password': row.get('password'),
+                    'skills': _ids(row.get('skills')),
+                    'branches': _ids(row.get('branches')) + options['branch'],
+                }
+                for row in rows
+            ]
+        except OSError as exc:
+            raise CommandError(f'Can\'t read {options["path"]}: {exc}')
+        except ValueError as exc:
+            raise CommandError(f'Invalid id: {exc}')
+
+        serializer = OnboardingSerializer(data={'technicians': technicians})
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+        ids = onboarding.onboard(serializer.validated_data['technicians'])
+
+        self.stdout.write(
+            f'{len(ids)} technicians created in '
+            f'{time.perf_counter() - began:.2f}s.'
+        )
+        self.stdout.write(self.style.SUCCESS('Onboarding complete.'))
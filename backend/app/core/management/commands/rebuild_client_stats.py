@@ -0,0 +1,46 @@
+"""
+Django command to rebuild client visit statistics.
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from salon import client_stats
+
+
+class Command(BaseCommand):
+    """Django command to rebuild client stats."""
+
+    help = 'Recompute client visit stats, for every client by default.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Only clients booked on this day, YYYY-MM-DD.',
+        )
+        parser.add_argument(
+            '--today', action='store_true',
+            help="Only clients booked today; run nightly to count today's "
+                 'appointments as visits.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        date = None
+        if options['today']:
+            date = timezone.localdate()
+        elif options['date']:
+            try:
+                date = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(
+                    f'Invalid date "{options["date"]}", expected YYYY-MM-DD.'
+                )
+        began = time.perf_counter()
+        count = client_stats.rebuild(date)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed stats of {count} clients in '
+            f'{time.perf_counter() - began:.2f}s.'
+        ))
@@ -0,0 +1,40 @@
+"""
+Django command to refresh the booking demand snapshots.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from salon import demand
+
+
+class Command(BaseCommand):
+    """Django command to refresh demand snapshots; run it nightly."""
+
+    help = 'Count the appointments booked since the last demand refresh.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until',
+            help='Last day to count, YYYY-MM-DD (default: yesterday).',
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Rebuild the snapshots from each branch's first day.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        until = None
+        if options['until']:
+            try:
+                until = datetime.date.fromisoformat(options['until'])
+            except ValueError:
+                raise CommandError(
+                    f'Invalid date "{options["until"]}", '
+                    'expected YYYY-MM-DD.'
+                )
+        refreshed = demand.refresh_all(until=until, full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed demand of {refreshed} branches.'
+        ))
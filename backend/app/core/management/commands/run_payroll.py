@@ -0,0 +1,65 @@
+"""
+Django command to compute the payroll of a pay period.
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.partitions import add_months
+from salon import payroll
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    """Django command to run payroll."""
+
+    help = 'Compute and store per-technician payroll for a pay period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Pay period as YYYY-MM.')
+        parser.add_argument('--start', help='First day, YYYY-MM-DD.')
+        parser.add_argument('--end', help='Last day, YYYY-MM-DD.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Processes to spread branches over.',
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Check the totals against a plain ORM aggregation.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['month']:
+            start = _parse_date(f'{options["month"]}-01')
+            end = add_months(start, 1) - datetime.timedelta(days=1)
+        elif options['start'] and options['end']:
+            start = _parse_date(options['start'])
+            end = _parse_date(options['end'])
+        else:
+            raise CommandError('Give either --month or --start and --end.')
+        if end < start:
+            raise CommandError('The period ends before it starts.')
+
+        began = time.perf_counter()
+        run = payroll.run_payroll(start, end, workers=options['workers'])
+        elapsed = time.perf_counter() - began
+        self.stdout.write(
+            f'Payroll run {run.id}: {run.lines.count()} lines, '
+            f'{run.appointment_count} appointments, gross {run.gross}, '
+            f'in {elapsed:.2f}s.'
+        )
+
+        if options['verify']:
+            if payroll.line_totals(run) != \
+                    payroll.reference_totals(start, end):
+                raise CommandError('Totals differ from the ORM aggregation.')
+            self.stdout.write('Totals match the ORM aggregation.')
+        self.stdout.write(self.style.SUCCESS('Payroll complete.'))
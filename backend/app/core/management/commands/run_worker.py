@@ -0,0 +1,122 @@
+"""
+Django command to run background jobs.
+"""
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+
+def _work(stop, poll_interval, once):
+    """Run jobs until stop is set (or, with once, until none is left)."""
+    # Imported here: spawned processes load this module before setup().
+    from core import jobs
+
+    interval = getattr(settings, 'JOBS_REQUEUE_INTERVAL_SECONDS', 60)
+    next_requeue = time.monotonic()
+    while not stop.is_set():
+        job = None
+        try:
+            if time.monotonic() >= next_requeue:
+                next_requeue = time.monotonic() + interval
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    logger.info('Requeued %d stale jobs.', requeued)
+            job = jobs.claim()
+            if job is not None:
+                jobs.run(job)
+        except DatabaseError:
+            logger.exception('Job worker lost its database connection.')
+        finally:
+            # Hand the connection back to the pool between jobs.
+            connections.close_all()
+        if job is None:
+            if once:
+                return
+            stop.wait(poll_interval)
+
+
+def _work_in_process(stop, poll_interval, once):
+    import django
+    django.setup()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _work(stop, poll_interval, once)
+
+
+class Command(BaseCommand):
+    """Django command to run background jobs."""
+
+    help = 'Claim and run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of jobs to run at the same time.',
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Run jobs in processes rather than threads (CPU-bound work).',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Seconds to wait when no job is runnable.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no job is runnable.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        connections.close_all()
+
+        if options['processes']:
+            # Spawned, not forked, so children don't share our connections.
+            context = multiprocessing.get_context('spawn')
+            stop = context.Event()
+            workers = [
+                context.Process(
+                    target=_work_in_process,
+                    args=(stop, options['poll_interval'], options['once']),
+                )
+                for _ in range(options['concurrency'])
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(
+                    target=_work,
+                    args=(stop, options['poll_interval'], options['once']),
+                )
+                for _ in range(options['concurrency'])
+            ]
+
+        def shutdown(signum, frame):
+            self.stdout.write('Finishing running jobs...')
+            stop.set()
+
+        previous = {
+            signum: signal.signal(signum, shutdown)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        self.stdout.write(
+            f'Running jobs with {options["concurrency"]} '
+            f'{"processes" if options["processes"] else "threads"}.'
+        )
+        try:
+            for worker in workers:
+                worker.start()
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.2)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
@@ -0,0 +1,48 @@
+"""
+Django command to send appointment reminders.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from salon import reminders
+
+
+class Command(BaseCommand):
+    """Django command to send reminders; run it daily."""
+
+    help = "Remind clients of their appointments (tomorrow's by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Appointment day, YYYY-MM-DD.')
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Messages to send at the same time.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=reminders.CHUNK_SIZE,
+            help='Appointments to read per query.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        date = None
+        if options['date']:
+            try:
+                date = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(
+                    f'Invalid date "{options["date"]}", expected YYYY-MM-DD.'
+                )
+        totals = reminders.dispatch(
+            date,
+            chunk_size=options['chunk_size'],
+            concurrency=options['concurrency'],
+        )
+        self.stdout.write(
+            f'{totals["appointments"]} appointments: '
+            f'{totals["sent"]} reminders sent, {totals["failed"]} failed.'
+        )
+        if totals['failed']:
+            raise CommandError('Some reminders failed; rerun to retry them.')
+        self.stdout.write(self.style.SUCCESS('Reminders sent.'))
@@ -0,0 +1,66 @@
+"""
+Middleware for the project.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+
+from core import admission, db_router
+
+
+class AdmissionControlMiddleware:
+    """Shed low-priority requests under load (see core.admission)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        controller = admission.get_controller()
+        name = controller.classify(request.path_info)
+        if not controller.admit(name):
+            retry_after = getattr(settings, 'ADMISSION_RETRY_AFTER_SECONDS',
+                                  admission.RETRY_AFTER_SECONDS)
+            response = JsonResponse(
+                {'detail': admission.BUSY_DETAIL}, status=503,
+            )
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        def timed(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                controller.record_query(name, time.perf_counter() - start)
+
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(timed)
+                    )
+                return self.get_response(request)
+        finally:
+            controller.release(name)
+
+
+class ReplicaRoutingMiddleware:
+    """Route the reads of safe requests to replicas (see core.db_router)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not db_router.replicas():
+            return self.get_response(request)
+        client = db_router.client_key(request)
+        replica_ok = request.method in db_router.SAFE_METHODS and \
+            not db_router.is_pinned(client)
+        with db_router.route(replica_ok) as state:
+            response = self.get_response(request)
+        if state.wrote or request.method not in db_router.SAFE_METHODS:
+            db_router.pin(client)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+from core.online_schema import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_branch_client_discount_payment_promo_service_skill_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['branch', 'date'], name='core_appt_branch_date_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:35
+
+from django.db import migrations, models
+
+from core.online_schema import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0003_appointment_branch_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='appointment',
+                    name='updated_at',
+                    field=models.DateTimeField(auto_now=True, db_index=True),
+                ),
+            ],
+            database_operations=[
+                AddIndexConcurrently(
+                    model_name='appointment',
+                    index=models.Index(fields=['updated_at'], name='core_appointment_updated_at_991287ed'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='branch',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='client',
+                    name='updated_at',
+                    field=models.DateTimeField(auto_now=True, db_index=True),
+                ),
+            ],
+            database_operations=[
+                AddIndexConcurrently(
+                    model_name='client',
+                    index=models.Index(fields=['updated_at'], name='core_client_updated_at_1fe4034d'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='discount',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='promo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='service',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='skill',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='technician',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,202 @@
+"""
+Move core_appointment to monthly range partitions (PostgreSQL only).
+
+Existing rows are copied in id batches while the table stays in use. A
+trigger logs the ids written during the copy, and that log is replayed
+until it is small. Only the final replay and the table swap run under a
+lock: writes wait from the start of the final replay, and the renames of
+the swap take an exclusive lock that makes reads wait too until it
+commits. Both are as short as the last replay, not the length of the
+copy. On other databases this migration does nothing.
+"""
+import datetime
+import re
+
+from django.db import migrations, transaction
+
+
+TABLE = 'core_appointment'
+NEW = 'core_appointment_partitioned'
+OLD = 'core_appointment_unpartitioned'
+PLAIN = 'core_appointment_plain'
+CHANGES = 'core_appointment_changes'
+BATCH_SIZE = 10000
+MONTHS_AHEAD = 3
+
+
+def _month(date, months=0):
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _copy_indexes(cursor, source, target):
+    """Recreate source's indexes on target, moving their names over."""
+    cursor.execute(
+        'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x '
+        'JOIN pg_class i ON i.oid = x.indexrelid '
+        'WHERE x.indrelid = %s::regclass AND NOT x.indisprimary',
+        [source],
+    )
+    for name, definition in cursor.fetchall():
+        cursor.execute(f'ALTER INDEX {name} RENAME TO {name}_old')
+        cursor.execute(re.sub(
+            r' ON (ONLY )?(\S+\.)?' + source + ' USING ',
+            f' ON {target} USING ',
+            definition,
+        ))
+
+
+def _copy_foreign_keys(cursor, source, target):
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [source],
+    )
+    for name, definition in cursor.fetchall():
+        cursor.execute(
+            f'ALTER TABLE {target} ADD CONSTRAINT {name} {definition}'
+        )
+
+
+def _swap(cursor, current, replacement, retired):
+    """Rename replacement to current, keeping current as retired."""
+    cursor.execute(f'ALTER INDEX {current}_pkey RENAME TO {retired}_pkey')
+    cursor.execute(f'ALTER TABLE {current} RENAME TO {retired}')
+    cursor.execute(f'ALTER TABLE {replacement} RENAME TO {current}')
+    cursor.execute(
+        f'ALTER INDEX {replacement}_pkey RENAME TO {current}_pkey'
+    )
+    cursor.execute(f'ALTER SEQUENCE {current}_id_seq '
+                   f'OWNED BY {current}.id')
+
+
+def _replay_changes(cursor):
+    """Re-copy the rows logged as changed; return how many ids there were."""
+    cursor.execute('CREATE TEMP TABLE replay (id bigint) ON COMMIT DROP')
+    cursor.execute(
+        f'WITH drained AS (DELETE FROM {CHANGES} RETURNING id) '
+        'INSERT INTO replay SELECT DISTINCT id FROM drained'
+    )
+    count = cursor.rowcount
+    cursor.execute(f'DELETE FROM {NEW} n USING replay r WHERE n.id = r.id')
+    cursor.execute(
+        f'INSERT INTO {NEW} SELECT t.* FROM {TABLE} t '
+        'JOIN replay r ON t.id = r.id'
+    )
+    return count
+
+
+def partition_appointments(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass",
+            [TABLE],
+        )
+        if cursor.fetchone()[0]:
+            return
+
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(
+                f'CREATE TABLE {NEW} (LIKE {TABLE} INCLUDING DEFAULTS) '
+                'PARTITION BY RANGE (date)'
+            )
+            cursor.execute(f'ALTER TABLE {NEW} ADD PRIMARY KEY (id, date)')
+            cursor.execute(f'SELECT min(date), max(date) FROM {TABLE}')
+            low, high = cursor.fetchone()
+            today = datetime.date.today()
+            month = _month(min(low or today, today))
+            last = _month(max(high or today, today), MONTHS_AHEAD)
+            while month <= last:
+                cursor.execute(
+                    f'CREATE TABLE {TABLE}_p{month:%Y%m} '
+                    f'PARTITION OF {NEW} FOR VALUES FROM (%s) TO (%s)',
+                    [month, _month(month, 1)],
+                )
+                month = _month(month, 1)
+            cursor.execute(
+                f'CREATE TABLE {TABLE}_default PARTITION OF {NEW} DEFAULT'
+            )
+
+            cursor.execute(f'CREATE UNLOGGED TABLE {CHANGES} (id bigint)')
+            cursor.execute(
+                f'CREATE FUNCTION {CHANGES}_log() RETURNS trigger '
+                'LANGUAGE plpgsql AS $$ BEGIN '
+                f"INSERT INTO {CHANGES} VALUES (CASE WHEN TG_OP = 'DELETE' "
+                'THEN OLD.id ELSE NEW.id END); RETURN NULL; END $$'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER {CHANGES}_log AFTER INSERT OR UPDATE '
+                f'OR DELETE ON {TABLE} FOR EACH ROW '
+                f'EXECUTE FUNCTION {CHANGES}_log()'
+            )
+
+        # Everything written from here on is in the change log, so a
+        # batch copying a row that is later changed is fixed up on replay.
+        cursor.execute(f'SELECT coalesce(max(id), 0) FROM {TABLE}')
+        max_id = cursor.fetchone()[0]
+        for start in range(0, max_id, BATCH_SIZE):
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(
+                    f'INSERT INTO {NEW} SELECT * FROM {TABLE} '
+                    'WHERE id > %s AND id <= %s ON CONFLICT DO NOTHING',
+                    [start, start + BATCH_SIZE],
+                )
+
+        with transaction.atomic(using=connection.alias):
+            _copy_indexes(cursor, TABLE, NEW)
+            _copy_foreign_keys(cursor, TABLE, NEW)
+
+        while True:
+            with transaction.atomic(using=connection.alias):
+                if _replay_changes(cursor) < BATCH_SIZE:
+                    break
+
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f'LOCK TABLE {TABLE} IN SHARE ROW EXCLUSIVE MODE')
+            _replay_changes(cursor)
+            cursor.execute(f'DROP TRIGGER {CHANGES}_log ON {TABLE}')
+            _swap(cursor, TABLE, NEW, OLD)
+
+        cursor.execute(f'DROP TABLE {OLD}')
+        cursor.execute(f'DROP TABLE {CHANGES}')
+        cursor.execute(f'DROP FUNCTION {CHANGES}_log()')
+        cursor.execute(f'ANALYZE {TABLE}')
+
+
+def unpartition_appointments(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {TABLE} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(
+            f'CREATE TABLE {PLAIN} (LIKE {TABLE} INCLUDING DEFAULTS)'
+        )
+        cursor.execute(f'INSERT INTO {PLAIN} SELECT * FROM {TABLE}')
+        cursor.execute(f'ALTER TABLE {PLAIN} ADD PRIMARY KEY (id)')
+        _copy_indexes(cursor, TABLE, PLAIN)
+        _copy_foreign_keys(cursor, TABLE, PLAIN)
+        _swap(cursor, TABLE, PLAIN, OLD)
+        cursor.execute(f'DROP TABLE {OLD} CASCADE')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_appointmentarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            partition_appointments,
+            unpartition_appointments,
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('appointment_count', models.PositiveIntegerField()),
+                ('gross', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('commission', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('tip', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('courtesy', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_name', models.CharField(max_length=255)),
+                ('technician_name', models.CharField(max_length=255)),
+                ('appointment_count', models.PositiveIntegerField()),
+                ('gross', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('commission', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('tip', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('courtesy', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('branch', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.branch')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='core.payrollrun')),
+                ('technician', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.technician')),
+            ],
+            options={
+                'ordering': ['branch_name', 'technician_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_payroll'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('through', models.DateField()),
+                ('services', models.JSONField(default=list)),
+                ('counts', models.BinaryField()),
+                ('days', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand', to='core.branch')),
+            ],
+        ),
+    ]
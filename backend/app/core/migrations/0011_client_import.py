@@ -0,0 +1,42 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+from core.online_schema import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_reminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='client',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='core_client_email_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='client',
+            index=models.Index(fields=['phone'], name='core_client_phone_idx'),
+        ),
+        migrations.AddField(
+            model_name='clientupload',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
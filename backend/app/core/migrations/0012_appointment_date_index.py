@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+from core.online_schema import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_client_import'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'id'], name='core_appt_date_id_idx'),
+        ),
+    ]
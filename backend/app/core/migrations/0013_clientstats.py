@@ -0,0 +1,84 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:22
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+import django.db.models.deletion
+
+
+CHUNK_SIZE = 1000
+
+
+def _favorites(appointments, field):
+    rows = appointments.values('client_id', field).annotate(
+        visits=Count('id'), last=Max('date'),
+    ).order_by('client_id', '-visits', '-last', field)
+    favorites = {}
+    for row in rows:
+        favorites.setdefault(row['client_id'], row[field])
+    return favorites
+
+
+def compute_client_stats(apps, schema_editor):
+    """Compute the stats of existing clients, as salon.client_stats does."""
+    Appointment = apps.get_model('core', 'Appointment')
+    Client = apps.get_model('core', 'Client')
+    ClientStats = apps.get_model('core', 'ClientStats')
+    today = timezone.localdate()
+    client_ids = list(Client.objects.order_by('id').values_list(
+        'id', flat=True,
+    ))
+    for start in range(0, len(client_ids), CHUNK_SIZE):
+        chunk = client_ids[start:start + CHUNK_SIZE]
+        visits = Appointment.objects.filter(
+            client_id__in=chunk, date__lte=today,
+        )
+        totals = {
+            row['client_id']: row
+            for row in visits.values('client_id').annotate(
+                last=Max('date'),
+                count=Count('id'),
+                spend=Sum('final_income'),
+            ).order_by()
+        }
+        technicians = _favorites(visits, 'technician_id')
+        services = _favorites(visits, 'service_id')
+        ClientStats.objects.bulk_create([
+            ClientStats(
+                client_id=client_id,
+                last_visit=totals.get(client_id, {}).get('last'),
+                visit_count=totals.get(client_id, {}).get('count', 0),
+                total_spend=totals.get(client_id, {}).get('spend') or 0,
+                favorite_technician_id=technicians.get(client_id),
+                favorite_service_id=services.get(client_id),
+            )
+            for client_id in chunk
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_appointment_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientStats',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.client')),
+                ('last_visit', models.DateField(blank=True, db_index=True, null=True)),
+                ('visit_count', models.PositiveIntegerField(default=0)),
+                ('total_spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('archived_visits', models.PositiveIntegerField(default=0)),
+                ('archived_spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('archived_last_visit', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('favorite_service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.service')),
+                ('favorite_technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.technician')),
+            ],
+        ),
+        migrations.RunPython(
+            compute_client_stats, migrations.RunPython.noop,
+        ),
+    ]
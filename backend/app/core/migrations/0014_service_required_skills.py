@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_clientstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='required_skills',
+            field=models.ManyToManyField(blank=True, to='core.skill'),
+        ),
+    ]
@@ -4,12 +4,16 @@ Database models.
 """
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core import passwords
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -50,6 +54,20 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        """Hash raw_password on the bounded hashing pool."""
+        self.password = passwords.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Check raw_password on the bounded hashing pool."""
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return passwords.check_password(raw_password, self.password, setter)
+
 
 class Branch(models.Model):
     """Branch object."""
@@ -58,7 +76,7 @@ class Branch(models.Model):
     start_time = models.TimeField(null=True, blank=True)
     end_time = models.TimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -67,7 +85,7 @@ class Branch(models.Model):
 class Skill(models.Model):
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -78,7 +96,7 @@ class Technician(models.Model):
     skills = models.ManyToManyField('Skill')
     branches = models.ManyToManyField('Branch')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.user.name
@@ -87,8 +105,10 @@ class Technician(models.Model):
 class Service(models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Skills a technician needs to perform the service.
+    required_skills = models.ManyToManyField('Skill', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -98,7 +118,7 @@ class Payment(models.Model):
     format_code = models.CharField(max_length=10)
     description = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.description
@@ -108,7 +128,7 @@ class Discount(models.Model):
     description = models.CharField(max_length=255)
     value = models.DecimalField(max_digits=5, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.description
@@ -127,7 +147,7 @@ class Promo(models.Model):
     weekday = models.IntegerField(choices=WEEKDAYS)
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -141,7 +161,14 @@ class Client(models.Model):
     birthday = models.DateField()
     comments = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Imports look clients up by contact to skip duplicates.
+            models.Index(Lower('email'), name='core_client_email_idx'),
+            models.Index(fields=['phone'], name='core_client_phone_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} {self.last_name}'
@@ -172,7 +199,244 @@ class Appointment(models.Model):
     final_income = models.DecimalField(max_digits=10, decimal_places=2,
                                        default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['branch', 'date'],
+                         name='core_appt_branch_date_idx'),
+            # Newest-first lists, such as the admin's, read this backwards.
+            models.Index(fields=['date', 'id'],
+                         name='core_appt_date_id_idx'),
+        ]
 
     def __str__(self):
         return f'{self.date} - {self.time} - {self.client}'
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row, so that clients can sync deletions."""
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.resource} {self.object_id}'
+
+
+class AppointmentArchive(models.Model):
+    """A month of appointments moved out of the live table."""
+    month = models.DateField(unique=True)
+    row_count = models.PositiveIntegerField()
+    # gzip-compressed CSV, as written by COPY ... TO STDOUT WITH CSV HEADER.
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} ({self.row_count} appointments)'
+
+
+class Job(models.Model):
+    """A unit of background work, run by the run_worker command."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers only ever scan for runnable jobs.
+            models.Index(fields=['run_after', 'id'],
+                         condition=models.Q(status='queued'),
+                         name='core_job_queued_idx'),
+            models.Index(fields=['started_at'],
+                         condition=models.Q(status='running'),
+                         name='core_job_running_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
+
+
+class ImmutableModel(models.Model):
+    """A model whose rows can't be changed or deleted once saved."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not self._state.adding:
+            raise ValueError(f'{self._meta.verbose_name} is immutable.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError(f'{self._meta.verbose_name} is immutable.')
+
+
+class PayrollRun(ImmutableModel):
+    """Snapshot of what every technician earned over a pay period."""
+    period_start = models.DateField()
+    period_end = models.DateField()
+    appointment_count = models.PositiveIntegerField()
+    gross = models.DecimalField(max_digits=14, decimal_places=2)
+    commission = models.DecimalField(max_digits=14, decimal_places=2)
+    tip = models.DecimalField(max_digits=14, decimal_places=2)
+    courtesy = models.DecimalField(max_digits=14, decimal_places=2)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Payroll {self.period_start} - {self.period_end}'
+
+
+class PayrollLine(ImmutableModel):
+    """What one technician earned at one branch in a payroll run."""
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE,
+                            related_name='lines')
+    # Names are copied so the snapshot outlives renames and deletions.
+    branch = models.ForeignKey('Branch', on_delete=models.SET_NULL,
+                               null=True)
+    branch_name = models.CharField(max_length=255)
+    technician = models.ForeignKey('Technician', on_delete=models.SET_NULL,
+                                   null=True)
+    technician_name = models.CharField(max_length=255)
+    appointment_count = models.PositiveIntegerField()
+    gross = models.DecimalField(max_digits=12, decimal_places=2)
+    commission = models.DecimalField(max_digits=12, decimal_places=2)
+    tip = models.DecimalField(max_digits=12, decimal_places=2)
+    courtesy = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        ordering = ['branch_name', 'technician_name']
+
+    def __str__(self):
+        return f'{self.technician_name} @ {self.branch_name}'
+
+
+class DemandSnapshot(models.Model):
+    """Bookings of a branch by service, weekday and hour, kept up to date."""
+    branch = models.OneToOneField('Branch', on_delete=models.CASCADE,
+                                  related_name='demand')
+    # Appointments up to and including this day are counted.
+    through = models.DateField()
+    # Service ids, in the order of the first axis of counts.
+    services = models.JSONField(default=list)
+    # .npy arrays: counts is int32 (service, promo, weekday, hour) and
+    # days int32 (promo, weekday), the number of days each cell covers.
+    counts = models.BinaryField()
+    days = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Demand of {self.branch} through {self.through}'
+
+
+class Reminder(models.Model):
+    """A reminder of an appointment, sent once per channel."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+    # Appointments are partitioned, so the database can't enforce this.
+    appointment = models.ForeignKey('Appointment', on_delete=models.CASCADE,
+                                    db_constraint=False)
+    channel = models.CharField(max_length=10)
+    recipient = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'channel'],
+                                    name='core_reminder_once_per_channel'),
+        ]
+
+    def __str__(self):
+        return f'{self.channel} reminder of {self.appointment_id}'
+
+
+class ClientUpload(models.Model):
+    """A client file waiting for its import job to run."""
+    filename = models.CharField(max_length=255)
+    data = models.BinaryField()
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.filename
+
+
+class ClientStats(models.Model):
+    """A client's visits so far, kept up to date as appointments change."""
+    client = models.OneToOneField('Client', on_delete=models.CASCADE,
+                                  primary_key=True, related_name='stats')
+    # Visits are appointments dated today or earlier.
+    last_visit = models.DateField(null=True, blank=True, db_index=True)
+    visit_count = models.PositiveIntegerField(default=0)
+    total_spend = models.DecimalField(max_digits=14, decimal_places=2,
+                                      default=0)
+    favorite_technician = models.ForeignKey(
+        'Technician', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+',
+    )
+    favorite_service = models.ForeignKey(
+        'Service', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+',
+    )
+    # Visits in months moved to the archive (see manage_partitions), which
+    # are included in the totals above.
+    archived_visits = models.PositiveIntegerField(default=0)
+    archived_spend = models.DecimalField(max_digits=14, decimal_places=2,
+                                         default=0)
+    archived_last_visit = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Stats of {self.client_id}'
@@ -0,0 +1,369 @@
+"""
+Migration operations for changing large tables while they stay in use.
+
+Django's schema operations lock the table they change for as long as they
+take, which is fine on an empty database but blocks every booking for
+minutes on ``core_appointment``. The operations here do the same changes
+without a long lock on PostgreSQL, and fall back to the plain operation on
+other databases:
+
+- ``AddIndexConcurrently`` builds an index with ``CREATE INDEX
+  CONCURRENTLY``. On a partitioned table it builds each partition's index
+  concurrently and attaches it to an index created ``ON ONLY`` the parent.
+  Migrations using it must set ``atomic = False``.
+- ``AddConstraintNotValid`` adds a check constraint that only new rows must
+  satisfy, and ``ValidateConstraint``, in a later migration, checks the
+  existing rows without blocking writes.
+- ``BackfillField`` fills a column added as nullable, in batches of ids
+  committed one at a time, with a pause between batches. The
+  ``backfill`` command does the same outside migrations.
+
+Statements that need a brief exclusive lock run under SCHEMA_LOCK_TIMEOUT,
+so a change that can't get its lock fails instead of queueing all traffic
+behind it.
+
+``lint_migrations`` rejects operations that would lock the table of a
+model listed in MIGRATION_LINT_LARGE_MODELS for the length of a rewrite or
+scan.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres import operations as postgres_operations
+from django.db import NotSupportedError, migrations, transaction
+from django.db.migrations.operations.base import Operation
+from django.db.models import Max, Min, NOT_PROVIDED
+
+from core import partitions
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = '5s'
+BATCH_SIZE = 5000
+PAUSE_SECONDS = 0.1
+
+
+def _is_postgres(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+@contextmanager
+def _lock_timeout(schema_editor):
+    """Give up on locks not granted within SCHEMA_LOCK_TIMEOUT."""
+    timeout = getattr(settings, 'SCHEMA_LOCK_TIMEOUT', LOCK_TIMEOUT)
+    atomic = schema_editor.connection.in_atomic_block
+    scope = 'LOCAL ' if atomic else ''
+    schema_editor.execute(f"SET {scope}lock_timeout = '{timeout}'")
+    try:
+        yield
+    finally:
+        if not atomic:
+            schema_editor.execute('RESET lock_timeout')
+
+
+def _execute_briefly(schema_editor, sql):
+    """Run a statement needing a short lock, giving up if it can't get it."""
+    with _lock_timeout(schema_editor):
+        schema_editor.execute(sql)
+
+
+def _ensure_not_in_transaction(operation, schema_editor):
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f'{operation.__class__.__name__} cannot run inside a '
+            'transaction; set atomic = False on the migration.'
+        )
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """Add an index without blocking writes, partition by partition."""
+
+    atomic = False
+
+    def describe(self):
+        return f'Concurrently create index {self.index.name} on ' \
+            f'{self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not _is_postgres(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+        _ensure_not_in_transaction(self, schema_editor)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        table = model._meta.db_table
+        quote = schema_editor.quote_name
+        with schema_editor.connection.cursor() as cursor:
+            children = partitions.list_partitions(cursor, table) \
+                if partitions.is_partitioned(cursor, table) else None
+        if children is None:
+            self._build(schema_editor, model, table, self.index.name)
+            return
+        # The parent's index stays invalid until every partition's index
+        # is attached to it.
+        statement = self.index.create_sql(model, schema_editor)
+        statement.parts['name'] = quote(self.index.name)
+        statement.parts['table'] = f'ONLY {quote(table)}'
+        _execute_briefly(schema_editor, str(statement).replace(
+            'CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1,
+        ))
+        for number, child in enumerate(children, start=1):
+            name = f'{self.index.name}{child[len(table):]}'
+            began = time.perf_counter()
+            self._build(schema_editor, model, child, name)
+            _execute_briefly(
+                schema_editor,
+                f'ALTER INDEX {quote(self.index.name)} '
+                f'ATTACH PARTITION {quote(name)}',
+            )
+            logger.info(
+                'Built %s on %s (%d/%d) in %.1fs.', name, child, number,
+                len(children), time.perf_counter() - began,
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not _is_postgres(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+        _ensure_not_in_transaction(self, schema_editor)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        table = model._meta.db_table
+        with schema_editor.connection.cursor() as cursor:
+            partitioned = partitions.is_partitioned(cursor, table)
+        # Indexes of partitioned tables can't be dropped concurrently;
+        # dropping one is quick but takes a brief exclusive lock.
+        _execute_briefly(
+            schema_editor,
+            f'DROP INDEX {"" if partitioned else "CONCURRENTLY "}'
+            f'IF EXISTS {schema_editor.quote_name(self.index.name)}',
+        )
+
+    def _build(self, schema_editor, model, table, name):
+        """Build the index on table concurrently, unless it's there."""
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT x.indisvalid FROM pg_index x '
+                'WHERE x.indexrelid = to_regclass(%s)',
+                [name],
+            )
+            row = cursor.fetchone()
+        if row and row[0]:
+            return
+        if row:
+            # Left invalid by an interrupted build.
+            schema_editor.execute(
+                f'DROP INDEX CONCURRENTLY {schema_editor.quote_name(name)}'
+            )
+        statement = self.index.create_sql(model, schema_editor,
+                                          concurrently=True)
+        statement.parts['name'] = schema_editor.quote_name(name)
+        statement.parts['table'] = schema_editor.quote_name(table)
+        schema_editor.execute(statement)
+
+
+class AddConstraintNotValid(postgres_operations.AddConstraintNotValid):
+    """Add a check constraint that existing rows aren't checked against."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if not _is_postgres(schema_editor):
+            return migrations.AddConstraint.database_forwards(
+                self, app_label, schema_editor, from_state, to_state,
+            )
+        with _lock_timeout(schema_editor):
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+
+
+class ValidateConstraint(postgres_operations.ValidateConstraint):
+    """Check existing rows against a NOT VALID constraint."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if _is_postgres(schema_editor):
+            with _lock_timeout(schema_editor):
+                super().database_forwards(
+                    app_label, schema_editor, from_state, to_state,
+                )
+
+
+def backfill(model, field_name, value=NOT_PROVIDED, batch_size=None,
+             pause=None, using='default', progress=None):
+    """
+    Set field_name to value (its default) wherever it is NULL.
+
+    Rows are updated by ranges of batch_size ids, each in its own
+    transaction, sleeping pause seconds in between so replicas and other
+    writers keep up. progress, if given, is called after every batch with
+    the rows updated so far, the last id covered and the highest id.
+    Return the number of rows updated.
+    """
+    field = model._meta.get_field(field_name)
+    if value is NOT_PROVIDED:
+        value = field.get_default()
+    if batch_size is None:
+        batch_size = getattr(settings, 'BACKFILL_BATCH_SIZE', BATCH_SIZE)
+    if pause is None:
+        pause = getattr(settings, 'BACKFILL_PAUSE_SECONDS', PAUSE_SECONDS)
+    rows = model._base_manager.using(using)
+    bounds = rows.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    updated = 0
+    start = bounds['low']
+    while start <= bounds['high']:
+        end = start + batch_size
+        with transaction.atomic(using=using):
+            updated += rows.filter(
+                pk__gte=start, pk__lt=end,
+                **{f'{field.attname}__isnull': True},
+            ).update(**{field.attname: value})
+        if progress is not None:
+            progress(updated, min(end - 1, bounds['high']), bounds['high'])
+        start = end
+        if pause and start <= bounds['high']:
+            time.sleep(pause)
+    return updated
+
+
+class BackfillField(Operation):
+    """Fill a nullable column of an existing table in batches."""
+
+    atomic = False
+    reduces_to_sql = False
+
+    def __init__(self, model_name, name, value=NOT_PROVIDED,
+                 batch_size=None, pause=None):
+        self.model_name = model_name
+        self.name = name
+        self.value = value
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def describe(self):
+        return f'Backfill {self.model_name}.{self.name}'
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        if _is_postgres(schema_editor):
+            _ensure_not_in_transaction(self, schema_editor)
+
+        def progress(updated, position, high):
+            logger.info('Backfilled %d rows of %s.%s, up to id %d of %d.',
+                        updated, self.model_name, self.name, position, high)
+
+        backfill(model, self.name, self.value, self.batch_size, self.pause,
+                 using=schema_editor.connection.alias, progress=progress)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        pass
+
+
+# Operations that rewrite or scan a table under a lock blocking writes,
+# and what to use instead.
+LOCKING_OPERATIONS = {
+    migrations.AddIndex:
+        'builds the index blocking writes; use AddIndexConcurrently',
+    migrations.AddConstraint:
+        'checks every row blocking writes; use AddConstraintNotValid and '
+        'ValidateConstraint',
+    migrations.AlterField:
+        'may rewrite the table; add a new nullable column and BackfillField',
+}
+SAFE_OPERATIONS = (
+    AddIndexConcurrently,
+    postgres_operations.AddIndexConcurrently,
+    postgres_operations.AddConstraintNotValid,
+)
+NON_TRANSACTIONAL_OPERATIONS = (
+    AddIndexConcurrently,
+    BackfillField,
+    postgres_operations.AddIndexConcurrently,
+    postgres_operations.RemoveIndexConcurrently,
+)
+
+
+def _locking_reason(operation):
+    if isinstance(operation, SAFE_OPERATIONS):
+        return None
+    if isinstance(operation, migrations.AddField) and \
+            not operation.field.null and \
+            not operation.field.many_to_many:
+        return 'adds a NOT NULL column; add it nullable, then BackfillField'
+    for operation_class, reason in LOCKING_OPERATIONS.items():
+        if isinstance(operation, operation_class):
+            return reason
+    return None
+
+
+def _database_operations(operations):
+    """
+    Yield the operations that change the database, looking inside
+    SeparateDatabaseAndState.
+    """
+    for operation in operations:
+        if isinstance(operation, migrations.SeparateDatabaseAndState):
+            yield from _database_operations(operation.database_operations)
+        else:
+            yield operation
+
+
+def lint(migration_list, large_models=None, baseline=None):
+    """
+    Return (migration, operation, reason) for each operation that would
+    lock a large table, skipping migrations up to each app's baseline.
+
+    Operations on a model created in the same migration are skipped too,
+    since its table is still empty.
+    """
+    if large_models is None:
+        large_models = getattr(settings, 'MIGRATION_LINT_LARGE_MODELS', [])
+    if baseline is None:
+        baseline = getattr(settings, 'MIGRATION_LINT_BASELINE', {})
+    large = {label.lower() for label in large_models}
+    problems = []
+    for migration in migration_list:
+        last = baseline.get(migration.app_label)
+        if last is not None and migration.name <= last:
+            continue
+        created = {
+            operation.name_lower for operation in migration.operations
+            if isinstance(operation, migrations.CreateModel)
+        }
+        for operation in _database_operations(migration.operations):
+            if migration.atomic and \
+                    isinstance(operation, NON_TRANSACTIONAL_OPERATIONS):
+                problems.append((migration, operation, (
+                    "can't run in a transaction; set atomic = False on the "
+                    'migration'
+                )))
+            model_name = getattr(operation, 'model_name', None)
+            if model_name is None or model_name.lower() in created or \
+                    f'{migration.app_label}.{model_name}'.lower() not in large:
+                continue
+            reason = _locking_reason(operation)
+            if reason is not None:
+                problems.append((migration, operation, reason))
+    return problems
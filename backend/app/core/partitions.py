@@ -0,0 +1,162 @@
+"""
+Monthly range partitioning of the appointment table (PostgreSQL only).
+
+``core_appointment`` is partitioned by ``date``, with one partition per
+month named ``core_appointment_pYYYYMM`` and a default partition catching
+dates no monthly partition covers yet. Postgres only scans the partitions
+matching a query's ``date`` filter, so agenda and report queries never
+touch historical months.
+
+Because the primary key of a partitioned table must include the partition
+key, the table's key is ``(id, date)``. ``id`` stays unique because it is
+still drawn from its sequence, but no database-level foreign key can point
+at appointments: relations to ``Appointment`` must use
+``db_constraint=False``.
+"""
+import datetime
+import gzip
+import io
+
+from django.db import transaction
+
+
+TABLE = 'core_appointment'
+DEFAULT_PARTITION = f'{TABLE}_default'
+LOCK_TIMEOUT = '5s'
+
+
+def month_start(date):
+    """Return the first day of date's month."""
+    return date.replace(day=1)
+
+
+def add_months(date, months):
+    """Return the first day of the month months after date's month."""
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Return the name of the partition holding month."""
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def month_of_partition(name):
+    """Return the month held by a partition, or None for other tables."""
+    prefix = f'{TABLE}_p'
+    suffix = name[len(prefix):]
+    if not name.startswith(prefix) or len(suffix) != 6 or \
+            not suffix.isdigit():
+        return None
+    return datetime.date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def is_supported(connection):
+    """Return whether connection's database supports partitioning."""
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(cursor, table=TABLE):
+    """Return whether table is a partitioned table."""
+    cursor.execute(
+        "SELECT c.relkind = 'p' FROM pg_class c "
+        "WHERE c.oid = to_regclass(%s)",
+        [table],
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def list_partitions(cursor, table=TABLE):
+    """Return the names of table's partitions."""
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+        [table],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def list_detached(cursor, table=TABLE):
+    """Return the names of monthly tables of table that aren't attached."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_class c WHERE c.relkind = 'r' "
+        'AND NOT c.relispartition AND c.relname LIKE %s '
+        'AND pg_table_is_visible(c.oid) ORDER BY c.relname',
+        [f'{table}\\_p%'],
+    )
+    names = [row[0] for row in cursor.fetchall()]
+    return [name for name in names if month_of_partition(name) is not None]
+
+
+def create_partition(connection, month, table=TABLE):
+    """
+    Create the partition for month, unless it already exists.
+
+    Rows for that month already sitting in the default partition are moved
+    into the new partition within the same transaction.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        if name in list_partitions(cursor, table):
+            return False
+        cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        cursor.execute(
+            f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)'
+        )
+        if DEFAULT_PARTITION in list_partitions(cursor, table):
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                f'WHERE date >= %s AND date < %s RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved',
+                [start, end],
+            )
+        cursor.execute(
+            f'ALTER TABLE {table} ATTACH PARTITION {name} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+    return True
+
+
+def ensure_partitions(connection, first, last, table=TABLE):
+    """Create the partitions for every month from first to last."""
+    created = []
+    month = month_start(first)
+    while month <= last:
+        if create_partition(connection, month, table):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partition(connection, month, table=TABLE):
+    """Detach the partition for month, leaving it as a plain table."""
+    name = partition_name(month)
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        if name not in list_partitions(cursor, table):
+            return None
+        # Detaching briefly locks the parent; give up rather than queue
+        # every agenda query behind a long-running report.
+        cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+    return name
+
+
+def dump_table(cursor, name):
+    """Return the rows of table name as gzip-compressed CSV."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+        cursor.copy_expert(f'COPY {name} TO STDOUT WITH CSV HEADER', archive)
+    return buffer.getvalue()
+
+
+def load_table(cursor, name, payload):
+    """Load gzip-compressed CSV produced by dump_table into table name."""
+    with gzip.GzipFile(fileobj=io.BytesIO(payload)) as archive:
+        cursor.copy_expert(f'COPY {name} FROM STDIN WITH CSV HEADER', archive)
@@ -0,0 +1,69 @@
+"""
+Password hashing on a bounded thread pool.
+
+PBKDF2 costs tens of milliseconds of CPU per hash. Running every hash on a
+small dedicated pool caps how many cores login and sign-up can consume at
+once. The calling thread still waits for its hash.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+_executor = None
+
+
+def get_executor():
+    """Return the shared password hashing pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 4),
+            thread_name_prefix='password-hashing',
+        )
+    return _executor
+
+
+def _verify(password, encoded):
+    """Return whether password matches and whether encoded is outdated."""
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False, False
+
+    preferred = hashers.get_hasher('default')
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = hasher.verify(password, encoded)
+    if not is_correct and not hasher_changed and must_update:
+        hasher.harden_runtime(password, encoded)
+    return is_correct, must_update
+
+
+def make_password(password):
+    """Hash password on the pool, blocking the calling thread."""
+    return get_executor().submit(hashers.make_password, password).result()
+
+
+def make_passwords(passwords):
+    """Hash many passwords concurrently on the pool."""
+    return list(get_executor().map(hashers.make_password, passwords))
+
+
+def check_password(password, encoded, setter=None):
+    """
+    Check password on the pool, blocking the calling thread.
+
+    Mirrors ``django.contrib.auth.hashers.check_password``, but calls
+    setter (which saves to the database) from the calling thread so that
+    it runs on the caller's connection and transaction.
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    is_correct, must_update = get_executor().submit(
+        _verify, password, encoded,
+    ).result()
+    if setter and is_correct and must_update:
+        setter(password)
+    return is_correct
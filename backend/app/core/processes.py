@@ -0,0 +1,36 @@
+"""
+Process pools whose workers run Django code.
+
+Workers are spawned rather than forked, so they never inherit the parent's
+database connections, and set Django up when they start. Work is named by
+dotted path: this module is all a worker imports before setup, so it must
+not import models.
+"""
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+from django.utils.module_loading import import_string
+
+
+def _setup():
+    import django
+    django.setup()
+
+
+def _call(path, args):
+    try:
+        return import_string(path)(*args)
+    finally:
+        connections.close_all()
+
+
+def starmap(path, arglists, workers):
+    """Return [path(*args) for args in arglists], run over workers."""
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_setup,
+    ) as pool:
+        return list(pool.map(_call, itertools.repeat(path), arglists))
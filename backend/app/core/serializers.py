@@ -0,0 +1,66 @@
+"""
+Serializers for the core APIs.
+"""
+import asyncio
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.translation import gettext as _
+
+from rest_framework import serializers
+
+from core.models import Job
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for one sub-request of a batch."""
+    method = serializers.ChoiceField(
+        choices=['GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'],
+    )
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, value):
+        """Only allow synchronous API paths, and no nested batches."""
+        if not value.startswith('/api/') or value.startswith('/api/batch/'):
+            raise serializers.ValidationError(
+                _('Only /api/ paths other than /api/batch/ are allowed.')
+            )
+        try:
+            match = resolve(urlsplit(value).path)
+        except Resolver404:
+            # Answered with a 404 in the batch response.
+            return value
+        if asyncio.iscoroutinefunction(match.func):
+            raise serializers.ValidationError(
+                _('Async endpoints are not allowed in a batch.')
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of sub-requests."""
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        """Limit the number of sub-requests."""
+        limit = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                _('A batch may hold at most %(limit)d requests.')
+                % {'limit': limit}
+            )
+        return value
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background jobs."""
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'attempts', 'max_attempts',
+                  'run_after', 'created_at', 'started_at', 'finished_at',
+                  'error']
+        read_only_fields = fields
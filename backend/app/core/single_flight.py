@@ -0,0 +1,204 @@
+"""
+Coalescing of identical concurrent reads (single flight).
+
+At opening time every tablet of a branch asks for the same agenda and
+reports within moments of each other. A view method decorated with
+``single_flight`` runs once for identical requests that arrive while it is
+running: the same view, path, query string, response format and scope
+(by default the user). The first request leads and computes the response;
+the others wait and get a copy of the leader's response bytes. A request
+arriving after the leader is done starts a new flight, so nothing is
+served that was computed before it arrived.
+
+Requests are coalesced within a process. With SINGLE_FLIGHT_CACHE_ALIAS
+set to a cache shared between processes, a leader also takes a lock in
+that cache and shares its response there, so there is one leader across
+every worker. If a leader fails or takes longer than
+SINGLE_FLIGHT_WAIT_SECONDS, its followers compute their own responses.
+"""
+import functools
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+
+WAIT_SECONDS = 10
+POLL_SECONDS = 0.02
+
+
+class FlightStats:
+    """Thread-safe counters of led and coalesced requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.led = 0
+            self.coalesced = 0
+            self.fallbacks = 0
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'led': self.led,
+                'coalesced': self.coalesced,
+                'fallbacks': self.fallbacks,
+            }
+
+
+stats = FlightStats()
+
+
+class _Flight:
+    """A computation in progress, and its result once done."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def by_user(request):
+    """Scope responses to the requesting user."""
+    return f'user:{request.user.pk}'
+
+
+def shared(request):
+    """Share responses between every user allowed to see them."""
+    return 'shared'
+
+
+def _wait_seconds():
+    return getattr(settings, 'SINGLE_FLIGHT_WAIT_SECONDS', WAIT_SECONDS)
+
+
+def _shared_cache():
+    alias = getattr(settings, 'SINGLE_FLIGHT_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _run_shared(key, compute):
+    """Run compute once across processes, through the shared cache."""
+    cache = _shared_cache()
+    if cache is None:
+        return compute()
+    lock_key = f'single-flight:{key}'
+    flight_id = uuid.uuid4().hex
+    timeout = _wait_seconds()
+    if cache.add(lock_key, flight_id, timeout=timeout):
+        try:
+            result = compute()
+            if result is not None:
+                cache.set(f'{lock_key}:{flight_id}', result, timeout=timeout)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    # Another process leads; its result is stored under its flight id.
+    leader_id = cache.get(lock_key)
+    deadline = time.monotonic() + timeout
+    while leader_id is not None and time.monotonic() < deadline:
+        result = cache.get(f'{lock_key}:{leader_id}')
+        if result is not None:
+            stats.count('coalesced')
+            return result
+        if cache.get(lock_key) != leader_id:
+            break
+        time.sleep(POLL_SECONDS)
+    stats.count('fallbacks')
+    return compute()
+
+
+def run(key, compute):
+    """
+    Return compute() for the first of concurrent callers with key.
+
+    The others wait for and return the same result, or, if the leader
+    fails or doesn't finish in time, call compute() themselves.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        if flight.done.wait(_wait_seconds()) and flight.result is not None:
+            stats.count('coalesced')
+            return flight.result
+        stats.count('fallbacks')
+        return compute()
+
+    stats.count('led')
+    try:
+        flight.result = _run_shared(key, compute)
+        return flight.result
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _request_key(view, request, scope):
+    query = sorted(request.query_params.lists())
+    parts = repr((
+        f'{view.__module__}.{view.__class__.__name__}',
+        request.method,
+        request.path,
+        query,
+        getattr(request, 'accepted_media_type', None),
+        scope(request),
+    ))
+    return hashlib.sha1(parts.encode()).hexdigest()
+
+
+def single_flight(scope=by_user):
+    """
+    Coalesce concurrent identical requests to a DRF view method.
+
+    scope(request) returns who may share a response; use ``shared`` when
+    it doesn't depend on the user.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            own = {}
+
+            def compute():
+                response = method(view, request, *args, **kwargs)
+                if isinstance(response, Response):
+                    response = view.finalize_response(
+                        request, response, *args, **kwargs,
+                    )
+                    response.render()
+                own['response'] = response
+                if response.streaming or response.status_code >= 500:
+                    return None
+                return (
+                    response.status_code,
+                    response['Content-Type'],
+                    response.content,
+                )
+
+            result = run(_request_key(view, request, scope), compute)
+            if 'response' in own:
+                return own['response']
+            status, content_type, content = result
+            return HttpResponse(content, status=status,
+                                content_type=content_type)
+        return wrapper
+    return decorator
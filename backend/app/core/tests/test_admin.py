@@ -1,11 +1,19 @@
 """
 Tests for the Django admin modifications.
 """
+import datetime
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.test import Client
 
+from core import admin, models
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -45,3 +53,127 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class LargeTableAdminTests(TestCase):
+    """Tests for the admin pages of large tables."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        # create_superuser leaves superusers out of the admin site.
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+        self.client.force_login(self.admin_user)
+        self.branch = models.Branch.objects.create(name='Centro')
+        self.service = models.Service.objects.create(
+            name='Haircut', price='10',
+        )
+        self.technician = models.Technician.objects.get(user=self.admin_user)
+
+    def create_appointments(self, count, date):
+        for i in range(count):
+            models.Appointment.objects.create(
+                date=date,
+                time='10:00',
+                branch=self.branch,
+                service=self.service,
+                technician=self.technician,
+                client=models.Client.objects.create(
+                    name=f'Client {i}',
+                    last_name='Doe',
+                    phone=f'55500000{i:02}',
+                    email=f'client{i}@example.com',
+                    birthday='1990-01-01',
+                ),
+            )
+
+    def test_appointments_open_on_current_month(self):
+        """Test the appointment list starts at the current month."""
+        url = reverse('admin:core_appointment_changelist')
+        res = self.client.get(url)
+
+        today = datetime.date.today()
+        self.assertRedirects(
+            res,
+            f'{url}?date__year={today.year}&date__month={today.month}',
+            fetch_redirect_response=False,
+        )
+
+    def test_appointments_all_dates(self):
+        """Test "All dates" and searches within the list aren't redirected."""
+        url = reverse('admin:core_appointment_changelist')
+
+        res = self.client.get(url, HTTP_REFERER=f'http://testserver{url}')
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.get(url, {'q': 'Doe'})
+        self.assertEqual(res.status_code, 200)
+
+    def test_appointment_list_queries(self):
+        """Test the appointment list doesn't query once per row."""
+        today = datetime.date.today()
+        url = reverse('admin:core_appointment_changelist')
+        params = {'date__year': today.year, 'date__month': today.month}
+        self.create_appointments(2, today)
+        self.client.get(url, params)
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url, params)
+        self.create_appointments(8, today)
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(url, params)
+
+        self.assertContains(res, 'Client 7 Doe')
+        self.assertEqual(len(many), len(few))
+
+    def test_client_search_by_contact(self):
+        """Test clients are found by email, in any case, or phone."""
+        self.create_appointments(3, datetime.date.today())
+        url = reverse('admin:core_client_changelist')
+
+        res = self.client.get(url, {'q': 'CLIENT1@example.com'})
+        self.assertContains(res, 'client1@example.com')
+        self.assertNotContains(res, 'client2@example.com')
+
+        res = self.client.get(url, {'q': '555 000 0002'})
+        self.assertContains(res, 'client2@example.com')
+        self.assertNotContains(res, 'client1@example.com')
+
+        models.Client.objects.create(
+            name='Juan', last_name='Doe', email='juan@example.com',
+            birthday='1990-01-01',
+        )
+        res = self.client.get(url, {'q': 'Juan'})
+        self.assertNotContains(res, 'juan@example.com')
+
+    def test_technician_list(self):
+        """Test the technician list renders."""
+        res = self.client.get(reverse('admin:core_technician_changelist'))
+
+        self.assertContains(res, 'admin@example.com')
+
+    def test_approximate_count(self):
+        """Test large results are counted from the planner's estimate."""
+        queryset = models.Client.objects.order_by('id')
+        paginator = admin.ApproximateCountPaginator(queryset, 10)
+        self.create_appointments(3, datetime.date.today())
+
+        with patch.object(paginator, '_estimate', return_value=50000):
+            self.assertEqual(paginator.count, 50000)
+
+        paginator = admin.ApproximateCountPaginator(queryset, 10)
+        with patch.object(paginator, '_estimate', return_value=40):
+            self.assertEqual(paginator.count, 3)
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL')
+    def test_planner_estimate(self):
+        """Test the estimate comes from EXPLAIN."""
+        paginator = admin.ApproximateCountPaginator(
+            models.Client.objects.filter(phone='5550000001'), 10,
+        )
+
+        self.assertIsInstance(paginator._estimate(), int)
@@ -0,0 +1,137 @@
+"""
+Tests for admission control.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.admission import AdmissionController
+
+
+APPOINTMENTS_URL = reverse('salon:appointment-list')
+ANALYTICS_URL = reverse('salon:analytics')
+SCHEMA_URL = reverse('api-schema')
+HEALTHZ_URL = reverse('healthz')
+
+
+class Clock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def controller(**kwargs):
+    return AdmissionController(
+        classes=settings.ADMISSION_CLASSES,
+        rules=settings.ADMISSION_RULES,
+        **kwargs,
+    )
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    """Test classifying requests and deciding what to shed."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.controller = controller(max_in_flight=10, window=10,
+                                     clock=self.clock)
+
+    def test_classify(self):
+        """Test requests are classed by path."""
+        self.assertEqual(self.controller.classify(APPOINTMENTS_URL), 'high')
+        self.assertEqual(
+            self.controller.classify(f'{APPOINTMENTS_URL}agenda/'), 'high',
+        )
+        self.assertEqual(self.controller.classify(ANALYTICS_URL), 'low')
+        self.assertEqual(self.controller.classify(SCHEMA_URL), 'low')
+        self.assertEqual(
+            self.controller.classify('/api/salon/clients/'), 'normal',
+        )
+
+    def test_shed_by_in_flight(self):
+        """Test low priority is shed first as requests pile up."""
+        for _ in range(6):
+            self.assertTrue(self.controller.admit('normal'))
+
+        self.assertFalse(self.controller.admit('low'))
+        self.assertTrue(self.controller.admit('normal'))
+        for _ in range(5):
+            self.assertTrue(self.controller.admit('high'))
+        self.assertFalse(self.controller.admit('normal'))
+
+        for _ in range(7):
+            self.controller.release('normal')
+        self.assertTrue(self.controller.admit('low'))
+
+    def test_shed_by_db_latency(self):
+        """Test slow queries shed low priority until they age out."""
+        for _ in range(20):
+            self.controller.record_query('high', 0.04)
+
+        self.assertFalse(self.controller.admit('low'))
+        self.assertTrue(self.controller.admit('normal'))
+        self.assertTrue(self.controller.admit('high'))
+
+        self.clock.now += 10
+        self.assertTrue(self.controller.admit('low'))
+
+    def test_stats(self):
+        """Test shed requests are counted per class."""
+        self.controller.record_query('low', 2)
+        self.controller.admit('low')
+        self.controller.admit('high')
+
+        stats = self.controller.stats()
+
+        self.assertEqual(stats['load'], 2)
+        self.assertEqual(stats['classes']['low']['shed'], 1)
+        self.assertEqual(stats['classes']['high']['admitted'], 1)
+        self.assertEqual(stats['classes']['low']['db_latency_ms'], 2000)
+
+
+class AdmissionControlMiddlewareTests(TestCase):
+    """Test the middleware answers shed requests with 503."""
+
+    def setUp(self):
+        self.controller = controller()
+        patcher = patch('core.admission.get_controller',
+                        return_value=self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        ))
+
+    def test_overloaded(self):
+        """Test reports are shed while bookings are still served."""
+        self.controller.record_query('high', 1)
+
+        res = self.client.get(ANALYTICS_URL, {'report': 'revenue'})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '5')
+
+        res = self.client.get(APPOINTMENTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        stats = self.client.get(HEALTHZ_URL).json()['admission']
+        self.assertEqual(stats['classes']['low']['shed'], 1)
+        self.assertEqual(stats['in_flight'], 1)
+
+    def test_queries_timed(self):
+        """Test the queries of admitted requests are timed by class."""
+        self.client.get(APPOINTMENTS_URL)
+
+        self.assertIsNotNone(self.controller.classes['high'].sampled_at)
+        self.assertIsNone(self.controller.classes['low'].sampled_at)
+        self.assertEqual(self.controller.in_flight, 0)
@@ -0,0 +1,141 @@
+"""
+Tests for the batch API.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.admission import AdmissionController
+from core.models import Branch
+
+
+BATCH_URL = reverse('batch')
+
+
+class PublicBatchApiTests(TestCase):
+    """Test unauthenticated batch requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to call the batch API."""
+        res = APIClient().post(BATCH_URL, {'requests': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Test authenticated batch requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+            name='Test Name',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_batch_runs_in_order(self):
+        """Test writes and reads run in order with the batch user."""
+        payload = {'requests': [
+            {'method': 'POST', 'path': '/api/salon/branches/',
+             'body': {'name': 'Centro'}},
+            {'method': 'GET', 'path': '/api/salon/branches/'},
+            {'method': 'GET', 'path': '/api/user/me/'},
+            {'method': 'GET', 'path': '/api/nothing/'},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.data['responses']
+        self.assertEqual([r['status'] for r in responses],
+                         [201, 200, 200, 404])
+        self.assertEqual(responses[1]['body'][0]['name'], 'Centro')
+        self.assertEqual(responses[2]['body']['email'], self.user.email)
+        self.assertTrue(Branch.objects.filter(name='Centro').exists())
+
+    def test_parallel_reads(self):
+        """Test independent reads can run in parallel."""
+        payload = {
+            'parallel': True,
+            'requests': [{'method': 'GET', 'path': '/api/user/me/'}] * 3,
+        }
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(
+            [r['body']['name'] for r in res.data['responses']],
+            ['Test Name'] * 3,
+        )
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_request_count_limit(self):
+        """Test batches over the request limit are rejected."""
+        payload = {
+            'requests': [{'method': 'GET', 'path': '/api/user/me/'}] * 3,
+        }
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BATCH_MAX_BYTES=100)
+    def test_payload_limit(self):
+        """Test batches over the payload limit are rejected."""
+        payload = {'requests': [
+            {'method': 'POST', 'path': '/api/salon/branches/',
+             'body': {'name': 'x' * 200}},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_nested_batch_rejected(self):
+        """Test a batch can't contain another batch."""
+        payload = {'requests': [{'method': 'POST', 'path': '/api/batch/'}]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_view_rejected(self):
+        """Test a batch can't call an async view."""
+        payload = {'requests': [
+            {'method': 'GET', 'path': '/api/salon/async/agenda/?branch=1'},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sub_requests_admitted(self):
+        """Test low priority sub-requests are shed under load."""
+        controller = AdmissionController(
+            classes=settings.ADMISSION_CLASSES,
+            rules=settings.ADMISSION_RULES,
+        )
+        for _ in range(20):
+            controller.record_query('high', 0.04)
+        payload = {'requests': [
+            {'method': 'GET', 'path': '/api/salon/analytics/'},
+            {'method': 'GET', 'path': '/api/user/me/'},
+        ]}
+
+        with patch('core.admission.get_controller',
+                   return_value=controller):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in res.data['responses']],
+                         [503, 200])
+        stats = controller.stats()
+        self.assertEqual(stats['classes']['low']['shed'], 1)
+        self.assertEqual(stats['in_flight'], 0)
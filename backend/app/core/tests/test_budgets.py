@@ -0,0 +1,89 @@
+"""
+Tests for request time budgets.
+"""
+import time
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import budgets
+from core.models import Appointment
+from salon.views import AnalyticsView, AppointmentViewSet
+
+
+APPOINTMENTS_URL = reverse('salon:appointment-list')
+
+
+class TimeBudgetTests(TestCase):
+    """Test views are held to their budgets."""
+
+    def test_budget_per_action(self):
+        """Test actions and views can have budgets of their own."""
+        request = APIRequestFactory().get('/')
+
+        self.assertEqual(
+            AppointmentViewSet(action='agenda').get_time_budget(request), 2,
+        )
+        self.assertEqual(
+            AppointmentViewSet(action='list').get_time_budget(request), 10,
+        )
+        self.assertEqual(AnalyticsView().get_time_budget(request), 30)
+
+    def test_no_query_after_budget(self):
+        """Test queries don't start once the budget is spent."""
+        with self.assertRaises(budgets.TimeBudgetExceeded):
+            with budgets.limit(0):
+                Appointment.objects.count()
+
+        self.assertEqual(Appointment.objects.count(), 0)
+
+    @override_settings(API_TIME_BUDGET_SECONDS=0)
+    def test_budget_exceeded_response(self):
+        """Test a request over its budget gets a clear 503."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        ))
+
+        res = client.get(APPOINTMENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('0s budget', res.data['detail'])
+        self.assertEqual(res.data['detail'].code, 'time_budget_exceeded')
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Statement timeouts require PostgreSQL.')
+class StatementTimeoutTests(TransactionTestCase):
+    """Test PostgreSQL cancels queries running over the budget."""
+
+    def show_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            return cursor.fetchone()[0]
+
+    def test_query_cancelled(self):
+        """Test a slow query is cancelled, logged with its plan."""
+        default = self.show_timeout()
+        start = time.monotonic()
+
+        with self.assertLogs('core.budgets', 'WARNING') as logs:
+            with self.assertRaises(budgets.TimeBudgetExceeded):
+                with budgets.limit(0.2, name='test'):
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT pg_sleep(%s)', [2])
+
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertIn('pg_sleep', logs.output[0])
+        self.assertIn('Result', logs.output[0])
+        self.assertEqual(self.show_timeout(), default)
@@ -0,0 +1,127 @@
+"""
+Tests for read replica routing.
+"""
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from rest_framework.authtoken.models import Token
+
+from core import db_router
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Branch, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+@patch('core.db_router.replica_lag', return_value=0.0)
+class ReplicaRouterTests(TransactionTestCase):
+    """Test the database router."""
+
+    def setUp(self):
+        cache.clear()
+        db_router.reset_health()
+        self.router = db_router.ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self, patched_lag):
+        """Test reads outside a read-only scope use the primary."""
+        self.assertEqual(self.router.db_for_read(Branch), 'default')
+
+    def test_read_only_scope_uses_replica(self, patched_lag):
+        """Test reads in a read-only scope use a replica."""
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Branch), 'replica')
+
+        with db_router.use_primary():
+            self.assertEqual(self.router.db_for_read(Branch), 'default')
+
+    def test_auth_reads_use_primary(self, patched_lag):
+        """Test users and tokens are read from the primary."""
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Token), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_write_pins_scope_to_primary(self, patched_lag):
+        """Test reads after a write in the same scope use the primary."""
+        with db_router.read_from_replica() as state:
+            self.assertEqual(self.router.db_for_write(Branch), 'default')
+
+            self.assertTrue(state.wrote)
+            self.assertEqual(self.router.db_for_read(Branch), 'default')
+
+    def test_transaction_uses_primary(self, patched_lag):
+        """Test reads inside a transaction use the primary."""
+        with db_router.read_from_replica(), transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Branch), 'default')
+
+    def test_lagging_replica_skipped(self, patched_lag):
+        """Test a replica past the allowed lag is not used."""
+        patched_lag.return_value = 60.0
+
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Branch), 'default')
+
+    def test_health_check_cached(self, patched_lag):
+        """Test the lag is checked once per interval."""
+        for _ in range(3):
+            with db_router.read_from_replica():
+                self.router.db_for_read(Branch)
+
+        patched_lag.assert_called_once_with('replica')
+
+    def test_replicas_not_migrated(self, patched_lag):
+        """Test migrations only run against the primary."""
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+@patch('core.db_router.replica_lag', return_value=0.0)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    """Test requests are routed with read-your-writes stickiness."""
+
+    def setUp(self):
+        cache.clear()
+        db_router.reset_health()
+        self.factory = RequestFactory()
+        self.routes = []
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.routes.append(db_router.ReplicaRouter().db_for_read(Branch))
+        return HttpResponse()
+
+    def request(self, method, token):
+        request = getattr(self.factory, method)(
+            '/api/salon/branches/', HTTP_AUTHORIZATION=f'Token {token}',
+        )
+        self.middleware(request)
+
+    def test_safe_request_uses_replica(self, patched_lag):
+        """Test GET requests read from a replica."""
+        self.request('get', 'a')
+
+        self.assertEqual(self.routes, ['replica'])
+
+    def test_write_makes_client_sticky(self, patched_lag):
+        """Test a client reads from the primary right after writing."""
+        self.request('post', 'a')
+        self.request('get', 'a')
+        self.request('get', 'b')
+
+        self.assertEqual(self.routes, ['default', 'default', 'replica'])
+
+    def test_stickiness_expires(self, patched_lag):
+        """Test the client returns to the replica after the window."""
+        self.request('post', 'a')
+        cache.clear()
+        self.request('get', 'a')
+
+        self.assertEqual(self.routes[-1], 'replica')
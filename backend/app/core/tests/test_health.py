@@ -0,0 +1,39 @@
+"""
+Tests for the health check endpoints.
+"""
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthCheckTests(TestCase):
+    """Test the liveness and readiness probes."""
+
+    def test_healthz(self):
+        """Test the liveness probe answers."""
+        res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['status'], 'ok')
+
+    def test_readyz_reports_latency(self):
+        """Test the readiness probe measures the database round trip."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(res.json()['latency_ms']['default'])
+
+    @patch('core.views._round_trip', return_value=None)
+    def test_readyz_database_down(self, patched_round_trip):
+        """Test the readiness probe fails without a database."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['status'], 'unavailable')
@@ -0,0 +1,217 @@
+"""
+Tests for background jobs.
+"""
+import datetime
+import threading
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.management.commands import run_worker
+from core.models import Job
+
+
+calls = []
+
+
+@jobs.task('tests.add')
+def add(a, b):
+    calls.append((a, b))
+    return {'sum': a + b}
+
+
+@jobs.task('tests.fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+def detail_url(job_id):
+    """Create and return a job detail URL."""
+    return reverse('job-detail', args=[job_id])
+
+
+def result_url(job_id):
+    """Create and return a job result URL."""
+    return reverse('job-result', args=[job_id])
+
+
+class JobTests(TestCase):
+    """Test queueing and running jobs."""
+
+    def test_enqueue_unknown_task(self):
+        """Test queueing a task nobody registered fails."""
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue('tests.missing')
+
+    def test_run_job(self):
+        """Test a job runs and stores its result."""
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+
+        self.assertEqual(jobs.run_pending(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'sum': 3})
+        self.assertEqual(job.attempts, 1)
+
+    def test_delayed_job_not_claimed(self):
+        """Test jobs aren't claimed before run_after."""
+        jobs.enqueue('tests.add', {'a': 1, 'b': 2}, delay=60)
+
+        self.assertIsNone(jobs.claim())
+
+    def test_failed_job_retried_with_backoff(self):
+        """Test a failing job is retried later, then given up on."""
+        job = jobs.enqueue('tests.fail', max_attempts=2)
+
+        jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('RuntimeError: boom', job.error)
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff_grows(self):
+        """Test retries wait longer after each attempt."""
+        self.assertLessEqual(jobs.backoff(1), 10)
+        self.assertGreaterEqual(jobs.backoff(4), 40)
+
+    def test_stale_job_requeued(self):
+        """Test a job abandoned by its worker is queued again."""
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        jobs.claim()
+        Job.objects.filter(id=job.id).update(
+            started_at=timezone.now() - datetime.timedelta(hours=1),
+        )
+
+        with self.settings(JOBS_LEASE_SECONDS=60):
+            self.assertEqual(jobs.requeue_stale(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+    def test_stale_job_out_of_attempts_failed(self):
+        """Test a stale job on its last attempt fails instead."""
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2}, max_attempts=1)
+        jobs.claim()
+        Job.objects.filter(id=job.id).update(
+            started_at=timezone.now() - datetime.timedelta(hours=1),
+        )
+
+        with self.settings(JOBS_LEASE_SECONDS=60):
+            self.assertEqual(jobs.requeue_stale(), 0)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+
+class RunWorkerTests(TransactionTestCase):
+    """Test the run_worker command."""
+
+    def test_worker_drains_queue(self):
+        """Test threads run every queued job exactly once."""
+        # SQLite locks whole tables, so only Postgres runs jobs in parallel.
+        concurrency = 3 if connection.vendor == 'postgresql' else 1
+        calls.clear()
+        for number in range(6):
+            jobs.enqueue('tests.add', {'a': number, 'b': 1})
+
+        call_command(
+            'run_worker',
+            concurrency=concurrency,
+            once=True,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 6,
+        )
+        self.assertEqual(sorted(calls), [(n, 1) for n in range(6)])
+
+    @override_settings(JOBS_LEASE_SECONDS=60,
+                       JOBS_REQUEUE_INTERVAL_SECONDS=0.1)
+    def test_worker_requeues_while_running(self):
+        """Test a running worker takes back jobs of dead workers."""
+        stop = threading.Event()
+        worker = threading.Thread(target=run_worker._work,
+                                  args=(stop, 0.05, False))
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(stop.set)
+        time.sleep(0.2)
+
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2}, delay=3600)
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING,
+            attempts=1,
+            started_at=timezone.now() - datetime.timedelta(hours=1),
+        )
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            job.refresh_from_db()
+            if job.status == Job.SUCCEEDED:
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+
+
+class JobApiTests(TestCase):
+    """Test the job status endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_job_status(self):
+        """Test a user can follow their job."""
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2}, user=self.user)
+
+        res = self.client.get(detail_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+
+    def test_result_once_done(self):
+        """Test the result is served once the job succeeded."""
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2}, user=self.user)
+
+        res = self.client.get(result_url(job.id))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        jobs.run_pending()
+        res = self.client.get(result_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'sum': 3})
+
+    def test_other_users_jobs_hidden(self):
+        """Test users can't see jobs they didn't start."""
+        job = jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+
+        res = self.client.get(detail_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,232 @@
+"""
+Tests for the online schema change toolkit.
+"""
+from io import StringIO
+from unittest import skipUnless
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, migrations, models
+from django.db.migrations.state import ProjectState
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core import online_schema
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Payment,
+    Service,
+    Technician,
+)
+
+
+POSTGRES = connection.vendor == 'postgresql'
+
+
+def migration(name, operations, atomic=True):
+    """Return a core migration with operations."""
+    instance = migrations.Migration(name, 'core')
+    instance.operations = operations
+    instance.atomic = atomic
+    return instance
+
+
+class LintTests(SimpleTestCase):
+    """Test rejecting migrations that lock large tables."""
+
+    def lint(self, *migration_list):
+        return [
+            reason for _, _, reason in online_schema.lint(
+                migration_list,
+                large_models=['core.Appointment'],
+                baseline={'core': '0002_initial_tables'},
+            )
+        ]
+
+    def test_locking_operations_rejected(self):
+        """Test plain index, constraint and NOT NULL column changes."""
+        reasons = self.lint(migration('0015_slow', [
+            migrations.AddIndex(
+                'appointment', models.Index(fields=['tip'], name='tip_idx'),
+            ),
+            migrations.AddConstraint('appointment', models.CheckConstraint(
+                check=models.Q(tip__gte=0), name='tip_positive',
+            )),
+            migrations.AddField(
+                'appointment', 'notes', models.TextField(default=''),
+            ),
+        ]))
+
+        self.assertEqual(len(reasons), 3)
+        self.assertIn('AddIndexConcurrently', reasons[0])
+        self.assertIn('AddConstraintNotValid', reasons[1])
+        self.assertIn('NOT NULL', reasons[2])
+
+    def test_online_operations_accepted(self):
+        """Test the online operations, small tables and the baseline pass."""
+        index = models.Index(fields=['tip'], name='tip_idx')
+        self.assertEqual(self.lint(
+            migration('0015_fast', [
+                online_schema.AddIndexConcurrently('appointment', index),
+                migrations.AddField(
+                    'appointment', 'notes', models.TextField(null=True),
+                ),
+                online_schema.BackfillField('appointment', 'notes', ''),
+                migrations.AddIndex('branch', index),
+            ], atomic=False),
+            migration('0002_initial_tables', [
+                migrations.AddIndex('appointment', index),
+            ]),
+        ), [])
+
+    def test_new_models_skipped(self):
+        """Test changes to a model created in the same migration pass."""
+        self.assertEqual(self.lint(migration('0015_notes', [
+            migrations.CreateModel('Appointment', [
+                ('id', models.BigAutoField(primary_key=True)),
+                ('tip', models.IntegerField()),
+            ]),
+            migrations.AddConstraint('appointment', models.UniqueConstraint(
+                fields=['tip'], name='unique_tip',
+            )),
+        ])), [])
+
+    def test_separate_database_and_state(self):
+        """Test the database side of SeparateDatabaseAndState is linted."""
+        index = models.Index(fields=['tip'], name='tip_idx')
+
+        reasons = self.lint(migration('0015_state', [
+            migrations.SeparateDatabaseAndState(
+                database_operations=[
+                    migrations.AddIndex('appointment', index),
+                ],
+            ),
+        ]))
+
+        self.assertEqual(len(reasons), 1)
+        self.assertIn('AddIndexConcurrently', reasons[0])
+
+    def test_non_atomic_required(self):
+        """Test concurrent builds must be in non-atomic migrations."""
+        index = models.Index(fields=['tip'], name='tip_idx')
+
+        reasons = self.lint(migration('0015_fast', [
+            online_schema.AddIndexConcurrently('appointment', index),
+        ]))
+
+        self.assertIn('atomic = False', reasons[0])
+
+    def test_repository_migrations_pass(self):
+        """Test the project's own migrations pass the lint."""
+        out = StringIO()
+        call_command('lint_migrations', stdout=out)
+
+        self.assertIn('Migrations are safe.', out.getvalue())
+
+
+class BackfillTests(TestCase):
+    """Test filling columns in batches."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        technician = Technician.objects.get(user=user)
+        branch = Branch.objects.create(name='Centro')
+        service = Service.objects.create(name='Corte', price='10')
+        client = Client.objects.create(
+            name='John', last_name='Doe', phone='1234567890',
+            birthday='1990-01-01',
+        )
+        self.cash = Payment.objects.create(format_code='CA',
+                                           description='Cash')
+        for _ in range(5):
+            Appointment.objects.create(
+                date='2024-05-06', time='10:00', branch=branch,
+                client=client, service=service, technician=technician,
+            )
+        self.card = Appointment.objects.order_by('id').last()
+        self.card.payment = Payment.objects.create(format_code='CC',
+                                                   description='Card')
+        self.card.save()
+
+    def test_backfill(self):
+        """Test only NULL rows are filled, a batch at a time."""
+        calls = []
+
+        updated = online_schema.backfill(
+            Appointment, 'payment', self.cash.id, batch_size=2, pause=0,
+            progress=lambda *args: calls.append(args),
+        )
+
+        self.assertEqual(updated, 4)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[-1][1], calls[-1][2])
+        self.assertEqual(
+            Appointment.objects.filter(payment=self.cash).count(), 4,
+        )
+        self.card.refresh_from_db()
+        self.assertNotEqual(self.card.payment, self.cash)
+
+    def test_backfill_command(self):
+        """Test the command fills a column with a value."""
+        out = StringIO()
+        call_command('backfill', 'core.Appointment', 'payment',
+                     value=str(self.cash.id), pause=0, stdout=out)
+
+        self.assertIn('4 rows of core.Appointment backfilled',
+                      out.getvalue())
+
+    def test_backfill_command_needs_value(self):
+        """Test a column without a default needs --value."""
+        with self.assertRaises(CommandError):
+            call_command('backfill', 'core.Appointment', 'payment')
+
+
+@skipUnless(POSTGRES, 'Concurrent index builds require PostgreSQL.')
+class AddIndexConcurrentlyTests(TransactionTestCase):
+    """Test building indexes on the partitioned appointment table."""
+
+    index = models.Index(fields=['tip'], name='core_appt_tip_test_idx')
+
+    def run_operation(self, operation, backwards=False):
+        state = ProjectState.from_apps(apps)
+        new_state = state.clone()
+        operation.state_forwards('core', new_state)
+        with connection.schema_editor(atomic=False) as editor:
+            if backwards:
+                operation.database_backwards('core', editor, new_state,
+                                             state)
+            else:
+                operation.database_forwards('core', editor, state,
+                                            new_state)
+
+    def indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT i.relname, x.indisvalid FROM pg_index x '
+                'JOIN pg_class i ON i.oid = x.indexrelid '
+                "WHERE i.relname LIKE 'core_appt_tip_test_idx%%'"
+            )
+            return dict(cursor.fetchall())
+
+    def test_partitioned_index(self):
+        """Test each partition is indexed and the parent index is valid."""
+        operation = online_schema.AddIndexConcurrently(
+            'appointment', self.index,
+        )
+
+        self.run_operation(operation)
+        # Running again (as after an interrupted build) is harmless.
+        self.run_operation(operation)
+
+        indexes = self.indexes()
+        self.assertTrue(indexes.pop('core_appt_tip_test_idx'))
+        self.assertTrue(indexes)
+        self.assertTrue(all(indexes.values()))
+
+        self.run_operation(operation, backwards=True)
+        self.assertEqual(self.indexes(), {})
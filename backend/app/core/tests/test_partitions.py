@@ -0,0 +1,228 @@
+"""
+Tests for appointment partitioning.
+"""
+import datetime
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core import partitions
+from core.models import (
+    Appointment,
+    AppointmentArchive,
+    Branch,
+    Client,
+    ClientStats,
+    Service,
+    Technician,
+)
+
+
+POSTGRES = connection.vendor == 'postgresql'
+
+
+def create_appointment(date):
+    """Create and return a sample appointment on date."""
+    user = get_user_model().objects.create_user(
+        email=f'tech{date:%Y%m%d}@example.com',
+        password='test123',
+    )
+    return Appointment.objects.create(
+        date=date,
+        time='10:00:00',
+        branch=Branch.objects.create(name='Centro'),
+        client=Client.objects.create(
+            name='John',
+            last_name='Doe',
+            phone='1234567890',
+            email='john.doe@example.com',
+            birthday='1990-01-01',
+        ),
+        service=Service.objects.create(name='Haircut', price='100.00'),
+        technician=Technician.objects.get(user=user),
+    )
+
+
+class PartitionHelperTests(SimpleTestCase):
+    """Test the partition naming helpers."""
+
+    def test_add_months(self):
+        """Test months roll over year boundaries."""
+        date = datetime.date(2024, 11, 17)
+
+        self.assertEqual(
+            partitions.add_months(date, 2), datetime.date(2025, 1, 1),
+        )
+        self.assertEqual(
+            partitions.add_months(date, -11), datetime.date(2023, 12, 1),
+        )
+
+    def test_partition_name_round_trip(self):
+        """Test partition names map back to their month."""
+        month = datetime.date(2024, 3, 1)
+        name = partitions.partition_name(month)
+
+        self.assertEqual(name, 'core_appointment_p202403')
+        self.assertEqual(partitions.month_of_partition(name), month)
+        self.assertIsNone(
+            partitions.month_of_partition(partitions.DEFAULT_PARTITION),
+        )
+
+
+@skipUnless(not POSTGRES, 'Tests the fallback on other databases.')
+class UnsupportedDatabaseTests(TestCase):
+    """Test the command outside PostgreSQL."""
+
+    def test_command_requires_postgres(self):
+        """Test the command refuses to run."""
+        with self.assertRaises(CommandError):
+            call_command('manage_partitions')
+
+
+@skipUnless(POSTGRES, 'Partitioning requires PostgreSQL.')
+class PartitionTests(TestCase):
+    """Test partition maintenance on PostgreSQL."""
+
+    def partitions(self):
+        with connection.cursor() as cursor:
+            return partitions.list_partitions(cursor)
+
+    def test_table_is_partitioned(self):
+        """Test the migration partitioned the appointment table."""
+        with connection.cursor() as cursor:
+            self.assertTrue(partitions.is_partitioned(cursor))
+        self.assertIn(partitions.DEFAULT_PARTITION, self.partitions())
+
+    def test_create_partition_moves_default_rows(self):
+        """Test rows in the default partition move to a new partition."""
+        month = datetime.date(2040, 6, 1)
+        appointment = create_appointment(month)
+
+        created = partitions.ensure_partitions(
+            connection, month, partitions.add_months(month, 1),
+        )
+
+        self.assertEqual(created, [
+            'core_appointment_p204006', 'core_appointment_p204007',
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM core_appointment_p204006 WHERE id = %s',
+                [appointment.id],
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(
+            partitions.ensure_partitions(connection, month, month), [],
+        )
+
+    def test_date_filter_prunes_partitions(self):
+        """Test a date filter scans a single partition."""
+        for month in (datetime.date(2024, 4, 1), datetime.date(2024, 5, 1)):
+            partitions.create_partition(connection, month)
+        queryset = Appointment.objects.filter(date='2024-05-01')
+
+        plan = queryset.explain()
+
+        self.assertIn('core_appointment_p202405', plan)
+        self.assertNotIn('core_appointment_p202404', plan)
+        self.assertNotIn(partitions.DEFAULT_PARTITION, plan)
+
+    def test_archive_and_restore(self):
+        """Test old months are archived and can be restored."""
+        month = datetime.date(2001, 1, 1)
+        partitions.create_partition(connection, month)
+        appointment = create_appointment(month)
+        with connection.cursor() as cursor:
+            # Run the deferred foreign key checks, as a commit would.
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        call_command(
+            'manage_partitions', retain_months=12 * 20, stdout=StringIO(),
+        )
+
+        self.assertNotIn('core_appointment_p200101', self.partitions())
+        self.assertFalse(Appointment.objects.filter(date=month).exists())
+        archive = AppointmentArchive.objects.get(month=month)
+        self.assertEqual(archive.row_count, 1)
+
+        call_command(
+            'manage_partitions', restore='2001-01', stdout=StringIO(),
+        )
+
+        self.assertIn('core_appointment_p200101', self.partitions())
+        self.assertTrue(
+            Appointment.objects.filter(id=appointment.id).exists(),
+        )
+        self.assertFalse(AppointmentArchive.objects.exists())
+
+    def test_archived_visits_kept_in_stats(self):
+        """Test client totals survive their months being archived."""
+        month = datetime.date(2001, 3, 1)
+        partitions.create_partition(connection, month)
+        appointment = create_appointment(month)
+        Appointment.objects.filter(id=appointment.id).update(
+            final_income='30.00',
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        call_command(
+            'manage_partitions', retain_months=12 * 20, stdout=StringIO(),
+        )
+
+        stats = ClientStats.objects.get(client=appointment.client)
+        self.assertEqual(stats.visit_count, 1)
+        self.assertEqual(stats.total_spend, 30)
+        self.assertEqual(stats.archived_visits, 1)
+        self.assertEqual(stats.last_visit, month)
+
+        call_command(
+            'manage_partitions', restore='2001-03', stdout=StringIO(),
+        )
+
+        stats.refresh_from_db()
+        self.assertEqual(stats.visit_count, 1)
+        self.assertEqual(stats.archived_visits, 0)
+        self.assertEqual(stats.archived_spend, 0)
+
+    def test_detach_only(self):
+        """Test detached months are kept as plain tables."""
+        month = datetime.date(2001, 2, 1)
+        partitions.create_partition(connection, month)
+
+        call_command(
+            'manage_partitions',
+            retain_months=12 * 20,
+            detach_only=True,
+            stdout=StringIO(),
+        )
+
+        self.assertNotIn('core_appointment_p200102', self.partitions())
+        self.assertFalse(AppointmentArchive.objects.exists())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('core_appointment_p200102')")
+            self.assertIsNotNone(cursor.fetchone()[0])
+
+    def test_detached_tables_archived(self):
+        """Test months left detached are archived by the next run."""
+        month = datetime.date(2001, 4, 1)
+        partitions.create_partition(connection, month)
+        create_appointment(month)
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        partitions.detach_partition(connection, month)
+
+        call_command(
+            'manage_partitions', retain_months=12 * 20, stdout=StringIO(),
+        )
+
+        archive = AppointmentArchive.objects.get(month=month)
+        self.assertEqual(archive.row_count, 1)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('core_appointment_p200104')")
+            self.assertIsNone(cursor.fetchone()[0])
@@ -0,0 +1,39 @@
+"""
+Tests for pooled password hashing.
+"""
+from django.contrib.auth import hashers
+from django.test import SimpleTestCase, override_settings
+
+from core import passwords
+
+
+class PasswordTests(SimpleTestCase):
+    """Test hashing passwords on the bounded pool."""
+
+    def test_make_and_check_password(self):
+        """Test a pooled hash verifies and rejects correctly."""
+        encoded = passwords.make_password('testpass123')
+
+        self.assertTrue(passwords.check_password('testpass123', encoded))
+        self.assertFalse(passwords.check_password('wrong', encoded))
+        self.assertFalse(passwords.check_password(None, encoded))
+
+    def test_make_passwords(self):
+        """Test hashing many passwords at once."""
+        encoded = passwords.make_passwords(['one11', 'two22'])
+
+        self.assertTrue(hashers.check_password('one11', encoded[0]))
+        self.assertTrue(hashers.check_password('two22', encoded[1]))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_outdated_hash_upgraded_by_setter(self):
+        """Test the setter runs when the stored hash is outdated."""
+        encoded = hashers.make_password('testpass123', hasher='md5')
+        upgraded = []
+
+        passwords.check_password('testpass123', encoded, upgraded.append)
+
+        self.assertEqual(upgraded, ['testpass123'])
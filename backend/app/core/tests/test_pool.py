@@ -0,0 +1,102 @@
+"""
+Tests for the database connection pool.
+"""
+from unittest.mock import patch
+
+from psycopg2 import extensions
+
+from django.test import SimpleTestCase
+
+from core.backends.postgresql.pool import ConnectionPool, PoolExhausted
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rolled_back = False
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rolled_back = True
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool."""
+
+    def test_connections_reused(self):
+        """Test a returned connection is handed out again."""
+        pool = ConnectionPool(max_size=2)
+        connection = pool.checkout(FakeConnection)
+        pool.checkin(connection)
+
+        self.assertIs(pool.checkout(FakeConnection), connection)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_pool_size_limited(self):
+        """Test checkout fails once every connection is in use."""
+        pool = ConnectionPool(max_size=1, timeout=0)
+        pool.checkout(FakeConnection)
+
+        with self.assertRaises(PoolExhausted):
+            pool.checkout(FakeConnection)
+        self.assertEqual(pool.stats()['saturation'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection returned mid-transaction is rolled back."""
+        pool = ConnectionPool()
+        connection = pool.checkout(FakeConnection)
+        connection.status = extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.checkin(connection)
+
+        self.assertTrue(connection.rolled_back)
+        self.assertIs(pool.checkout(FakeConnection), connection)
+
+    def test_broken_connection_replaced(self):
+        """Test a connection broken while idle is not handed out."""
+        pool = ConnectionPool()
+        connection = pool.checkout(FakeConnection)
+        pool.checkin(connection)
+        connection.status = extensions.TRANSACTION_STATUS_UNKNOWN
+
+        replacement = pool.checkout(FakeConnection)
+
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    @patch('core.backends.postgresql.pool.time.monotonic')
+    def test_idle_connections_recycled(self, patched_monotonic):
+        """Test connections idle for too long are closed."""
+        patched_monotonic.return_value = 0
+        pool = ConnectionPool(max_idle=60, check_after=3600)
+        connection = pool.checkout(FakeConnection)
+        pool.checkin(connection)
+        patched_monotonic.return_value = 61
+
+        replacement = pool.checkout(FakeConnection)
+
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+
+    def test_failed_connect_frees_slot(self):
+        """Test a failed connection attempt doesn't use up the pool."""
+        pool = ConnectionPool(max_size=1, timeout=0)
+
+        with self.assertRaises(RuntimeError):
+            pool.checkout(self.fail_to_connect)
+
+        self.assertIsNotNone(pool.checkout(FakeConnection))
+
+    @staticmethod
+    def fail_to_connect():
+        raise RuntimeError('connection refused')
@@ -0,0 +1,133 @@
+"""
+Tests for coalescing identical concurrent reads.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core import single_flight
+
+
+class SlowView(APIView):
+    """View taking until released to answer."""
+    authentication_classes = []
+    permission_classes = []
+    release = None
+    calls = 0
+
+    @single_flight.single_flight()
+    def get(self, request):
+        SlowView.calls += 1
+        self.release.wait(5)
+        return Response({'calls': SlowView.calls})
+
+
+def in_threads(count, target):
+    """Start count threads running target; return their results."""
+    results = [None] * count
+
+    def run(index):
+        results[index] = target()
+
+    threads = [
+        threading.Thread(target=run, args=[index]) for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Test concurrent identical requests share one computation."""
+
+    def setUp(self):
+        single_flight.stats.reset()
+        SlowView.calls = 0
+        SlowView.release = threading.Event()
+        self.view = SlowView.as_view()
+        self.factory = APIRequestFactory()
+
+    def finish(self, threads):
+        # Give every thread time to join the flight.
+        time.sleep(0.2)
+        SlowView.release.set()
+        for thread in threads:
+            thread.join()
+
+    def test_identical_requests_coalesced(self):
+        """Test followers get the leader's response bytes."""
+        threads, responses = in_threads(
+            4, lambda: self.view(self.factory.get('/slow/?b=2&a=1')),
+        )
+        self.finish(threads)
+
+        self.assertEqual(SlowView.calls, 1)
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, b'{"calls":1}')
+        self.assertEqual(single_flight.stats.as_dict(),
+                         {'led': 1, 'coalesced': 3, 'fallbacks': 0})
+
+    def test_different_requests_not_coalesced(self):
+        """Test requests with other filters compute their own response."""
+        threads, responses = in_threads(2, lambda: self.view(
+            self.factory.get(f'/slow/?a={threading.get_ident()}'),
+        ))
+        self.finish(threads)
+
+        self.assertEqual(SlowView.calls, 2)
+
+    def test_leader_failure(self):
+        """Test followers compute on their own when the leader fails."""
+        started = threading.Event()
+        calls = []
+
+        def failing():
+            calls.append('leader')
+            started.set()
+            time.sleep(0.2)
+            raise ValueError('boom')
+
+        def leader():
+            try:
+                single_flight.run('key', failing)
+            except ValueError:
+                return 'failed'
+
+        threads, results = in_threads(1, leader)
+        started.wait(5)
+        result = single_flight.run('key', lambda: calls.append('follower'))
+        threads[0].join()
+
+        self.assertEqual(results, ['failed'])
+        self.assertIsNone(result)
+        self.assertEqual(calls, ['leader', 'follower'])
+        self.assertEqual(single_flight.stats.fallbacks, 1)
+
+    @override_settings(SINGLE_FLIGHT_CACHE_ALIAS='default')
+    def test_leader_in_another_process(self):
+        """Test a flight led elsewhere is joined through the cache."""
+        cache.set('single-flight:key', 'other')
+        cache.set('single-flight:key:other', (200, 'text/plain', b'hi'))
+        self.addCleanup(cache.delete_many, [
+            'single-flight:key', 'single-flight:key:other',
+        ])
+
+        result = single_flight.run('key', self.fail)
+
+        self.assertEqual(result, (200, 'text/plain', b'hi'))
+        self.assertEqual(single_flight.stats.coalesced, 1)
+
+    @override_settings(SINGLE_FLIGHT_CACHE_ALIAS='default')
+    def test_lead_through_cache(self):
+        """Test a leader shares its result and releases the lock."""
+        result = single_flight.run('key', lambda: (200, 'text/plain', b'x'))
+
+        self.assertEqual(result, (200, 'text/plain', b'x'))
+        self.assertIsNone(cache.get('single-flight:key'))
@@ -0,0 +1,132 @@
+"""
+Tests for token-bucket throttling.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+
+
+APPOINTMENTS_URL = reverse('salon:appointment-list')
+TOKEN_URL = reverse('user:token')
+
+RATES = {
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ReadThrottle',
+        'core.throttling.WriteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': '2/min',
+        'write': '1/min',
+        'login': '1/min',
+    },
+}
+
+
+class Clock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class LocalBucketStoreTests(SimpleTestCase):
+    """Test buckets kept in process."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = throttling.LocalBucketStore(clock=self.clock)
+
+    def test_burst_then_rate(self):
+        """Test a full bucket allows a burst, then refills steadily."""
+        waits = [self.store.take('a', 2, 3) for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 0.5)
+
+        self.clock.now += 0.5
+        self.assertEqual(self.store.take('a', 2, 3), 0)
+        self.assertGreater(self.store.take('a', 2, 3), 0)
+        # Other clients have buckets of their own.
+        self.assertEqual(self.store.take('b', 2, 3), 0)
+
+    def test_refill_capped(self):
+        """Test an idle client can't save up more than a full bucket."""
+        self.store.take('a', 1, 2)
+        self.clock.now += 3600
+
+        waits = [self.store.take('a', 1, 2) for _ in range(3)]
+
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertGreater(waits[2], 0)
+
+    def test_refilled_buckets_pruned(self):
+        """Test full buckets are dropped once there are too many."""
+        for number in range(throttling.MAX_LOCAL_BUCKETS):
+            self.store.take(number, 1, 1)
+        self.clock.now += 1
+
+        self.store.take('new', 1, 1)
+
+        self.assertEqual(list(self.store._buckets), ['new'])
+
+
+@override_settings(REST_FRAMEWORK=RATES)
+class ThrottleApiTests(TestCase):
+    """Test the API rejects clients past their rate."""
+
+    def setUp(self):
+        throttling.get_store().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        throttling.get_store().clear()
+
+    def test_reads_throttled_per_user(self):
+        """Test reads past the burst get 429 with Retry-After."""
+        for _ in range(2):
+            res = self.client.get(APPOINTMENTS_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(APPOINTMENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+        other = APIClient()
+        other.force_authenticate(self.other)
+        res = other.get(APPOINTMENTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_writes_throttled_separately(self):
+        """Test writes have their own bucket."""
+        self.client.get(APPOINTMENTS_URL)
+        self.client.get(APPOINTMENTS_URL)
+
+        res = self.client.post(APPOINTMENTS_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(APPOINTMENTS_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_throttled_per_address(self):
+        """Test login attempts are limited per address."""
+        payload = {'email': 'user@example.com', 'password': 'wrong'}
+
+        res = APIClient().post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = APIClient().post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
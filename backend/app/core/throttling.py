@@ -0,0 +1,184 @@
+"""
+Token-bucket throttling for the API.
+
+Every client has a bucket per scope (reads, writes, logins) that holds up
+to N tokens for a rate of "N/period", refilled evenly over the period. A
+request takes a token; a client with none left gets 429 with Retry-After
+set to the time until its next token. A client can burst up to N requests
+after being idle, while one polling in a loop is held to the steady rate
+without affecting anybody else's bucket.
+
+Buckets live in the store named by THROTTLE_STORE: ``LocalBucketStore``
+keeps them in this process, ``RedisBucketStore`` shares them between
+processes and nodes, updating each bucket atomically with a Lua script.
+Unlike DRF's throttles, which keep a list of timestamps per client in the
+cache, a bucket is a few numbers updated in place.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# Buckets kept by a LocalBucketStore before the full ones are dropped.
+MAX_LOCAL_BUCKETS = 10000
+
+
+class LocalBucketStore:
+    """Buckets kept in this process."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, rate, capacity):
+        """
+        Take a token from the bucket at key.
+
+        Return 0 if there was one, otherwise the seconds until there is.
+        """
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_LOCAL_BUCKETS:
+                    self._prune(now)
+                bucket = self._buckets[key] = [capacity, now, now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            # Bucket: tokens, when they were counted, when it will be full.
+            bucket[:] = tokens, now, now + (capacity - tokens) / rate
+            return wait
+
+    def _prune(self, now):
+        """Drop buckets that have refilled, which are as good as none."""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[2] > now
+        }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Buckets shared through Redis."""
+
+    prefix = 'throttle:'
+
+    def __init__(self, url=None):
+        import redis
+        client = redis.Redis.from_url(url or settings.REDIS_URL)
+        # Sent once, then run by its hash. Time is read on the Redis
+        # server, so nodes' clocks don't need to agree.
+        self._take = client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, rate, capacity):
+        return float(self._take(keys=[self.prefix + key],
+                                args=[rate, capacity]))
+
+
+_store = None
+
+
+def get_store():
+    """Return the bucket store configured by THROTTLE_STORE."""
+    global _store
+    if _store is None:
+        path = getattr(
+            settings,
+            'THROTTLE_STORE',
+            'core.throttling.LocalBucketStore',
+        )
+        _store = import_string(path)()
+    return _store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttle requests with the methods given by a token bucket per client.
+
+    Authenticated clients are identified by their user, which has a
+    single auth token; others by their address.
+    """
+
+    methods = None
+
+    def get_rate(self):
+        # Read on use rather than at import, as SimpleRateThrottle does.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.wait_seconds = get_store().take(
+            key, self.num_requests / self.duration, self.num_requests,
+        )
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ReadThrottle(TokenBucketThrottle):
+    """Throttle reads by the 'read' rate."""
+
+    scope = 'read'
+    methods = SAFE_METHODS
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Throttle writes by the 'write' rate."""
+
+    scope = 'write'
+    methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Throttle login attempts from an address by the 'login' rate."""
+
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return f'{self.scope}:ip:{self.get_ident(request)}'
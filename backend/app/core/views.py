@@ -1 +1,135 @@
-# Create your views here.
+"""
+Views for the core APIs.
+"""
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import JsonResponse
+from django.urls import reverse
+
+from rest_framework import generics, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import admission, batch, single_flight
+from core.models import Job
+from core.serializers import BatchSerializer, JobSerializer
+
+
+class BatchView(APIView):
+    """Execute many API requests in one round trip."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Run the sub-requests and return their responses in order."""
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if length > getattr(settings, 'BATCH_MAX_BYTES', 1024 * 1024):
+            return Response(
+                {'detail': 'Batch payload too large.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = batch.execute(
+            request,
+            serializer.validated_data['requests'],
+            parallel=serializer.validated_data['parallel'],
+        )
+        return Response({'responses': responses})
+
+
+def job_accepted(request, job):
+    """Return a 202 response pointing at job."""
+    url = request.build_absolute_uri(reverse('job-detail', args=[job.id]))
+    return Response(
+        {**JobSerializer(job).data, 'url': url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': url},
+    )
+
+
+class JobView(generics.RetrieveAPIView):
+    """Report the status of a background job."""
+    serializer_class = JobSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Only show superusers every job; others see their own."""
+        if self.request.user.is_superuser:
+            return Job.objects.all()
+        return Job.objects.filter(created_by=self.request.user)
+
+
+class JobResultView(JobView):
+    """Return the result of a background job once it has succeeded."""
+
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status == Job.SUCCEEDED:
+            return Response(job.result)
+        if job.status == Job.FAILED:
+            return Response(
+                {'detail': 'Job failed.', 'error': job.error},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+        )
+
+
+def _pool_stats():
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.stats()
+    return stats
+
+
+def _round_trip(alias):
+    """Return the database round trip in milliseconds, or None if down."""
+    start = time.perf_counter()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        return None
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def healthz(request):
+    """Liveness probe: the process is serving requests."""
+    return JsonResponse({
+        'status': 'ok',
+        'pools': _pool_stats(),
+        'admission': admission.get_controller().stats(),
+        'single_flight': single_flight.stats.as_dict(),
+    })
+
+
+def readyz(request):
+    """Readiness probe: the primary database answers without queueing."""
+    pools = _pool_stats()
+    primary = pools.get(DEFAULT_DB_ALIAS)
+    if primary and primary['waiting']:
+        # Requests are already queueing for connections; checking the
+        # database would only queue behind them.
+        return JsonResponse(
+            {'status': 'saturated', 'pools': pools}, status=503,
+        )
+    latency = {alias: _round_trip(alias) for alias in connections}
+    ready = latency[DEFAULT_DB_ALIAS] is not None
+    return JsonResponse(
+        {
+            'status': 'ok' if ready else 'unavailable',
+            'pools': pools,
+            'latency_ms': latency,
+        },
+        status=200 if ready else 503,
+    )
@@ -0,0 +1,83 @@
+"""
+Per-branch, per-day agenda cache.
+
+The agenda for a (branch, date) pair is stored as the rendered JSON bytes
+of the appointment list, so a cache hit costs one cache lookup and no
+database queries or serialization at all.
+"""
+from django.conf import settings
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Appointment
+from salon import cache
+from salon.serializers import AppointmentSerializer
+
+
+stats = cache.CacheStats()
+
+
+def _generation_key(branch_id, date):
+    return f'salon:agenda:gen:{branch_id}:{date}'
+
+
+def _payload_key(branch_id, date, generation):
+    return f'salon:agenda:{branch_id}:{date}:{generation}'
+
+
+def agenda_queryset(branch_id, date):
+    """Return the appointments of a branch for one day, ready to render."""
+    return Appointment.objects.filter(
+        branch_id=branch_id,
+        date=date,
+    ).select_related(
+        'branch',
+        'client',
+        'service',
+        'payment',
+        'discount',
+        'technician__user',
+    ).prefetch_related(
+        'technician__skills',
+        'technician__branches',
+    ).order_by('time', 'id')
+
+
+def render_agenda(branch_id, date):
+    """Serialize and render the agenda of a branch for one day."""
+    serializer = AppointmentSerializer(
+        agenda_queryset(branch_id, date),
+        many=True,
+    )
+    return JSONRenderer().render(serializer.data)
+
+
+def get_agenda(branch_id, date):
+    """Return the rendered agenda, from cache when possible."""
+    generation = cache.get_generation(_generation_key(branch_id, date))
+    return cache.get_or_build(
+        _payload_key(branch_id, date, generation),
+        lambda: render_agenda(branch_id, date),
+        stats,
+        timeout=getattr(settings, 'SALON_AGENDA_CACHE_TIMEOUT', 300),
+    )
+
+
+def invalidate(branch_id, date):
+    """Invalidate the cached agenda of a branch for one day."""
+    cache.bump_generation(_generation_key(branch_id, date))
+
+
+def invalidate_many(pairs):
+    """Invalidate every (branch_id, date) pair in pairs."""
+    for branch_id, date in set(pairs):
+        invalidate(branch_id, date)
+
+
+def invalidate_for(**filters):
+    """Invalidate the agendas containing appointments matching filters."""
+    invalidate_many(
+        Appointment.objects.filter(**filters)
+        .values_list('branch_id', 'date')
+        .distinct()
+    )
@@ -0,0 +1,294 @@
+"""
+Columnar analytics snapshot of appointments.
+
+``export_analytics`` (run nightly) writes every appointment as a set of
+.npy column files: ids of its branch, technician, service, payment and
+discount, its date, hour and amounts in integer cents. The names of those
+dimensions are stored next to them in meta.json. The export reads from a
+replica when one is configured, and ad-hoc questions are then answered by
+``query`` over the memory-mapped columns, without touching the database.
+
+Snapshots are written to a temporary directory and published by
+replacing the CURRENT file, so readers always see a complete snapshot.
+"""
+import itertools
+import json
+import os
+import shutil
+import threading
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.db.models import IntegerField, Value
+from django.db.models.functions import Coalesce, ExtractHour
+from django.utils import timezone
+
+from core import db_router
+from core.models import (
+    Appointment,
+    Branch,
+    Discount,
+    Payment,
+    Service,
+    Technician,
+)
+from salon.payroll import cents
+
+
+DIMENSIONS = ['branch', 'technician', 'service', 'payment', 'discount']
+AMOUNTS = [
+    'final_income', 'commission', 'tip', 'courtesy', 'discount_price',
+]
+# Integer columns after date, in export order.
+INTEGERS = [
+    ('hour', np.int8),
+    *[(name, np.int32) for name in DIMENSIONS],
+    ('warranty', np.bool_),
+    *[(name, np.int64) for name in AMOUNTS],
+]
+DERIVED = ['month', 'year', 'weekday']
+GROUPS = DIMENSIONS + ['warranty', 'date', 'hour'] + DERIVED
+FILTERS = DIMENSIONS + ['warranty', 'hour', 'weekday']
+METRICS = ['count'] + AMOUNTS
+CHUNK_SIZE = 50000
+
+# 1970-01-01, day zero of datetime64[D], was a Thursday.
+_EPOCH_WEEKDAY = 3
+
+
+class NoSnapshot(LookupError):
+    """No analytics snapshot has been exported yet."""
+
+
+def get_dir():
+    """Return the directory analytics snapshots are kept in."""
+    return Path(settings.ANALYTICS_DIR)
+
+
+def _names():
+    """Return {dimension: {id: name}} for every dimension."""
+    return {
+        'branch': dict(Branch.objects.values_list('id', 'name')),
+        'technician': dict(
+            Technician.objects.values_list('id', 'user__name'),
+        ),
+        'service': dict(Service.objects.values_list('id', 'name')),
+        'payment': dict(Payment.objects.values_list('id', 'description')),
+        'discount': dict(
+            Discount.objects.values_list('id', 'description'),
+        ),
+    }
+
+
+def _rows():
+    """Stream (date, hour, *dimensions, warranty, *cents) tuples."""
+    return Appointment.objects.annotate(
+        hour=ExtractHour('time'),
+        # Missing payments and discounts are exported as -1.
+        payment_or_none=Coalesce(
+            'payment_id', Value(-1), output_field=IntegerField(),
+        ),
+        discount_or_none=Coalesce(
+            'discount_id', Value(-1), output_field=IntegerField(),
+        ),
+    ).values_list(
+        'date', 'hour', 'branch_id', 'technician_id', 'service_id',
+        'payment_or_none', 'discount_or_none', 'warranty',
+        *[cents(name) for name in AMOUNTS],
+    ).order_by().iterator(chunk_size=CHUNK_SIZE)
+
+
+def export(keep=3):
+    """Write a new snapshot, publish it and return its name."""
+    directory = get_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    created_at = timezone.now()
+    name = created_at.strftime('%Y%m%dT%H%M%S%f')
+
+    dates = []
+    integers = []
+    with db_router.read_from_replica():
+        names = _names()
+        rows = _rows()
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            dates.append(np.array(
+                [row[0] for row in chunk], dtype='datetime64[D]',
+            ))
+            integers.append(np.array(
+                [row[1:] for row in chunk], dtype=np.int64,
+            ).reshape(-1, len(INTEGERS)))
+
+    tmp = directory / f'.{name}.tmp'
+    tmp.mkdir()
+    np.save(tmp / 'date.npy', np.concatenate(
+        dates or [np.empty(0, dtype='datetime64[D]')],
+    ))
+    integers = np.concatenate(
+        integers or [np.empty((0, len(INTEGERS)), dtype=np.int64)],
+    )
+    for i, (column, dtype) in enumerate(INTEGERS):
+        np.save(tmp / f'{column}.npy', integers[:, i].astype(dtype))
+    (tmp / 'meta.json').write_text(json.dumps({
+        'name': name,
+        'created_at': created_at.isoformat(),
+        'rows': len(integers),
+        'names': names,
+    }))
+    tmp.rename(directory / name)
+
+    current = directory / '.CURRENT.tmp'
+    current.write_text(name)
+    os.replace(current, directory / 'CURRENT')
+    _prune(directory, keep)
+    return name
+
+
+def _prune(directory, keep):
+    """Delete all but the newest keep snapshots."""
+    snapshots = sorted(
+        path for path in directory.iterdir()
+        if path.is_dir() and not path.name.startswith('.')
+    )
+    for path in snapshots[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class Snapshot:
+    """A published snapshot, its columns memory-mapped."""
+
+    def __init__(self, path):
+        meta = json.loads((path / 'meta.json').read_text())
+        self.name = meta['name']
+        self.created_at = meta['created_at']
+        self.rows = meta['rows']
+        self.names = {
+            dimension: {int(key): value for key, value in names.items()}
+            for dimension, names in meta['names'].items()
+        }
+        self.columns = {
+            column: np.load(path / f'{column}.npy', mmap_mode='r')
+            for column in ['date', *[name for name, _ in INTEGERS]]
+        }
+
+    def column(self, name):
+        """Return a stored or derived column."""
+        if name == 'month':
+            return self.columns['date'].astype('datetime64[M]')
+        if name == 'year':
+            return self.columns['date'].astype('datetime64[Y]')
+        if name == 'weekday':
+            # ISO weekday, 1 (Monday) to 7, as in Promo.weekday.
+            days = self.columns['date'].astype(np.int64)
+            return (days + _EPOCH_WEEKDAY) % 7 + 1
+        return self.columns[name]
+
+
+_lock = threading.Lock()
+_current = None
+
+
+def current():
+    """Return the published snapshot, loading it if it changed."""
+    global _current
+    try:
+        name = (get_dir() / 'CURRENT').read_text().strip()
+    except FileNotFoundError:
+        raise NoSnapshot('No analytics snapshot has been exported yet.')
+    with _lock:
+        if _current is None or _current.name != name:
+            _current = Snapshot(get_dir() / name)
+        return _current
+
+
+def _value(name, value):
+    if name in ('date', 'month', 'year'):
+        return str(value)
+    if name == 'warranty':
+        return bool(value)
+    if name in DIMENSIONS and value < 0:
+        return None
+    return int(value)
+
+
+def query(group_by=(), metrics=('count',), date_from=None, date_to=None,
+          snapshot=None, **filters):
+    """
+    Return the metrics of the appointments matching filters, by group.
+
+    Filters compare a column to a value or any of a list of values, and
+    date_from and date_to bound the date inclusively. Each returned row
+    holds the group's values (and names, for dimensions) and its metrics;
+    amounts are Decimals.
+    """
+    unknown = (
+        [name for name in group_by if name not in GROUPS] +
+        [name for name in metrics if name not in METRICS] +
+        [name for name in filters if name not in FILTERS]
+    )
+    if unknown:
+        raise ValueError(f'Unknown columns: {", ".join(unknown)}.')
+    snapshot = snapshot or current()
+
+    mask = np.ones(snapshot.rows, dtype=bool)
+    if date_from is not None:
+        mask &= snapshot.column('date') >= np.datetime64(date_from, 'D')
+    if date_to is not None:
+        mask &= snapshot.column('date') <= np.datetime64(date_to, 'D')
+    for name, values in filters.items():
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        mask &= np.isin(snapshot.column(name), list(values))
+    selected = np.flatnonzero(mask)
+    if not len(selected):
+        return []
+
+    # Number each group, in the order of its values.
+    uniques = []
+    codes = []
+    for name in group_by:
+        values, inverse = np.unique(
+            snapshot.column(name)[selected], return_inverse=True,
+        )
+        uniques.append(values)
+        codes.append(inverse.reshape(-1))
+    if group_by:
+        groups = np.ravel_multi_index(
+            codes, [len(values) for values in uniques],
+        )
+    else:
+        groups = np.zeros(len(selected), dtype=np.int64)
+    order = np.argsort(groups, kind='stable')
+    groups = groups[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(groups)) + 1))
+    keys = np.unravel_index(
+        groups[starts], [len(values) for values in uniques],
+    ) if group_by else []
+
+    results = {}
+    for metric in metrics:
+        if metric == 'count':
+            results[metric] = np.diff(np.append(starts, len(groups)))
+        else:
+            column = snapshot.column(metric)[selected][order]
+            results[metric] = np.add.reduceat(column, starts)
+
+    rows = []
+    for i in range(len(starts)):
+        row = {}
+        for name, values, key in zip(group_by, uniques, keys):
+            row[name] = _value(name, values[key[i]])
+            if name in DIMENSIONS:
+                row[f'{name}_name'] = snapshot.names[name].get(row[name])
+        for metric, values in results.items():
+            if metric == 'count':
+                row[metric] = int(values[i])
+            else:
+                row[metric] = Decimal(int(values[i])).scaleb(-2)
+        rows.append(row)
+    return rows
@@ -0,0 +1,263 @@
+"""
+Automatic technician assignment for batches of booking requests.
+
+Each request asks for a service at a branch, starting anywhere between two
+times of one day. A technician can take it if they work at the branch,
+have every skill the service requires, and are free at that time. The day
+is cut into SALON_APPOINTMENT_MINUTES slots within each branch's opening
+hours, and a technician's existing appointments (at any branch) take their
+slots.
+
+The batch is solved as a min-cost flow: source -> request -> free
+(technician, slot) -> technician -> sink. Requests with the same window
+and the same eligible technicians are merged into one node, and the n-th
+booking of a technician costs n plus their existing bookings of the day,
+so the flow assigns as many requests as possible and, among those
+assignments, spreads the bookings as evenly as the skills allow.
+"""
+import datetime
+import heapq
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+from core.models import Appointment, Branch, Service, Technician
+
+
+DEFAULT_HOURS = ('09:00', '20:00')
+
+_INF = float('inf')
+
+
+class _Network:
+    """Min-cost flow over integer costs (primal-dual with blocking flows)."""
+
+    def __init__(self):
+        # Edges are [head, capacity, cost, index of the reverse edge].
+        self.graph = []
+
+    def add_node(self):
+        self.graph.append([])
+        return len(self.graph) - 1
+
+    def add_edge(self, tail, head, capacity, cost=0):
+        """Add an edge and return it; its capacity drops as flow passes."""
+        edge = [head, capacity, cost, len(self.graph[head])]
+        self.graph[tail].append(edge)
+        self.graph[head].append([tail, 0, -cost, len(self.graph[tail]) - 1])
+        return edge
+
+    def _distances(self, source, potential):
+        """Return shortest distances from source on reduced costs."""
+        dist = [_INF] * len(self.graph)
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            offset = d + potential[node]
+            for head, capacity, cost, _ in self.graph[node]:
+                if capacity:
+                    nd = offset + cost - potential[head]
+                    if nd < dist[head]:
+                        dist[head] = nd
+                        heapq.heappush(heap, (nd, head))
+        return dist
+
+    def _levels(self, source, potential):
+        """Return BFS levels over the edges on shortest paths."""
+        level = [-1] * len(self.graph)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for head, capacity, cost, _ in self.graph[node]:
+                if capacity and level[head] < 0 and \
+                        cost + potential[node] == potential[head]:
+                    level[head] = level[node] + 1
+                    queue.append(head)
+        return level
+
+    def _blocking_flow(self, source, sink, level, potential):
+        """Push flow along shortest paths until none is left."""
+        graph = self.graph
+        cursor = [0] * len(graph)
+        pushed = 0
+        nodes = [source]
+        path = []
+        while nodes:
+            node = nodes[-1]
+            if node == sink:
+                amount = min(edge[1] for edge in path)
+                for edge in path:
+                    edge[1] -= amount
+                    graph[edge[0]][edge[3]][1] += amount
+                pushed += amount
+                nodes = [source]
+                path = []
+                continue
+            edges = graph[node]
+            while cursor[node] < len(edges):
+                edge = edges[cursor[node]]
+                head = edge[0]
+                if edge[1] and level[head] == level[node] + 1 and \
+                        edge[2] + potential[node] == potential[head]:
+                    nodes.append(head)
+                    path.append(edge)
+                    break
+                cursor[node] += 1
+            else:
+                # Nothing more gets through this node in this phase.
+                level[node] = -1
+                nodes.pop()
+                if path:
+                    path.pop()
+                    cursor[nodes[-1]] += 1
+        return pushed
+
+    def max_flow_min_cost(self, source, sink):
+        """Send as much flow as possible, at the lowest cost; return it."""
+        potential = [0] * len(self.graph)
+        total = 0
+        while True:
+            dist = self._distances(source, potential)
+            if dist[sink] == _INF:
+                return total
+            for node, d in enumerate(dist):
+                if d != _INF:
+                    potential[node] += d
+            level = self._levels(source, potential)
+            total += self._blocking_flow(source, sink, level, potential)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _hours(branch):
+    """Return the opening and closing minute of a branch."""
+    default = getattr(settings, 'SALON_OPENING_HOURS', DEFAULT_HOURS)
+    opening = branch.start_time or datetime.time.fromisoformat(default[0])
+    closing = branch.end_time or datetime.time.fromisoformat(default[1])
+    return _minutes(opening), _minutes(closing)
+
+
+def _links(descriptor, ids):
+    """Return {id: set of related ids} of a many-to-many relation."""
+    source = descriptor.field.m2m_field_name()
+    target = descriptor.field.m2m_reverse_field_name()
+    links = defaultdict(set)
+    for row_id, related_id in descriptor.through.objects.filter(
+        **{f'{source}_id__in': ids},
+    ).values_list(f'{source}_id', f'{target}_id'):
+        links[row_id].add(related_id)
+    return links
+
+
+def assign(date, requests):
+    """
+    Assign technicians and start times to a batch of booking requests.
+
+    Each request is a dict with the service and branch ids, and the
+    earliest and latest start (``start`` and ``end``, times; ``end``
+    defaults to ``start``). Return, for every request in order, a dict
+    with the technician id and start time, or None if it can't be met.
+    """
+    length = getattr(settings, 'SALON_APPOINTMENT_MINUTES', 60)
+    branch_ids = {request['branch'] for request in requests}
+    hours = {
+        branch.id: _hours(branch)
+        for branch in Branch.objects.filter(id__in=branch_ids)
+    }
+    required = _links(
+        Service.required_skills,
+        {request['service'] for request in requests},
+    )
+    staff = defaultdict(set)
+    for branch_id, technician_id in Technician.branches.through.objects \
+            .filter(branch_id__in=branch_ids) \
+            .values_list('branch_id', 'technician_id'):
+        staff[branch_id].add(technician_id)
+    technicians = set().union(*staff.values())
+    skills = _links(Technician.skills, technicians)
+
+    busy = defaultdict(set)
+    booked = defaultdict(int)
+    for technician_id, time in Appointment.objects.filter(
+        date=date, technician_id__in=technicians,
+    ).values_list('technician_id', 'time'):
+        booked[technician_id] += 1
+        start = _minutes(time)
+        # An appointment off the grid takes both slots it overlaps.
+        busy[technician_id].update(
+            range(start // length, -(-(start + length) // length))
+        )
+
+    # Requests that can go to the same technicians and slots are merged.
+    groups = defaultdict(list)
+    for index, request in enumerate(requests):
+        if request['branch'] not in hours:
+            continue
+        opening, closing = hours[request['branch']]
+        start = _minutes(request['start'])
+        end = _minutes(request.get('end') or request['start'])
+        slots = range(
+            -(-max(start, opening) // length),
+            min(end, closing - length) // length + 1,
+        )
+        eligible = frozenset(
+            technician_id for technician_id in staff[request['branch']]
+            if required[request['service']] <= skills[technician_id]
+        )
+        if slots and eligible:
+            groups[eligible, slots].append(index)
+
+    network = _Network()
+    source = network.add_node()
+    sink = network.add_node()
+    slot_nodes = {}
+    technician_nodes = {}
+    demand = defaultdict(int)
+    offers = []
+    for (eligible, slots), indexes in groups.items():
+        node = network.add_node()
+        network.add_edge(source, node, len(indexes))
+        edges = []
+        for technician_id in sorted(eligible):
+            if technician_id not in technician_nodes:
+                technician_nodes[technician_id] = network.add_node()
+            for slot in slots:
+                if slot in busy[technician_id]:
+                    continue
+                key = technician_id, slot
+                if key not in slot_nodes:
+                    slot_nodes[key] = network.add_node()
+                    network.add_edge(
+                        slot_nodes[key], technician_nodes[technician_id], 1,
+                    )
+                    demand[technician_id] += 1
+                edge = network.add_edge(node, slot_nodes[key], 1)
+                edges.append((key, edge))
+        offers.append((indexes, edges))
+
+    for technician_id, node in technician_nodes.items():
+        # Convex costs: each extra booking of a technician costs more.
+        for count in range(1, demand[technician_id] + 1):
+            network.add_edge(node, sink, 1, booked[technician_id] + count)
+
+    network.max_flow_min_cost(source, sink)
+
+    result = [None] * len(requests)
+    for indexes, edges in offers:
+        taken = sorted(
+            (key for key, edge in edges if edge[1] == 0),
+            key=lambda key: (key[1], key[0]),
+        )
+        for index, (technician_id, slot) in zip(indexes, taken):
+            minutes = slot * length
+            result[index] = {
+                'technician': technician_id,
+                'time': datetime.time(minutes // 60, minutes % 60),
+            }
+    return result
@@ -0,0 +1,43 @@
+"""
+Async read endpoints for the salon API, for use under ASGI.
+"""
+import datetime
+
+from asgiref.sync import sync_to_async
+
+from core.async_api import (
+    async_api_view,
+    json_bytes_response,
+    json_response,
+)
+from salon import agenda
+from salon.serializers import CATALOG_SERIALIZERS, catalog_queryset
+
+
+def _serialize_catalog(name):
+    serializer_class = CATALOG_SERIALIZERS[name]
+    return serializer_class(catalog_queryset(name), many=True).data
+
+
+@async_api_view()
+async def agenda_view(request):
+    """Return every appointment of a branch for one day."""
+    try:
+        branch_id = int(request.GET.get('branch', ''))
+        date = datetime.date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return json_response(
+            ['Both branch (id) and date (YYYY-MM-DD) are required.'],
+            status=400,
+        )
+    content = await sync_to_async(agenda.get_agenda)(branch_id, date)
+    return json_bytes_response(content)
+
+
+@async_api_view()
+async def catalog_view(request, name):
+    """Return every row of a reference catalog."""
+    if name not in CATALOG_SERIALIZERS:
+        return json_response({'detail': 'Not found.'}, status=404)
+    data = await sync_to_async(_serialize_catalog)(name)
+    return json_response(data)
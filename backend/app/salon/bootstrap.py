@@ -0,0 +1,57 @@
+"""
+One-shot bundle of every reference catalog.
+
+The bundle is rendered once per process and kept in memory together with
+a hash of its content, which doubles as its ETag. A generation counter in
+the shared cache tells every process when a catalog has changed.
+"""
+import hashlib
+import threading
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from salon import cache
+from salon.serializers import CATALOG_SERIALIZERS, catalog_queryset
+
+
+GENERATION_KEY = 'salon:bootstrap:gen'
+
+stats = cache.CacheStats()
+
+_lock = threading.Lock()
+_bundle = {'generation': None, 'content': None, 'etag': None}
+
+
+def render_bundle():
+    """Serialize every catalog into one JSON document."""
+    data = {}
+    for name, serializer_class in CATALOG_SERIALIZERS.items():
+        data[name] = serializer_class(
+            catalog_queryset(name), many=True,
+        ).data
+    return JSONRenderer().render(data)
+
+
+def get_bundle():
+    """Return the rendered bundle and its ETag."""
+    generation = cache.get_generation(GENERATION_KEY)
+    with _lock:
+        if _bundle['generation'] == generation:
+            stats.hit()
+        else:
+            stats.miss()
+            start = time.perf_counter()
+            content = render_bundle()
+            stats.rebuilt(time.perf_counter() - start)
+            _bundle.update(
+                generation=generation,
+                content=content,
+                etag='"%s"' % hashlib.sha256(content).hexdigest()[:32],
+            )
+        return _bundle['content'], _bundle['etag']
+
+
+def invalidate():
+    """Mark the bundle stale in every process."""
+    cache.bump_generation(GENERATION_KEY)
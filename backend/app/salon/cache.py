@@ -0,0 +1,133 @@
+"""
+Shared cache helpers for salon read models.
+
+Cached payloads are stored under a generation number so that invalidation
+is a single atomic increment: readers always look up the payload for the
+current generation, and anything built for an older generation is simply
+never read again and expires on its own.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import batch
+
+
+def get_cache():
+    """Return the cache backend used by the salon read models."""
+    return caches[getattr(settings, 'SALON_CACHE_ALIAS', 'default')]
+
+
+class CacheStats:
+    """Thread-safe hit/miss and rebuild-latency counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all counters to zero."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.rebuilds = 0
+            self.rebuild_seconds = 0.0
+            self.rebuild_max_seconds = 0.0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def rebuilt(self, seconds):
+        with self._lock:
+            self.rebuilds += 1
+            self.rebuild_seconds += seconds
+            self.rebuild_max_seconds = max(self.rebuild_max_seconds, seconds)
+
+    def as_dict(self):
+        """Return a snapshot of the counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'rebuilds': self.rebuilds,
+                'rebuild_avg_ms': (
+                    self.rebuild_seconds / self.rebuilds * 1000
+                    if self.rebuilds else 0.0
+                ),
+                'rebuild_max_ms': self.rebuild_max_seconds * 1000,
+            }
+
+
+def get_generation(key):
+    """Return the current generation number stored under key."""
+    return batch.cached(('generation', key), lambda: _get_generation(key))
+
+
+def _get_generation(key):
+    cache = get_cache()
+    generation = cache.get(key)
+    if generation is None:
+        # Start new (or evicted) counters from the clock, so they can't
+        # collide with a generation that something is still cached under.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key):
+    """Invalidate everything cached under the previous generation of key."""
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(key, generation, timeout=None)
+        return generation
+
+
+def get_or_build(key, build, stats, timeout=300, lock_timeout=10,
+                 wait_interval=0.05):
+    """
+    Return the cached value for key, building it at most once at a time.
+
+    The first caller that misses takes a short-lived lock in the cache and
+    runs ``build()``; concurrent callers wait for that value to appear
+    instead of stampeding the database. If the lock holder dies or takes
+    longer than ``lock_timeout`` seconds, waiters fall back to building the
+    value themselves.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        stats.hit()
+        return value
+
+    stats.miss()
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    if not locked:
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(wait_interval)
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+    try:
+        start = time.perf_counter()
+        value = build()
+        stats.rebuilt(time.perf_counter() - start)
+        cache.set(key, value, timeout=timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,191 @@
+"""
+Per-client visit statistics.
+
+ClientStats holds each client's last visit, visit count, total spend and
+favorite technician and service, so lists of clients never aggregate
+appointments. Appointment writes schedule the clients they touch, and the
+stats of those clients alone are recomputed once the transaction commits.
+
+A visit is an appointment dated today or earlier, so booked appointments
+start counting on their day: ``rebuild_client_stats --today`` (run
+nightly) recomputes the clients booked for the day, and without options
+it rebuilds every client's stats.
+
+Months archived by ``manage_partitions`` are folded into each client's
+archived totals before they are dropped, so lifetime totals survive them.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from core.models import Appointment, Client, ClientStats
+
+
+CHUNK_SIZE = 1000
+
+_pending = threading.local()
+
+
+def _favorites(appointments, field):
+    """Return {client_id: the field value of most of its visits}."""
+    rows = appointments.values('client_id', field).annotate(
+        visits=Count('id'), last=Max('date'),
+    ).order_by('client_id', '-visits', '-last', field)
+    favorites = {}
+    for row in rows:
+        favorites.setdefault(row['client_id'], row[field])
+    return favorites
+
+
+def recompute(client_ids):
+    """Recompute the stats of client_ids from their appointments."""
+    client_ids = sorted(set(client_ids))
+    today = timezone.localdate()
+    for start in range(0, len(client_ids), CHUNK_SIZE):
+        chunk = client_ids[start:start + CHUNK_SIZE]
+        with transaction.atomic():
+            # Recomputes of the same client wait for each other, then count
+            # the appointments committed before they got the lock.
+            chunk = list(Client.objects.select_for_update().filter(
+                id__in=chunk,
+            ).order_by('id').values_list('id', flat=True))
+            _recompute_locked(chunk, today)
+
+
+def _recompute_locked(chunk, today):
+    visits = Appointment.objects.filter(client_id__in=chunk, date__lte=today)
+    totals = {
+        row['client_id']: row
+        for row in visits.values('client_id').annotate(
+            last=Max('date'),
+            count=Count('id'),
+            spend=Sum('final_income'),
+        ).order_by()
+    }
+    technicians = _favorites(visits, 'technician_id')
+    services = _favorites(visits, 'service_id')
+    existing = ClientStats.objects.in_bulk(chunk)
+
+    created, updated = [], []
+    for client_id in chunk:
+        row = totals.get(client_id, {})
+        stats = existing.get(client_id)
+        if stats is None:
+            stats = ClientStats(client_id=client_id)
+            created.append(stats)
+        else:
+            updated.append(stats)
+        dates = [
+            date for date in (row.get('last'), stats.archived_last_visit)
+            if date is not None
+        ]
+        stats.last_visit = max(dates, default=None)
+        stats.visit_count = row.get('count', 0) + stats.archived_visits
+        stats.total_spend = (row.get('spend') or 0) + stats.archived_spend
+        # Favorites only weigh the visits still in the live table.
+        stats.favorite_technician_id = technicians.get(client_id)
+        stats.favorite_service_id = services.get(client_id)
+        stats.updated_at = timezone.now()
+    ClientStats.objects.bulk_create(created)
+    ClientStats.objects.bulk_update(updated, [
+        'last_visit', 'visit_count', 'total_spend', 'favorite_technician',
+        'favorite_service', 'updated_at',
+    ])
+
+
+def _lock_clients(cursor, table):
+    """Lock the clients with appointments in table; return their ids."""
+    cursor.execute(
+        f'SELECT DISTINCT client_id FROM {table} '
+        'WHERE client_id IS NOT NULL'
+    )
+    client_ids = sorted(row[0] for row in cursor.fetchall())
+    return list(Client.objects.select_for_update().filter(
+        id__in=client_ids,
+    ).order_by('id').values_list('id', flat=True))
+
+
+def archive(cursor, table):
+    """
+    Add the visits in table, a month about to be archived, to the
+    archived totals of their clients; return the clients' ids.
+
+    Run it in the transaction that drops table (PostgreSQL only), then
+    recompute the clients once it commits.
+    """
+    client_ids = _lock_clients(cursor, table)
+    stats = ClientStats._meta.db_table
+    cursor.execute(
+        f'INSERT INTO {stats} (client_id, archived_visits, archived_spend, '
+        'archived_last_visit, visit_count, total_spend, updated_at) '
+        'SELECT client_id, count(*), coalesce(sum(final_income), 0), '
+        f'max(date), 0, 0, now() FROM {table} '
+        'WHERE client_id = ANY(%s) GROUP BY client_id '
+        'ON CONFLICT (client_id) DO UPDATE SET '
+        f'archived_visits = {stats}.archived_visits + '
+        'EXCLUDED.archived_visits, '
+        f'archived_spend = {stats}.archived_spend + '
+        'EXCLUDED.archived_spend, '
+        f'archived_last_visit = GREATEST({stats}.archived_last_visit, '
+        'EXCLUDED.archived_last_visit)',
+        [client_ids],
+    )
+    return client_ids
+
+
+def unarchive(cursor, table):
+    """
+    Take the visits in table, a month restored from the archive, off the
+    archived totals of their clients; return the clients' ids.
+    """
+    client_ids = _lock_clients(cursor, table)
+    stats = ClientStats._meta.db_table
+    cursor.execute(
+        f'UPDATE {stats} SET '
+        f'archived_visits = greatest({stats}.archived_visits - m.visits, 0), '
+        f'archived_spend = {stats}.archived_spend - m.spend '
+        'FROM (SELECT client_id, count(*) AS visits, '
+        'coalesce(sum(final_income), 0) AS spend '
+        f'FROM {table} WHERE client_id = ANY(%s) GROUP BY client_id) m '
+        f'WHERE {stats}.client_id = m.client_id',
+        [client_ids],
+    )
+    return client_ids
+
+
+def rebuild(date=None):
+    """
+    Recompute the stats of every client, or of those booked on date.
+
+    Return the number of clients recomputed.
+    """
+    if date is None:
+        client_ids = Client.objects.values_list('id', flat=True)
+    else:
+        client_ids = Appointment.objects.filter(date=date).values_list(
+            'client_id', flat=True,
+        ).distinct()
+    client_ids = list(client_ids)
+    recompute(client_ids)
+    return len(client_ids)
+
+
+def schedule(client_ids):
+    """Recompute the stats of client_ids once the transaction commits."""
+    pending = getattr(_pending, 'client_ids', None)
+    if pending is None:
+        pending = _pending.client_ids = set()
+    pending.update(client_id for client_id in client_ids if client_id)
+    # Every write registers a flush, but only the first one to run finds
+    # work; ids left by a rolled back transaction go with the next one.
+    transaction.on_commit(flush)
+
+
+def flush():
+    """Recompute the stats of every client scheduled so far."""
+    client_ids = getattr(_pending, 'client_ids', None)
+    _pending.client_ids = None
+    if client_ids:
+        recompute(client_ids)
@@ -0,0 +1,222 @@
+"""
+Booking demand by branch, service, weekday and hour.
+
+Each branch keeps a DemandSnapshot: the number of appointments booked in
+every (service, promo day or not, weekday, hour) cell, and how many days
+each (promo, weekday) cell has covered, as small numpy arrays. Refreshing
+only counts the days since the snapshot's ``through`` date, so the nightly
+``refresh_demand`` run reads one day of appointments per branch, and the
+dashboard reads a single row.
+
+A day is a promo day when a promo for its weekday existed on that day.
+The forecast for a day is the average bookings per hour of past days with
+the same weekday and promo flag; a weekday never seen with that flag
+falls back to its other flag, scaled by the branch's overall promo lift.
+"""
+import datetime
+import io
+import math
+
+import numpy as np
+
+from django.conf import settings
+from django.db.models import Count, Min
+from django.db.models.functions import ExtractHour
+
+from core.models import Appointment, Branch, DemandSnapshot, Promo
+
+
+# 1970-01-01, day zero of datetime64[D], was a Thursday.
+_EPOCH_WEEKDAY = 3
+
+
+def _dump(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _load(data):
+    return np.load(io.BytesIO(bytes(data)), allow_pickle=False)
+
+
+def _weekdays(dates):
+    """Return Monday-based (0-6) weekdays of a datetime64[D] array."""
+    return (dates.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+
+
+def _promo_since():
+    """Return, per weekday (0-6), the day its first promo started."""
+    since = np.full(7, np.datetime64('NaT'), dtype='datetime64[D]')
+    rows = Promo.objects.values('weekday').annotate(
+        first=Min('created_at'),
+    ).values_list('weekday', 'first')
+    for weekday, first in rows:
+        since[weekday - 1] = np.datetime64(first.date(), 'D')
+    return since
+
+
+def _promo_flags(dates, since):
+    """Return 1 for the dates that were promo days, else 0."""
+    # Comparisons with NaT (weekdays never on promo) are False.
+    return (dates >= since[_weekdays(dates)]).astype(np.int64)
+
+
+def load(snapshot):
+    """Return (services, counts, days) arrays of a snapshot."""
+    return (
+        np.array(snapshot.services, dtype=np.int64),
+        _load(snapshot.counts),
+        _load(snapshot.days),
+    )
+
+
+def refresh(branch_id, until=None, full=False):
+    """
+    Count a branch's appointments up to until (yesterday by default).
+
+    Only days after the snapshot's through date are read, unless full, in
+    which case the snapshot is rebuilt from the branch's first day. Return
+    the snapshot, or None if the branch has no appointments yet.
+    """
+    if until is None:
+        until = datetime.date.today() - datetime.timedelta(days=1)
+    snapshot = DemandSnapshot.objects.filter(branch_id=branch_id).first()
+    if snapshot is None or full:
+        start = Appointment.objects.filter(
+            branch_id=branch_id,
+        ).aggregate(first=Min('date'))['first']
+        if start is None:
+            return snapshot
+        services = []
+        counts = np.zeros((0, 2, 7, 24), dtype=np.int32)
+        days = np.zeros((2, 7), dtype=np.int32)
+    else:
+        start = snapshot.through + datetime.timedelta(days=1)
+        services = list(snapshot.services)
+        _, counts, days = load(snapshot)
+    if start > until:
+        return snapshot
+
+    rows = list(
+        Appointment.objects.filter(
+            branch_id=branch_id, date__gte=start, date__lte=until,
+        ).annotate(
+            hour=ExtractHour('time'),
+        ).values_list('service_id', 'date', 'hour').annotate(
+            bookings=Count('id'),
+        ).order_by()
+    )
+    since = _promo_since()
+
+    new = sorted({row[0] for row in rows} - set(services))
+    if new:
+        services.extend(new)
+        counts = np.concatenate(
+            (counts, np.zeros((len(new), 2, 7, 24), dtype=np.int32)),
+        )
+    if rows:
+        index = {service: i for i, service in enumerate(services)}
+        service_ids, dates, hours, bookings = zip(*rows)
+        dates = np.array(dates, dtype='datetime64[D]')
+        np.add.at(counts, (
+            [index[service] for service in service_ids],
+            _promo_flags(dates, since),
+            _weekdays(dates),
+            np.array(hours, dtype=np.int64),
+        ), np.array(bookings, dtype=np.int32))
+
+    # Days without appointments still count: they had zero bookings.
+    dates = np.arange(
+        np.datetime64(start, 'D'),
+        np.datetime64(until, 'D') + 1,
+    )
+    np.add.at(days, (_promo_flags(dates, since), _weekdays(dates)), 1)
+
+    snapshot, _ = DemandSnapshot.objects.update_or_create(
+        branch_id=branch_id,
+        defaults={
+            'through': until,
+            'services': services,
+            'counts': _dump(counts),
+            'days': _dump(days),
+        },
+    )
+    return snapshot
+
+
+def refresh_all(until=None, full=False):
+    """Refresh every branch's snapshot; return how many were refreshed."""
+    refreshed = 0
+    for branch_id in Branch.objects.order_by('id').values_list(
+        'id', flat=True,
+    ):
+        if refresh(branch_id, until=until, full=full) is not None:
+            refreshed += 1
+    return refreshed
+
+
+def _rates(counts, days):
+    """Return average bookings per day, (promo, weekday, hour)."""
+    rates = np.divide(
+        counts, days[:, :, None],
+        out=np.zeros(counts.shape), where=days[:, :, None] > 0,
+    )
+    totals = counts.sum(axis=(1, 2))
+    covered = days.sum(axis=1)
+    if covered.all() and totals.all():
+        lift = (totals[1] / covered[1]) / (totals[0] / covered[0])
+    else:
+        lift = 1.0
+    # Fill the cells a flag never covered from the other flag.
+    for weekday in np.flatnonzero(days[1] == 0):
+        rates[1, weekday] = rates[0, weekday] * lift
+    for weekday in np.flatnonzero(days[0] == 0):
+        rates[0, weekday] = rates[1, weekday] / lift
+    return rates
+
+
+def forecast(counts, days, start, weeks):
+    """Return the dates, promo flags and expected bookings per hour."""
+    rates = _rates(counts, days)
+    dates = np.datetime64(start, 'D') + np.arange(weeks * 7)
+    # Promos run every week, so the current ones cover every coming day.
+    promo = (~np.isnat(_promo_since())).astype(np.int64)[_weekdays(dates)]
+    return dates.tolist(), promo.astype(bool).tolist(), \
+        rates[promo, _weekdays(dates)]
+
+
+def report(snapshot, service_id=None, weeks=2, start=None):
+    """Return the heatmap and forecast of a snapshot, ready to serialize."""
+    services, counts, days = load(snapshot)
+    if service_id is None:
+        counts = counts.sum(axis=0)
+    elif service_id in services:
+        counts = counts[np.flatnonzero(services == service_id)[0]]
+    else:
+        counts = np.zeros((2, 7, 24), dtype=np.int32)
+    per_technician = getattr(
+        settings, 'SALON_BOOKINGS_PER_TECHNICIAN_HOUR', 1,
+    )
+    dates, promos, expected = forecast(
+        counts, days, start or datetime.date.today(), weeks,
+    )
+    return {
+        'branch': snapshot.branch_id,
+        'service': service_id,
+        'through': snapshot.through,
+        'days': days.sum(axis=0).tolist(),
+        'heatmap': counts.sum(axis=0).tolist(),
+        'forecast': [
+            {
+                'date': date,
+                'promo': promo,
+                'bookings': [round(value, 2) for value in hours.tolist()],
+                'staff': [
+                    math.ceil(round(value / per_technician, 6))
+                    for value in hours.tolist()
+                ],
+            }
+            for date, promo, hours in zip(dates, promos, expected)
+        ],
+    }
@@ -0,0 +1,328 @@
+"""
+Bulk import of clients from CSV or Excel files.
+
+The file is parsed as a stream and its rows are normalized (trimmed names,
+digits-only phones, lowercased emails) and validated a chunk at a time.
+Rows repeating a phone or email seen earlier in the file are rejected.
+
+On PostgreSQL the valid rows are streamed with ``COPY`` into a temporary
+staging table, matched against existing clients by email or phone in one
+statement, and the new ones merged into ``core_client`` with a single
+``INSERT ... SELECT``. Other databases fall back to chunked ORM queries.
+The whole import is one transaction, and returns a report with the row
+number and reason of every row that wasn't imported.
+
+Excel files need openpyxl, which is optional.
+"""
+import csv
+import datetime
+import io
+import itertools
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core.models import Client
+
+
+FIELDS = ['name', 'last_name', 'phone', 'email', 'birthday', 'comments']
+REQUIRED = ['name', 'last_name', 'birthday']
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+CHUNK_SIZE = 5000
+STAGING = 'client_import_staging'
+# Key of the advisory lock serializing imports, so two imports of the
+# same clients can't both find them missing.
+LOCK_KEY = 0x636c69656e74
+
+
+class InvalidFile(ValueError):
+    """The upload isn't a client file that can be read."""
+
+
+def _header(names):
+    """Return the field of each column (None for unknown columns)."""
+    fields = [
+        str(name or '').strip().lower().replace(' ', '_')
+        for name in names
+    ]
+    missing = [name for name in REQUIRED if name not in fields]
+    if missing:
+        raise InvalidFile(f'Missing columns: {", ".join(missing)}.')
+    if 'phone' not in fields and 'email' not in fields:
+        raise InvalidFile('A phone or email column is required.')
+    return [name if name in FIELDS else None for name in fields]
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        first = text.readline()
+    except UnicodeDecodeError:
+        raise InvalidFile('CSV files must be UTF-8 encoded.')
+    if not first.strip():
+        raise InvalidFile('The file is empty.')
+    try:
+        dialect = csv.Sniffer().sniff(first, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(itertools.chain([first], text), dialect)
+    try:
+        yield from reader
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise InvalidFile(f'Unreadable CSV: {exc}')
+
+
+def _xlsx_rows(file):
+    try:
+        import openpyxl
+    except ImportError:
+        raise InvalidFile(
+            'Excel files need openpyxl installed; upload a CSV instead.'
+        )
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True,
+                                          data_only=True)
+    except Exception as exc:
+        raise InvalidFile(f'Unreadable Excel file: {exc}')
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """Yield (row number, {field: value}) for every row of a file."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        rows = _xlsx_rows(file)
+    else:
+        rows = _csv_rows(file)
+    header = next(rows, None)
+    if header is None:
+        raise InvalidFile('The file is empty.')
+    fields = _header(header)
+    # Row numbers count the header, as spreadsheets show them.
+    for number, values in enumerate(rows, start=2):
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield number, {
+            field: value
+            for field, value in zip(fields, values)
+            if field is not None
+        }
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    return None
+
+
+def normalize(row):
+    """Return (values, errors) of a raw row."""
+    values = {}
+    errors = {}
+    for field in ['name', 'last_name']:
+        values[field] = _text(row.get(field))
+        if not values[field]:
+            errors[field] = 'This field is required.'
+        elif len(values[field]) > 100:
+            errors[field] = 'Ensure this field has at most 100 characters.'
+
+    phone = _text(row.get('phone'))
+    values['phone'] = re.sub(r'\D', '', phone)
+    if phone and not 7 <= len(values['phone']) <= 15:
+        errors['phone'] = 'Enter a phone number of 7 to 15 digits.'
+
+    values['email'] = _text(row.get('email')).lower()
+    if values['email']:
+        try:
+            validate_email(values['email'])
+        except ValidationError:
+            errors['email'] = 'Enter a valid email address.'
+    if not values['phone'] and not values['email'] and \
+            'phone' not in errors:
+        errors['contact'] = 'A phone or email is required.'
+
+    birthday = row.get('birthday')
+    values['birthday'] = _date(birthday) if birthday else None
+    if not birthday:
+        errors['birthday'] = 'This field is required.'
+    elif values['birthday'] is None:
+        errors['birthday'] = 'Enter a date as YYYY-MM-DD or DD/MM/YYYY.'
+    elif values['birthday'] > datetime.date.today():
+        errors['birthday'] = 'The birthday is in the future.'
+
+    values['comments'] = _text(row.get('comments'))
+    return values, errors
+
+
+class PostgresLoader:
+    """Load rows with COPY and merge them with one INSERT ... SELECT."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {STAGING} ('
+            'row integer PRIMARY KEY, name varchar(100), '
+            'last_name varchar(100), phone varchar(15), '
+            'email varchar(254), birthday date, comments text, '
+            'existing bigint) ON COMMIT DROP'
+        )
+
+    def load(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for number, values in rows:
+            writer.writerow([number, *[values[field] for field in FIELDS]])
+        buffer.seek(0)
+        self.cursor.copy_expert(
+            f'COPY {STAGING} (row, {", ".join(FIELDS)}) '
+            # Empty strings stay empty strings rather than NULLs.
+            'FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL '
+            '(name, last_name, phone, email, comments))',
+            buffer,
+        )
+
+    def finish(self):
+        """Insert the new clients; return (inserted, [(row, client)])."""
+        self.cursor.execute(f'ANALYZE {STAGING}')
+        self.cursor.execute(
+            f'UPDATE {STAGING} s SET existing = m.id FROM ('
+            'SELECT row, min(id) AS id FROM ('
+            f'SELECT s.row, c.id FROM {STAGING} s '
+            'JOIN core_client c ON lower(c.email) = s.email '
+            "WHERE s.email <> '' "
+            'UNION ALL '
+            f'SELECT s.row, c.id FROM {STAGING} s '
+            'JOIN core_client c ON c.phone = s.phone '
+            "WHERE s.phone <> ''"
+            ') matches GROUP BY row) m WHERE s.row = m.row'
+        )
+        self.cursor.execute(
+            f'SELECT row, existing FROM {STAGING} '
+            'WHERE existing IS NOT NULL ORDER BY row'
+        )
+        duplicates = self.cursor.fetchall()
+        now = timezone.now()
+        self.cursor.execute(
+            f'INSERT INTO core_client ({", ".join(FIELDS)}, '
+            'created_at, updated_at) '
+            f'SELECT {", ".join(FIELDS)}, %s, %s FROM {STAGING} '
+            'WHERE existing IS NULL ORDER BY row',
+            [now, now],
+        )
+        inserted = self.cursor.rowcount
+        # Dropped on commit anyway, unless we are inside a larger one.
+        self.cursor.execute(f'DROP TABLE {STAGING}')
+        return inserted, duplicates
+
+
+class OrmLoader:
+    """Merge rows a chunk at a time with the ORM."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = []
+
+    def load(self, rows):
+        emails = [values['email'] for _, values in rows if values['email']]
+        phones = [values['phone'] for _, values in rows if values['phone']]
+        by_email = {}
+        by_phone = {}
+        for client_id, email, phone in Client.objects.annotate(
+            email_lower=Lower('email'),
+        ).filter(
+            Q(email_lower__in=emails) | Q(phone__in=phones),
+        ).order_by('-id').values_list('id', 'email_lower', 'phone'):
+            by_email[email] = client_id
+            by_phone[phone] = client_id
+
+        clients = []
+        for number, values in rows:
+            existing = (
+                values['email'] and by_email.get(values['email']) or
+                values['phone'] and by_phone.get(values['phone'])
+            )
+            if existing:
+                self.duplicates.append((number, existing))
+            else:
+                clients.append(Client(**values))
+        Client.objects.bulk_create(clients)
+        self.inserted += len(clients)
+
+    def finish(self):
+        return self.inserted, self.duplicates
+
+
+def import_clients(file, filename):
+    """Import the clients in a CSV or Excel file; return the report."""
+    report = []
+    emails = {}
+    phones = {}
+    total = 0
+    rows = read_rows(file, filename)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            loader = PostgresLoader(cursor)
+        else:
+            loader = OrmLoader()
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            total += len(chunk)
+            valid = []
+            for number, row in chunk:
+                values, errors = normalize(row)
+                if not errors:
+                    seen = emails.get(values['email']) or \
+                        phones.get(values['phone'])
+                    if seen:
+                        errors['contact'] = f'Duplicate of row {seen}.'
+                if errors:
+                    report.append({
+                        'row': number, 'status': 'invalid', 'errors': errors,
+                    })
+                    continue
+                if values['email']:
+                    emails[values['email']] = number
+                if values['phone']:
+                    phones[values['phone']] = number
+                valid.append((number, values))
+            if valid:
+                loader.load(valid)
+        inserted, duplicates = loader.finish()
+
+    report.extend(
+        {'row': number, 'status': 'duplicate', 'client': client_id}
+        for number, client_id in duplicates
+    )
+    report.sort(key=lambda item: item['row'])
+    return {
+        'rows': total,
+        'inserted': inserted,
+        'duplicates': len(duplicates),
+        'invalid': total - inserted - len(duplicates),
+        'report': report,
+    }
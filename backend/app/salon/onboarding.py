@@ -0,0 +1,73 @@
+"""
+Bulk onboarding of technicians.
+
+Creating technicians one by one hashes each password in turn, saves the
+user, inserts its Technician, and gets or creates each skill and branch
+link. Onboarding a batch hashes every password at once on the hashing
+pool, then writes the users, the technicians and each link table with one
+multi-row insert apiece, in a single transaction.
+
+Bulk inserts send no signals, so the staff index is invalidated here.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core import passwords
+from core.models import Technician
+from salon import staff_index
+
+
+def _saved_ids(objects, model, field, values):
+    """Return the ids of bulk-created objects, by a unique field."""
+    if all(obj.pk is not None for obj in objects):
+        return [obj.pk for obj in objects]
+    # Databases that can't return ids from a bulk insert.
+    ids = dict(model.objects.filter(
+        **{f'{field}__in': values},
+    ).values_list(field, 'id'))
+    return [ids[value] for value in values]
+
+
+def onboard(technicians):
+    """
+    Create technicians in bulk; return their ids, in order.
+
+    Each technician is a dict with the user's email, name and password,
+    and the ids of its skills and branches. Emails must be normalized,
+    unique and not taken already.
+    """
+    User = get_user_model()
+    hashes = passwords.make_passwords(
+        [technician['password'] for technician in technicians]
+    )
+    users = [
+        # Staff, as UserManager.create_user makes every technician.
+        User(email=technician['email'], name=technician.get('name', ''),
+             password=encoded, is_staff=True)
+        for technician, encoded in zip(technicians, hashes)
+    ]
+    emails = [user.email for user in users]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        user_ids = _saved_ids(users, User, 'email', emails)
+        staff = [Technician(user_id=user_id) for user_id in user_ids]
+        Technician.objects.bulk_create(staff)
+        technician_ids = _saved_ids(staff, Technician, 'user_id', user_ids)
+
+        Technician.skills.through.objects.bulk_create([
+            Technician.skills.through(
+                technician_id=technician_id, skill_id=skill_id,
+            )
+            for technician_id, technician in zip(technician_ids, technicians)
+            for skill_id in set(technician.get('skills', []))
+        ])
+        Technician.branches.through.objects.bulk_create([
+            Technician.branches.through(
+                technician_id=technician_id, branch_id=branch_id,
+            )
+            for technician_id, technician in zip(technician_ids, technicians)
+            for branch_id in set(technician.get('branches', []))
+        ])
+        transaction.on_commit(staff_index.invalidate)
+    return technician_ids
@@ -0,0 +1,206 @@
+"""
+Payroll runs: per-technician earnings over a pay period.
+
+Each branch is computed independently, so branches are spread over a
+process pool. A worker streams its branch's appointments as integer cents
+straight from the database and sums them per technician with numpy, in
+chunks, so memory stays flat however busy the branch was. Integer cents
+keep the totals exact; ``reference_totals`` computes the same figures
+with a plain ORM aggregation to check against.
+"""
+import itertools
+from decimal import Decimal
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Sum,
+)
+from django.db.models.functions import Cast, Round
+
+from core import processes
+from core.models import (
+    Appointment,
+    Branch,
+    PayrollLine,
+    PayrollRun,
+    Technician,
+)
+
+
+AMOUNTS = ['final_income', 'commission', 'tip', 'courtesy']
+CHUNK_SIZE = 20000
+
+
+def cents(field):
+    """Return an expression for a money field as integer cents."""
+    amount = ExpressionWrapper(
+        F(field) * 100, output_field=DecimalField(),
+    )
+    return Cast(Round(amount), output_field=BigIntegerField())
+
+
+def _appointments(branch_id, start, end):
+    return Appointment.objects.filter(
+        branch_id=branch_id, date__gte=start, date__lte=end,
+    )
+
+
+def _aggregate(totals, chunk):
+    """Add a chunk of (technician, *cents) rows into totals."""
+    rows = np.array(chunk, dtype=np.int64)
+    rows = rows[np.argsort(rows[:, 0], kind='stable')]
+    technicians = rows[:, 0]
+    starts = np.concatenate(
+        ([0], np.flatnonzero(np.diff(technicians)) + 1),
+    )
+    counts = np.diff(np.append(starts, len(rows)))
+    sums = np.add.reduceat(rows[:, 1:], starts, axis=0)
+    for technician, count, amounts in zip(
+        technicians[starts].tolist(), counts.tolist(), sums,
+    ):
+        if technician in totals:
+            totals[technician] += np.concatenate(([count], amounts))
+        else:
+            totals[technician] = np.concatenate(([count], amounts))
+
+
+def branch_totals(branch_id, start, end):
+    """
+    Return (technician_id, count, *cents) rows for one branch.
+
+    The cents follow the order of AMOUNTS.
+    """
+    rows = _appointments(branch_id, start, end).values_list(
+        'technician_id', *[cents(field) for field in AMOUNTS],
+    ).iterator(chunk_size=CHUNK_SIZE)
+    totals = {}
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        _aggregate(totals, chunk)
+    return [
+        (technician, *values.tolist())
+        for technician, values in sorted(totals.items())
+    ]
+
+
+def compute(start, end, workers=None):
+    """Return {branch_id: rows} (see branch_totals) for the period."""
+    branch_ids = list(
+        Branch.objects.filter(
+            appointment__date__gte=start, appointment__date__lte=end,
+        ).distinct().order_by('id').values_list('id', flat=True)
+    )
+    if workers is None:
+        workers = getattr(settings, 'PAYROLL_WORKERS', 4)
+    workers = min(workers, len(branch_ids))
+    if workers <= 1:
+        return {
+            branch_id: branch_totals(branch_id, start, end)
+            for branch_id in branch_ids
+        }
+    results = processes.starmap(
+        'salon.payroll.branch_totals',
+        [(branch_id, start, end) for branch_id in branch_ids],
+        workers,
+    )
+    return dict(zip(branch_ids, results))
+
+
+def _decimal(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def run_payroll(start, end, user=None, workers=None):
+    """Compute the payroll of a period and store it as a PayrollRun."""
+    results = compute(start, end, workers)
+    branches = dict(
+        Branch.objects.filter(id__in=results).values_list('id', 'name')
+    )
+    technician_ids = {row[0] for rows in results.values() for row in rows}
+    technicians = {
+        technician.id: str(technician)
+        for technician in Technician.objects.filter(
+            id__in=technician_ids,
+        ).select_related('user')
+    }
+
+    lines = []
+    totals = np.zeros(len(AMOUNTS) + 1, dtype=np.int64)
+    for branch_id, rows in results.items():
+        for technician_id, count, *cents in rows:
+            totals += [count, *cents]
+            gross, commission, tip, courtesy = map(_decimal, cents)
+            lines.append(PayrollLine(
+                branch_id=branch_id,
+                branch_name=branches[branch_id],
+                technician_id=technician_id,
+                technician_name=technicians[technician_id],
+                appointment_count=count,
+                gross=gross,
+                commission=commission,
+                tip=tip,
+                courtesy=courtesy,
+            ))
+
+    count, *cents = totals.tolist()
+    gross, commission, tip, courtesy = map(_decimal, cents)
+    with transaction.atomic():
+        run = PayrollRun.objects.create(
+            period_start=start,
+            period_end=end,
+            appointment_count=count,
+            gross=gross,
+            commission=commission,
+            tip=tip,
+            courtesy=courtesy,
+            created_by=user,
+        )
+        for line in lines:
+            line.run = run
+        PayrollLine.objects.bulk_create(lines)
+    return run
+
+
+def reference_totals(start, end):
+    """Return the payroll figures of a period from an ORM aggregation."""
+    rows = Appointment.objects.filter(
+        date__gte=start, date__lte=end,
+    ).values('branch_id', 'technician_id').annotate(
+        appointment_count=Count('id'),
+        gross=Sum('final_income'),
+        commission=Sum('commission'),
+        tip=Sum('tip'),
+        courtesy=Sum('courtesy'),
+    )
+    return {
+        (row['branch_id'], row['technician_id']): (
+            row['appointment_count'],
+            *[row[name].quantize(Decimal('0.01')) for name in
+              ['gross', 'commission', 'tip', 'courtesy']],
+        )
+        for row in rows
+    }
+
+
+def line_totals(run):
+    """Return a run's lines in the format of reference_totals."""
+    return {
+        (line.branch_id, line.technician_id): (
+            line.appointment_count,
+            line.gross,
+            line.commission,
+            line.tip,
+            line.courtesy,
+        )
+        for line in run.lines.all()
+    }
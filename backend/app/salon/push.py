@@ -0,0 +1,170 @@
+"""
+Fan-out of appointment change events to live subscribers.
+
+Subscribers listen on channels such as ``branch:3`` or ``technician:7``.
+The in-process broker serves a single node; ``RedisBroker`` relays events
+through Redis pub/sub so that every node sees every write.
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+QUEUE_SIZE = 100
+
+
+def branch_channel(branch_id):
+    return f'branch:{branch_id}'
+
+
+def technician_channel(technician_id):
+    return f'technician:{technician_id}'
+
+
+class Subscription:
+    """Queue of messages for one subscriber, bound to its event loop."""
+
+    def __init__(self, channels, loop):
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _put(self, message):
+        if self.queue.full():
+            # A slow client loses the oldest event rather than holding
+            # memory; it can always refetch the agenda.
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def deliver(self, message):
+        """Queue message from any thread."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Broker delivering events to subscribers of this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def publish(self, channel, message):
+        """Deliver message to every subscriber of channel."""
+        with self._lock:
+            targets = [
+                sub for sub in self._subscriptions
+                if channel in sub.channels
+            ]
+        for sub in targets:
+            sub.deliver(message)
+
+    async def subscribe(self, channels):
+        """Return a new subscription to channels."""
+        sub = Subscription(channels, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(sub)
+        return sub
+
+    async def unsubscribe(self, sub):
+        with self._lock:
+            self._subscriptions.discard(sub)
+
+
+class RedisBroker(InProcessBroker):
+    """Broker relaying events between nodes through Redis pub/sub."""
+
+    prefix = 'salon:push:'
+
+    def __init__(self, url=None):
+        super().__init__()
+        import redis
+        self.url = url or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self.url)
+        self._listener = None
+
+    def publish(self, channel, message):
+        self._client.publish(self.prefix + channel, message)
+
+    async def _listen(self):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(self.prefix + '*')
+        async for item in pubsub.listen():
+            if item['type'] != 'pmessage':
+                continue
+            channel = item['channel'].decode()[len(self.prefix):]
+            InProcessBroker.publish(self, channel, item['data'].decode())
+
+    async def subscribe(self, channels):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(
+                self._listen()
+            )
+        return await super().subscribe(channels)
+
+
+_broker = None
+
+
+def get_broker():
+    """Return the broker configured by SALON_PUSH_BROKER."""
+    global _broker
+    if _broker is None:
+        path = getattr(
+            settings,
+            'SALON_PUSH_BROKER',
+            'salon.push.InProcessBroker',
+        )
+        _broker = import_string(path)()
+    return _broker
+
+
+def appointment_event(op, appointment):
+    """Return the compact JSON event describing an appointment change."""
+    return json.dumps({
+        'op': op,
+        'id': appointment.pk,
+        'branch': appointment.branch_id,
+        'technician': appointment.technician_id,
+        'date': str(appointment.date),
+        'time': str(appointment.time),
+    }, separators=(',', ':'))
+
+
+def appointment_messages(op, appointment, previous=None):
+    """
+    Return the (channel, message) pairs announcing an appointment change.
+
+    previous is the (branch_id, date, technician_id) the appointment had
+    before an update; subscribers it moved away from get a delete event.
+    """
+    message = appointment_event(op, appointment)
+    channels = [
+        branch_channel(appointment.branch_id),
+        technician_channel(appointment.technician_id),
+    ]
+    messages = [(channel, message) for channel in channels]
+
+    if previous is not None:
+        branch_id, _, technician_id = previous
+        removed = {
+            branch_channel(branch_id),
+            technician_channel(technician_id),
+        }.difference(channels)
+        delete = appointment_event('delete', appointment)
+        messages.extend((channel, delete) for channel in sorted(removed))
+    return messages
+
+
+def publish_all(messages):
+    """Publish (channel, message) pairs through the configured broker."""
+    broker = get_broker()
+    for channel, message in messages:
+        broker.publish(channel, message)
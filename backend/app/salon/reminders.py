@@ -0,0 +1,218 @@
+"""
+Reminders of upcoming appointments, by email or SMS.
+
+``dispatch`` walks a day's appointments in id order, a chunk at a time
+(keyset pagination, so each chunk is one indexed query however far in it
+is). For each chunk it records one Reminder per appointment and channel,
+claims the ones not sent yet, renders their messages and hands them to
+the channel's backend over a bounded thread pool.
+
+The (appointment, channel) unique constraint makes reruns safe: a
+reminder is claimed (marked sending) before delivery, so a reminder that
+was sent, or may have been, is never sent again. Failed ones are retried
+on the next run until SALON_REMINDER_MAX_ATTEMPTS.
+
+Backends are configured per channel in SALON_REMINDER_BACKENDS, by dotted
+path, and only need a ``send(message)`` method that raises on failure.
+"""
+import collections
+import datetime
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Appointment, Reminder
+
+
+CHUNK_SIZE = 1000
+TEMPLATE = (
+    'Hola {client}, te recordamos tu cita de {service} el {date} '
+    'a las {time} en {branch}.'
+)
+SUBJECT = 'Recordatorio de tu cita'
+# Which client field each channel sends to.
+RECIPIENTS = {'email': 'client__email', 'sms': 'client__phone'}
+
+Message = collections.namedtuple(
+    'Message', ['reminder_id', 'channel', 'to', 'body'],
+)
+
+
+class ConsoleBackend:
+    """Backend writing messages to stdout."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            self.stream.write(
+                f'[{message.channel}] {message.to}: {message.body}\n'
+            )
+            self.stream.flush()
+
+
+class FileBackend:
+    """Backend appending messages to SALON_REMINDER_FILE as JSON lines."""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(
+            settings, 'SALON_REMINDER_FILE', 'reminders.jsonl',
+        )
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(message._asdict(), ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line + '\n')
+
+
+class LocmemBackend:
+    """Backend keeping messages in LocmemBackend.outbox, for tests."""
+
+    outbox = []
+    _lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            self.outbox.append(message)
+
+
+class EmailBackend:
+    """Backend sending messages through Django's email backend."""
+
+    def send(self, message):
+        send_mail(SUBJECT, message.body, None, [message.to])
+
+
+def get_backends():
+    """Return {channel: backend} as configured in SALON_REMINDER_BACKENDS."""
+    return {
+        channel: import_string(path)()
+        for channel, path in getattr(
+            settings, 'SALON_REMINDER_BACKENDS', {},
+        ).items()
+    }
+
+
+def _chunks(date, chunk_size):
+    """Yield the appointments of date as lists of dicts, by id."""
+    last = 0
+    while True:
+        chunk = list(
+            Appointment.objects.filter(date=date, id__gt=last).values(
+                'id', 'date', 'time', 'client__name', 'client__email',
+                'client__phone', 'service__name', 'branch__name',
+            ).order_by('id')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]['id']
+
+
+def render(appointment):
+    """Return the reminder text of an appointment row."""
+    return TEMPLATE.format(
+        client=appointment['client__name'],
+        service=appointment['service__name'],
+        date=appointment['date'].strftime('%d/%m/%Y'),
+        time=appointment['time'].strftime('%H:%M'),
+        branch=appointment['branch__name'],
+    )
+
+
+def _claim(chunk, channels):
+    """Record the chunk's reminders and claim the unsent ones."""
+    max_attempts = getattr(settings, 'SALON_REMINDER_MAX_ATTEMPTS', 3)
+    with transaction.atomic():
+        Reminder.objects.bulk_create([
+            Reminder(
+                appointment_id=appointment['id'],
+                channel=channel,
+                recipient=appointment[RECIPIENTS[channel]],
+            )
+            for appointment in chunk
+            for channel in channels
+            if appointment[RECIPIENTS[channel]]
+        ], ignore_conflicts=True)
+        claimed = list(
+            Reminder.objects.select_for_update(skip_locked=True).filter(
+                appointment_id__in=[row['id'] for row in chunk],
+                channel__in=channels,
+                status__in=[Reminder.PENDING, Reminder.FAILED],
+                attempts__lt=max_attempts,
+            ).order_by('id')
+        )
+        Reminder.objects.filter(
+            id__in=[reminder.id for reminder in claimed],
+        ).update(status=Reminder.SENDING, attempts=F('attempts') + 1)
+    return claimed
+
+
+def _send(backends, message):
+    """Send message; return the error text, or '' on success."""
+    try:
+        backends[message.channel].send(message)
+    except Exception as exc:
+        return f'{type(exc).__name__}: {exc}'
+    return ''
+
+
+def dispatch(date=None, backends=None, chunk_size=CHUNK_SIZE,
+             concurrency=None):
+    """
+    Send the reminders of date's appointments (tomorrow by default).
+
+    Return a Counter of appointments seen and reminders sent and failed.
+    """
+    if date is None:
+        date = timezone.localdate() + datetime.timedelta(days=1)
+    if backends is None:
+        backends = get_backends()
+    if concurrency is None:
+        concurrency = getattr(settings, 'SALON_REMINDER_CONCURRENCY', 8)
+    channels = sorted(backends)
+    totals = collections.Counter()
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for chunk in _chunks(date, chunk_size):
+            totals['appointments'] += len(chunk)
+            rows = {row['id']: row for row in chunk}
+            claimed = _claim(chunk, channels)
+            messages = [
+                Message(
+                    reminder.id,
+                    reminder.channel,
+                    reminder.recipient,
+                    render(rows[reminder.appointment_id]),
+                )
+                for reminder in claimed
+            ]
+            errors = list(pool.map(
+                lambda message: _send(backends, message), messages,
+            ))
+
+            now = timezone.now()
+            for reminder, error in zip(claimed, errors):
+                reminder.error = error
+                if error:
+                    reminder.status = Reminder.FAILED
+                    totals['failed'] += 1
+                else:
+                    reminder.status = Reminder.SENT
+                    reminder.sent_at = now
+                    totals['sent'] += 1
+            Reminder.objects.bulk_update(
+                claimed, ['status', 'error', 'sent_at'],
+            )
+    return totals
@@ -1,9 +1,15 @@
 """
 Serializers for branch APIs
 """
+from collections import Counter
+
+from django.conf import settings
+
 from rest_framework import serializers
 
 from core.models import (
+    PayrollLine,
+    PayrollRun,
     Branch,
     Skill,
     Service,
@@ -11,6 +17,7 @@ from core.models import (
     Discount,
     Promo,
     Client,
+    ClientStats,
     Appointment,
     Technician
 )
@@ -42,10 +49,28 @@ class ServiceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Service
-        fields = ['id', 'name', 'price']
+        fields = ['id', 'name', 'price', 'required_skills']
         read_only_fields = ['id']
 
 
+class AppointmentServiceSerializer(ServiceSerializer):
+    """Serializer for the service of an appointment."""
+
+    class Meta(ServiceSerializer.Meta):
+        # Cached agendas don't need to follow changes to required skills.
+        fields = ['id', 'name', 'price']
+
+
+class RepriceSerializer(serializers.Serializer):
+    """Serializer for a bulk price change of services."""
+    percent = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=-90, max_value=1000,
+    )
+    services = serializers.PrimaryKeyRelatedField(
+        queryset=Service.objects.all(), many=True, required=False,
+    )
+
+
 class PaymentSerializer(serializers.ModelSerializer):
     """Serializer for Payments"""
 
@@ -73,16 +98,79 @@ class PromoSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+# Reference catalogs, keyed by their API resource name.
+CATALOG_SERIALIZERS = {
+    'branches': BranchSerializer,
+    'skills': SkillSerializer,
+    'services': ServiceSerializer,
+    'payments': PaymentSerializer,
+    'discounts': DiscountSerializer,
+    'promos': PromoSerializer,
+}
+
+# Relations the catalog serializers read, prefetched when listing them.
+CATALOG_PREFETCH = {
+    'services': ['required_skills'],
+}
+
+
+def catalog_queryset(name):
+    """Return every row of a catalog, ready to serialize."""
+    serializer_class = CATALOG_SERIALIZERS[name]
+    return serializer_class.Meta.model.objects.prefetch_related(
+        *CATALOG_PREFETCH.get(name, []),
+    ).order_by('id')
+
+
+class ClientStatsSerializer(serializers.ModelSerializer):
+    """Serializer for a client's visit statistics."""
+
+    class Meta:
+        model = ClientStats
+        fields = ['last_visit', 'visit_count', 'total_spend',
+                  'favorite_technician', 'favorite_service']
+        read_only_fields = fields
+
+
 class ClientSerializer(serializers.ModelSerializer):
     """Serializer for Clients"""
+    stats = ClientStatsSerializer(read_only=True)
 
     class Meta:
         model = Client
         fields = ['id', 'name', 'last_name',
-                  'phone', 'email', 'birthday', 'comments']
+                  'phone', 'email', 'birthday', 'comments', 'stats']
         read_only_fields = ['id']
 
 
+class AppointmentClientSerializer(ClientSerializer):
+    """Serializer for the client of an appointment."""
+    stats = None
+
+    class Meta(ClientSerializer.Meta):
+        # Stats change with every visit; cached agendas leave them out.
+        fields = ['id', 'name', 'last_name',
+                  'phone', 'email', 'birthday', 'comments']
+
+
+class ClientImportSerializer(serializers.Serializer):
+    """Serializer for a client file to import."""
+    file = serializers.FileField()
+
+    def validate_file(self, value):
+        """Accept CSV and Excel files up to SALON_IMPORT_MAX_BYTES."""
+        if not value.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            raise serializers.ValidationError(
+                'Upload a .csv or .xlsx file.'
+            )
+        limit = getattr(settings, 'SALON_IMPORT_MAX_BYTES', 20 * 2 ** 20)
+        if value.size > limit:
+            raise serializers.ValidationError(
+                f'The file is larger than {limit // 2 ** 20} MB.'
+            )
+        return value
+
+
 class TechnicianSerializer(serializers.ModelSerializer):
     """Serializer for Technician"""
     user = UserSerializer()
@@ -155,12 +243,61 @@ class TechnicianSerializer(serializers.ModelSerializer):
         return instance
 
 
+class OnboardTechnicianSerializer(serializers.Serializer):
+    """Serializer for one technician of a bulk onboarding."""
+    email = serializers.EmailField(max_length=255)
+    name = serializers.CharField(max_length=255, required=False,
+                                 allow_blank=True)
+    password = serializers.CharField(min_length=5, write_only=True,
+                                     trim_whitespace=False)
+    skills = serializers.ListField(child=serializers.IntegerField(),
+                                   required=False)
+    branches = serializers.ListField(child=serializers.IntegerField(),
+                                     required=False)
+
+    def validate_email(self, value):
+        """Normalize the email the way UserManager.create_user does."""
+        return User.objects.normalize_email(value)
+
+
+class OnboardingSerializer(serializers.Serializer):
+    """Serializer for a batch of technicians to create."""
+    technicians = OnboardTechnicianSerializer(many=True, allow_empty=False,
+                                              max_length=1000)
+
+    def validate_technicians(self, value):
+        """Check emails are new and skills and branches exist."""
+        emails = Counter(technician['email'] for technician in value)
+        repeated = {email for email, count in emails.items() if count > 1}
+        taken = set(User.objects.filter(
+            email__in=emails,
+        ).values_list('email', flat=True))
+        if repeated or taken:
+            raise serializers.ValidationError(
+                f'Emails already in use: {sorted(repeated | taken)}.'
+            )
+        for model, key in [(Skill, 'skills'), (Branch, 'branches')]:
+            ids = {
+                related_id
+                for technician in value
+                for related_id in technician.get(key, [])
+            }
+            missing = ids - set(
+                model.objects.filter(id__in=ids).values_list('id', flat=True)
+            )
+            if missing:
+                raise serializers.ValidationError(
+                    f'Unknown {key}: {sorted(missing)}.'
+                )
+        return value
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     """Serializer for Appointments"""
     branch = BranchSerializer()
-    client = ClientSerializer()
+    client = AppointmentClientSerializer()
     technician = TechnicianSerializer()
-    service = ServiceSerializer()
+    service = AppointmentServiceSerializer()
     payment = PaymentSerializer()
     discount = DiscountSerializer()
 
@@ -258,3 +395,81 @@ class AppointmentSerializer(serializers.ModelSerializer):
 
         instance.save()
         return instance
+
+
+class BookingRequestSerializer(serializers.Serializer):
+    """Serializer for a booking to assign a technician to."""
+    service = serializers.IntegerField()
+    branch = serializers.IntegerField()
+    start = serializers.TimeField()
+    end = serializers.TimeField(required=False)
+
+    def validate(self, attrs):
+        """Make sure the window doesn't end before it starts."""
+        if attrs.get('end') and attrs['end'] < attrs['start']:
+            raise serializers.ValidationError('end must not be before start.')
+        return attrs
+
+
+class AssignmentSerializer(serializers.Serializer):
+    """Serializer for a batch of bookings of one day to assign."""
+    date = serializers.DateField()
+    requests = BookingRequestSerializer(many=True, allow_empty=False,
+                                        max_length=2000)
+
+    def validate_requests(self, value):
+        """Check every service and branch exists, in two queries."""
+        for model, key in [(Service, 'service'), (Branch, 'branch')]:
+            ids = {request[key] for request in value}
+            missing = ids - set(
+                model.objects.filter(id__in=ids).values_list('id', flat=True)
+            )
+            if missing:
+                raise serializers.ValidationError(
+                    f'Unknown {key} ids: {sorted(missing)}.'
+                )
+        return value
+
+
+class PayrollLineSerializer(serializers.ModelSerializer):
+    """Serializer for one technician's line of a payroll run."""
+
+    class Meta:
+        model = PayrollLine
+        fields = ['id', 'branch', 'branch_name', 'technician',
+                  'technician_name', 'appointment_count', 'gross',
+                  'commission', 'tip', 'courtesy']
+        read_only_fields = fields
+
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    """Serializer for payroll runs."""
+
+    class Meta:
+        model = PayrollRun
+        fields = ['id', 'period_start', 'period_end', 'appointment_count',
+                  'gross', 'commission', 'tip', 'courtesy', 'created_at']
+        read_only_fields = fields
+
+
+class PayrollRunDetailSerializer(PayrollRunSerializer):
+    """Serializer for a payroll run with its lines."""
+    lines = PayrollLineSerializer(many=True, read_only=True)
+
+    class Meta(PayrollRunSerializer.Meta):
+        fields = PayrollRunSerializer.Meta.fields + ['lines']
+        read_only_fields = fields
+
+
+class PayrollRequestSerializer(serializers.Serializer):
+    """Serializer for a request to run payroll."""
+    period_start = serializers.DateField()
+    period_end = serializers.DateField()
+
+    def validate(self, attrs):
+        """Make sure the period doesn't end before it starts."""
+        if attrs['period_end'] < attrs['period_start']:
+            raise serializers.ValidationError(
+                'period_end must not be before period_start.'
+            )
+        return attrs
@@ -0,0 +1,242 @@
+"""
+Signal handlers keeping salon caches in sync with the database.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Discount,
+    Payment,
+    Promo,
+    Service,
+    Skill,
+    Technician,
+    Tombstone,
+    User,
+)
+from salon import (
+    agenda,
+    bootstrap,
+    client_stats,
+    push,
+    staff_index,
+    sync,
+)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_slot(sender, instance, **kwargs):
+    """Remember where an appointment was before it is moved."""
+    instance._previous_slot = None
+    instance._previous_client = None
+    if instance.pk is not None:
+        previous = Appointment.objects.filter(
+            pk=instance.pk,
+        ).values_list(
+            'branch_id', 'date', 'technician_id', 'client_id',
+        ).first()
+        if previous is not None:
+            instance._previous_slot = previous[:3]
+            instance._previous_client = previous[3]
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_agenda(sender, instance, **kwargs):
+    """Invalidate the agendas an appointment was and now is listed in."""
+    pairs = [(instance.branch_id, instance.date)]
+    previous = getattr(instance, '_previous_slot', None)
+    if previous is not None:
+        pairs.append(previous[:2])
+    transaction.on_commit(partial(agenda.invalidate_many, pairs))
+
+
+@receiver(post_save, sender=Appointment)
+def push_appointment_saved(sender, instance, created, **kwargs):
+    """Notify live subscribers of a created or updated appointment."""
+    messages = push.appointment_messages(
+        'create' if created else 'update',
+        instance,
+        getattr(instance, '_previous_slot', None),
+    )
+    transaction.on_commit(partial(push.publish_all, messages))
+
+
+@receiver(post_delete, sender=Appointment)
+def push_appointment_deleted(sender, instance, **kwargs):
+    """Notify live subscribers of a deleted appointment."""
+    messages = push.appointment_messages('delete', instance)
+    transaction.on_commit(partial(push.publish_all, messages))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def update_client_stats(sender, instance, **kwargs):
+    """Recompute the stats of the clients an appointment belongs to."""
+    client_stats.schedule([
+        instance.client_id,
+        getattr(instance, '_previous_client', None),
+    ])
+
+
+def _invalidate_related(lookup, instance):
+    transaction.on_commit(
+        partial(agenda.invalidate_for, **{lookup: instance.pk})
+    )
+
+
+AGENDA_LOOKUPS = {
+    Client: 'client_id',
+    Technician: 'technician_id',
+    User: 'technician__user_id',
+    Branch: 'branch_id',
+    Service: 'service_id',
+    Payment: 'payment_id',
+    Discount: 'discount_id',
+    Skill: 'technician__skills',
+}
+
+
+@receiver(post_save)
+def invalidate_related_agenda(sender, instance, created=False, **kwargs):
+    """Invalidate agendas embedding a changed client, technician, etc."""
+    lookup = AGENDA_LOOKUPS.get(sender)
+    if lookup is not None and not created:
+        _invalidate_related(lookup, instance)
+
+
+# Models owning the many-to-many relations whose changes are tracked.
+LINK_OWNERS = {
+    Technician.skills.through: Technician,
+    Technician.branches.through: Technician,
+    Service.required_skills.through: Service,
+}
+
+
+@receiver(m2m_changed, sender=Technician.skills.through)
+@receiver(m2m_changed, sender=Technician.branches.through)
+@receiver(m2m_changed, sender=Service.required_skills.through)
+def remember_cleared_links(sender, instance, action, reverse, **kwargs):
+    """Remember which rows a reverse clear() is about to unlink."""
+    # post_clear carries no pk_set, so handlers read this instead.
+    if reverse and action == 'pre_clear':
+        owner = LINK_OWNERS[sender]._meta.model_name
+        cleared = getattr(instance, '_cleared_links', {})
+        cleared[sender] = set(sender.objects.filter(
+            **{instance._meta.model_name: instance},
+        ).values_list(f'{owner}_id', flat=True))
+        instance._cleared_links = cleared
+
+
+def _changed_owners(sender, instance, action, reverse, pk_set):
+    """Return the ids of the rows whose related rows changed."""
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        cleared = getattr(instance, '_cleared_links', {})
+        return list(cleared.get(sender) or [])
+    return list(pk_set or [])
+
+
+@receiver(m2m_changed, sender=Technician.skills.through)
+@receiver(m2m_changed, sender=Technician.branches.through)
+def invalidate_technician_agenda(sender, instance, action, reverse,
+                                 pk_set, **kwargs):
+    """Invalidate agendas embedding a technician whose M2M changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    ids = _changed_owners(sender, instance, action, reverse, pk_set)
+    if ids:
+        transaction.on_commit(
+            partial(agenda.invalidate_for, technician_id__in=ids)
+        )
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """Record deleted rows so that delta sync can report them."""
+    Tombstone.objects.create(
+        resource=sync.resource_name(sender), object_id=instance.pk,
+    )
+
+
+# Connected per model: a receiver for every sender would keep Django from
+# fast-deleting the rows of any model.
+for model in sync.RESOURCES:
+    post_delete.connect(record_tombstone, sender=model)
+
+
+@receiver(m2m_changed, sender=Technician.skills.through)
+@receiver(m2m_changed, sender=Technician.branches.through)
+@receiver(m2m_changed, sender=Service.required_skills.through)
+def touch_link_owners(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mark technicians and services changed when their links change."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    ids = _changed_owners(sender, instance, action, reverse, pk_set)
+    LINK_OWNERS[sender].objects.filter(pk__in=ids).update(
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_user_technicians(sender, instance, created, **kwargs):
+    """Mark technicians changed when their user's name or email changes."""
+    if not created:
+        Technician.objects.filter(user=instance).update(
+            updated_at=timezone.now(),
+        )
+
+
+CATALOG_MODELS = (Branch, Skill, Service, Payment, Discount, Promo)
+
+
+def invalidate_bootstrap(sender, **kwargs):
+    """Invalidate the bootstrap bundle when a catalog changes."""
+    transaction.on_commit(bootstrap.invalidate)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_bootstrap, sender=model)
+    post_delete.connect(invalidate_bootstrap, sender=model)
+
+
+@receiver(m2m_changed, sender=Service.required_skills.through)
+def invalidate_bootstrap_links(sender, action, **kwargs):
+    """Invalidate the bootstrap bundle when required skills change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bootstrap.invalidate)
+
+
+@receiver(m2m_changed, sender=Technician.skills.through)
+@receiver(m2m_changed, sender=Technician.branches.through)
+def invalidate_staff_index_links(sender, action, **kwargs):
+    """Rebuild the staff index when skills or branches are reassigned."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(staff_index.invalidate)
+
+
+@receiver(post_save, sender=Technician)
+def invalidate_staff_index_created(sender, created, **kwargs):
+    """Add new technicians to the staff index."""
+    if created:
+        transaction.on_commit(staff_index.invalidate)
+
+
+@receiver(post_delete, sender=Technician)
+@receiver(post_delete, sender=Skill)
+@receiver(post_delete, sender=Branch)
+def invalidate_staff_index_deleted(sender, **kwargs):
+    """Rebuild the staff index when technicians, skills or branches go."""
+    transaction.on_commit(staff_index.invalidate)
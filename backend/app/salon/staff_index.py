@@ -0,0 +1,95 @@
+"""
+In-memory inverted index of technicians by branch and skill.
+
+Every technician gets a bit position, and each branch and skill keeps the
+bitset (a Python int) of its technicians, so "who at this branch has these
+skills" is a handful of integer ANDs instead of a query. The index is
+built once per process from the two link tables and kept with the
+generation it was built for; a generation counter in the shared cache,
+bumped whenever technicians, their skills or their branches change, tells
+every process to rebuild it.
+"""
+import threading
+import time
+
+from core.models import Technician
+from salon import cache
+
+
+GENERATION_KEY = 'salon:staff-index:gen'
+
+stats = cache.CacheStats()
+
+_lock = threading.Lock()
+_index = {'generation': None, 'index': None}
+
+
+class StaffIndex:
+    """Bitsets of technicians per branch and per skill."""
+
+    def __init__(self, technician_ids, branch_links, skill_links):
+        self.ids = sorted(technician_ids)
+        position = {technician_id: bit for bit, technician_id
+                    in enumerate(self.ids)}
+        self.everyone = (1 << len(self.ids)) - 1
+        self.branches = self._bitsets(branch_links, position)
+        self.skills = self._bitsets(skill_links, position)
+
+    @staticmethod
+    def _bitsets(links, position):
+        bitsets = {}
+        for technician_id, key in links:
+            bitsets[key] = bitsets.get(key, 0) | 1 << position[technician_id]
+        return bitsets
+
+    def lookup(self, branch=None, skills=()):
+        """Return the ids of technicians at branch with all of skills."""
+        bits = self.everyone
+        if branch is not None:
+            bits &= self.branches.get(branch, 0)
+        for skill in skills:
+            bits &= self.skills.get(skill, 0)
+        ids = []
+        while bits:
+            lowest = bits & -bits
+            ids.append(self.ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return ids
+
+
+def build_index():
+    """Read the technicians and their links into a StaffIndex."""
+    return StaffIndex(
+        Technician.objects.values_list('id', flat=True),
+        Technician.branches.through.objects.values_list(
+            'technician_id', 'branch_id',
+        ),
+        Technician.skills.through.objects.values_list(
+            'technician_id', 'skill_id',
+        ),
+    )
+
+
+def get_index():
+    """Return the index, rebuilding it if technicians have changed."""
+    generation = cache.get_generation(GENERATION_KEY)
+    with _lock:
+        if _index['generation'] == generation:
+            stats.hit()
+        else:
+            stats.miss()
+            start = time.perf_counter()
+            index = build_index()
+            stats.rebuilt(time.perf_counter() - start)
+            _index.update(generation=generation, index=index)
+        return _index['index']
+
+
+def lookup(branch=None, skills=()):
+    """Return the ids of technicians at branch with all of skills."""
+    return get_index().lookup(branch, skills)
+
+
+def invalidate():
+    """Mark the index stale in every process."""
+    cache.bump_generation(GENERATION_KEY)
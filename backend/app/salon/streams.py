@@ -0,0 +1,162 @@
+"""
+ASGI endpoints streaming live appointment changes.
+
+``/api/salon/stream/?branch=<id>&technician=<id>`` is served as
+Server-Sent Events over HTTP and as JSON text frames over WebSockets.
+Browsers can't set headers on either, so the auth token may also be
+passed as ``?token=<key>``.
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+
+from rest_framework.authtoken.models import Token
+
+from salon import push
+
+
+STREAM_PATH = '/api/salon/stream/'
+KEEPALIVE_SECONDS = 15
+
+
+def _authenticate(key):
+    """Return the active user owning token key, or None."""
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def _token_key(scope, query):
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode('latin1').split()
+            if len(parts) == 2 and parts[0].lower() == 'token':
+                return parts[1]
+    return query.get('token', [None])[0]
+
+
+def _channels(query):
+    """Return the channels requested in the query string."""
+    channels = []
+    for value in query.get('branch', []):
+        channels.append(push.branch_channel(int(value)))
+    for value in query.get('technician', []):
+        channels.append(push.technician_channel(int(value)))
+    return channels
+
+
+async def _subscribe(scope):
+    """Authenticate scope and return its subscription, or an HTTP status."""
+    query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+    key = _token_key(scope, query)
+    user = await sync_to_async(_authenticate)(key) if key else None
+    if user is None:
+        return None, 401
+    try:
+        channels = _channels(query)
+    except ValueError:
+        return None, 400
+    if not channels:
+        return None, 400
+    return await push.get_broker().subscribe(channels), 200
+
+
+async def _pump(sub, receive, send_message, disconnect_type):
+    """Forward events to the client until it disconnects."""
+    disconnected = asyncio.ensure_future(_wait_for(receive, disconnect_type))
+    try:
+        while True:
+            message = asyncio.ensure_future(sub.get())
+            done, _ = await asyncio.wait(
+                {message, disconnected},
+                timeout=KEEPALIVE_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                message.cancel()
+                return
+            if message in done:
+                await send_message(message.result())
+            else:
+                message.cancel()
+                await send_message(None)
+    finally:
+        disconnected.cancel()
+        await push.get_broker().unsubscribe(sub)
+
+
+async def _wait_for(receive, event_type):
+    while True:
+        event = await receive()
+        if event['type'] == event_type:
+            return event
+
+
+async def event_stream(scope, receive, send):
+    """Serve a subscription as a Server-Sent Events response."""
+    sub, status = await _subscribe(scope)
+    if sub is None:
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    async def send_message(message):
+        if message is None:
+            body = b': keepalive\n\n'
+        else:
+            body = f'data: {message}\n\n'.encode()
+        await send({
+            'type': 'http.response.body',
+            'body': body,
+            'more_body': True,
+        })
+
+    await _pump(sub, receive, send_message, 'http.disconnect')
+
+
+async def websocket_stream(scope, receive, send):
+    """Serve a subscription over a WebSocket."""
+    await _wait_for(receive, 'websocket.connect')
+    sub, status = await _subscribe(scope)
+    if sub is None:
+        await send({'type': 'websocket.close', 'code': 4000 + status})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def send_message(message):
+        if message is not None:
+            await send({'type': 'websocket.send', 'text': message})
+
+    await _pump(sub, receive, send_message, 'websocket.disconnect')
+
+
+def is_stream(scope):
+    """Return whether scope targets the live stream endpoint."""
+    return (
+        scope['type'] in ('http', 'websocket')
+        and scope['path'] == STREAM_PATH
+    )
+
+
+async def application(scope, receive, send):
+    """ASGI application for the live stream endpoint."""
+    if scope['type'] == 'websocket':
+        await websocket_stream(scope, receive, send)
+    else:
+        await event_stream(scope, receive, send)
@@ -0,0 +1,150 @@
+"""
+Delta sync for offline-capable clients.
+
+A client keeps the cursor returned by its last sync and sends it back as
+``since``; the response then only holds rows updated, and ids deleted,
+after that point. Rows are returned flat (foreign keys as ids), so that a
+client can upsert them straight into its local store.
+
+Deletions are reported from tombstones, which ``prune_tombstones`` removes
+after a retention period; a client offline for longer than that must do a
+full sync by omitting ``since``.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Discount,
+    Payment,
+    Promo,
+    Service,
+    Skill,
+    Technician,
+    Tombstone,
+)
+
+
+RESOURCES = {
+    Branch: ('branches', [
+        'id', 'name', 'address', 'start_time', 'end_time',
+    ]),
+    Skill: ('skills', ['id', 'name']),
+    Service: ('services', ['id', 'name', 'price']),
+    Payment: ('payments', ['id', 'format_code', 'description']),
+    Discount: ('discounts', ['id', 'description', 'value']),
+    Promo: ('promos', ['id', 'weekday', 'name']),
+    Client: ('clients', [
+        'id', 'name', 'last_name', 'phone', 'email', 'birthday', 'comments',
+    ]),
+    Technician: ('technicians', ['id', 'user', 'user__name', 'user__email']),
+    Appointment: ('appointments', [
+        'id', 'date', 'time', 'branch', 'client', 'technician', 'service',
+        'warranty', 'payment', 'commission', 'tip', 'courtesy', 'discount',
+        'discount_price', 'final_income',
+    ]),
+}
+
+
+class InvalidCursor(ValueError):
+    """The sync cursor could not be parsed."""
+
+
+def resource_name(model):
+    """Return the sync resource name of model, or None."""
+    entry = RESOURCES.get(model)
+    return entry[0] if entry else None
+
+
+def parse_cursor(value):
+    """Return the datetime encoded in a sync cursor."""
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise InvalidCursor(value)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, datetime.timezone.utc)
+    return since
+
+
+def _clean(row):
+    """Render Decimals as strings, the way the REST API does."""
+    for key, value in row.items():
+        if isinstance(value, Decimal):
+            row[key] = str(value)
+    return row
+
+
+# Many-to-many relations sent as lists of ids: {model: {key: manager}}.
+LINKS = {
+    Service: {'required_skills': Service.required_skills},
+    Technician: {
+        'skills': Technician.skills,
+        'branches': Technician.branches,
+    },
+}
+
+
+def _attach_links(model, rows):
+    """Attach the ids of related rows, such as a technician's skills."""
+    by_id = {row['id']: row for row in rows}
+    for key, descriptor in LINKS[model].items():
+        for row in rows:
+            row[key] = []
+        through = descriptor.through
+        source = descriptor.field.m2m_field_name()
+        target = descriptor.field.m2m_reverse_field_name()
+        links = through.objects.filter(
+            **{f'{source}_id__in': by_id},
+        ).values_list(f'{source}_id', f'{target}_id')
+        for row_id, related_id in links:
+            by_id[row_id][key].append(related_id)
+
+
+def changes_since(since=None):
+    """
+    Return everything changed after since (or everything if since is None).
+
+    Rows saved within SALON_SYNC_OVERLAP_SECONDS before since are sent
+    again, so that a row stamped just before the previous cursor but
+    committed just after it is never missed. Upserts make repeats harmless.
+    """
+    cursor = timezone.now()
+    if since is not None:
+        since -= datetime.timedelta(
+            seconds=getattr(settings, 'SALON_SYNC_OVERLAP_SECONDS', 5),
+        )
+
+    changes = {}
+    for model, (name, fields) in RESOURCES.items():
+        queryset = model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(updated_at__gt=since)
+        rows = [
+            _clean(row) for row in queryset.order_by('id').values(*fields)
+        ]
+        if model in LINKS:
+            _attach_links(model, rows)
+        changes[name] = rows
+
+    deleted = {name: [] for name, _ in RESOURCES.values()}
+    if since is not None:
+        tombstones = Tombstone.objects.filter(
+            deleted_at__gt=since,
+        ).values_list('resource', 'object_id')
+        for name, object_id in tombstones:
+            deleted.setdefault(name, []).append(object_id)
+
+    return {
+        'cursor': cursor.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        'changes': changes,
+        'deleted': deleted,
+    }
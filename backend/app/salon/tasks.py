@@ -0,0 +1,64 @@
+"""
+Background tasks for the salon app.
+"""
+import datetime
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from core.jobs import task
+from core.models import ClientUpload, Service
+from salon import agenda, bootstrap, imports, payroll
+
+
+@task('salon.reprice_services')
+def reprice_services(percent, services=None):
+    """Change the price of services (all by default) by percent."""
+    factor = 1 + Decimal(percent) / 100
+    queryset = Service.objects.all()
+    if services is not None:
+        queryset = queryset.filter(id__in=services)
+    with transaction.atomic():
+        # A bulk update skips save(), so stamp updated_at for delta sync.
+        updated = queryset.update(
+            price=Round(F('price') * Value(factor), 2),
+            updated_at=timezone.now(),
+        )
+    bootstrap.invalidate()
+    # Past agendas are left to expire; they are rarely read again.
+    filters = {'date__gte': datetime.date.today()}
+    if services is not None:
+        filters['service_id__in'] = services
+    agenda.invalidate_for(**filters)
+    return {'updated': updated}
+
+
+@task('salon.run_payroll')
+def run_payroll(period_start, period_end, user_id=None):
+    """Compute and store the payroll of a period."""
+    run = payroll.run_payroll(
+        datetime.date.fromisoformat(period_start),
+        datetime.date.fromisoformat(period_end),
+        user=get_user_model().objects.filter(id=user_id).first(),
+    )
+    return {'run': run.id, 'appointment_count': run.appointment_count}
+
+
+@task('salon.import_clients')
+def import_clients(upload_id):
+    """Import an uploaded client file and return the report."""
+    upload = ClientUpload.objects.get(id=upload_id)
+    try:
+        result = imports.import_clients(
+            io.BytesIO(upload.data), upload.filename,
+        )
+    except imports.InvalidFile as exc:
+        # Retrying won't make the file readable.
+        result = {'error': str(exc)}
+    upload.delete()
+    return result
@@ -0,0 +1,146 @@
+"""
+Tests for the branch agenda cache.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Service,
+    Technician,
+)
+from salon import agenda, cache
+from salon.serializers import AppointmentSerializer
+
+
+AGENDA_URL = reverse('salon:appointment-agenda')
+AGENDA_STATS_URL = reverse('salon:appointment-agenda-stats')
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+def create_appointment(branch, technician, **params):
+    """Create and return a sample appointment."""
+    client = Client.objects.create(
+        name='John',
+        last_name='Doe',
+        phone='1234567890',
+        email='john.doe@example.com',
+        birthday='1990-01-01',
+        comments='Sample comments',
+    )
+    service = Service.objects.create(name='Haircut', price='100.00')
+    defaults = {
+        'date': '2024-05-01',
+        'time': '10:00:00',
+    }
+    defaults.update(params)
+    return Appointment.objects.create(
+        branch=branch,
+        client=client,
+        service=service,
+        technician=technician,
+        **defaults,
+    )
+
+
+def agenda_url(branch, date='2024-05-01'):
+    """Return the agenda URL for a branch and day."""
+    return f'{AGENDA_URL}?branch={branch.id}&date={date}'
+
+
+class PrivateAgendaApiTests(TestCase):
+    """Test the cached agenda endpoint."""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        agenda.stats.reset()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.technician = Technician.objects.get(user=self.user)
+        self.branch = Branch.objects.create(name='Centro')
+
+    def test_agenda_lists_branch_day(self):
+        """Test only the requested branch and day are listed."""
+        other_branch = Branch.objects.create(name='Norte')
+        appointment = create_appointment(self.branch, self.technician)
+        create_appointment(other_branch, self.technician)
+        create_appointment(self.branch, self.technician, date='2024-05-02')
+
+        res = self.client.get(agenda_url(self.branch))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        serializer = AppointmentSerializer([appointment], many=True)
+        self.assertEqual(json.loads(res.content),
+                         json.loads(json.dumps(serializer.data)))
+
+    def test_agenda_served_from_cache(self):
+        """Test a repeated read runs no queries."""
+        create_appointment(self.branch, self.technician)
+        self.client.get(agenda_url(self.branch))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(agenda_url(self.branch))
+
+        self.assertEqual(len(json.loads(res.content)), 1)
+        stats = self.client.get(AGENDA_STATS_URL).data
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['rebuilds'], 1)
+
+    def test_appointment_save_invalidates(self):
+        """Test creating and moving appointments refreshes the agenda."""
+        self.client.get(agenda_url(self.branch))
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = create_appointment(self.branch, self.technician)
+
+        res = self.client.get(agenda_url(self.branch))
+        self.assertEqual(len(json.loads(res.content)), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.date = '2024-05-03'
+            appointment.save()
+
+        res = self.client.get(agenda_url(self.branch))
+        self.assertEqual(json.loads(res.content), [])
+
+    def test_appointment_delete_invalidates(self):
+        """Test deleting an appointment refreshes the agenda."""
+        appointment = create_appointment(self.branch, self.technician)
+        self.client.get(agenda_url(self.branch))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+
+        res = self.client.get(agenda_url(self.branch))
+        self.assertEqual(json.loads(res.content), [])
+
+    def test_client_update_invalidates(self):
+        """Test renaming a client refreshes agendas listing them."""
+        appointment = create_appointment(self.branch, self.technician)
+        self.client.get(agenda_url(self.branch))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.client.name = 'Jane'
+            appointment.client.save()
+
+        res = self.client.get(agenda_url(self.branch))
+        self.assertEqual(json.loads(res.content)[0]['client']['name'], 'Jane')
+
+    def test_agenda_requires_params(self):
+        """Test branch and date are validated."""
+        res = self.client.get(AGENDA_URL, {'branch': self.branch.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,187 @@
+"""
+Tests for the analytics snapshot.
+"""
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Payment,
+    Service,
+    Technician,
+)
+from salon import analytics
+
+
+ANALYTICS_URL = reverse('salon:analytics')
+
+
+class AnalyticsTests(TestCase):
+    """Test exporting and querying the analytics snapshot."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(ANALYTICS_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+            name='Ana',
+        )
+        self.branches = [
+            Branch.objects.create(name='Centro'),
+            Branch.objects.create(name='Norte'),
+        ]
+        self.services = [
+            Service.objects.create(name='Haircut', price='10'),
+            Service.objects.create(name='Nails', price='20'),
+        ]
+        self.cash = Payment.objects.create(
+            format_code='CASH', description='Cash',
+        )
+        client = Client.objects.create(
+            name='John',
+            last_name='Doe',
+            phone='1234567890',
+            email='john.doe@example.com',
+            birthday='1990-01-01',
+        )
+        technician = Technician.objects.get(user=self.user)
+        amounts = ['10.10', '0.20', '19.99', '250.05']
+        for i in range(12):
+            Appointment.objects.create(
+                date=datetime.date(2024, 4 + i % 3, 1 + i),
+                time=f'{9 + i % 4}:30',
+                branch=self.branches[i % 2],
+                service=self.services[i % 3 % 2],
+                payment=self.cash if i % 4 else None,
+                client=client,
+                technician=technician,
+                final_income=amounts[i % 4],
+                tip='1.01',
+            )
+
+    def test_group_by_matches_orm(self):
+        """Test sums by service and month match the database."""
+        analytics.export()
+
+        rows = analytics.query(
+            group_by=['service', 'month'],
+            metrics=['count', 'final_income'],
+        )
+
+        expected = Appointment.objects.annotate(
+            month=TruncMonth('date'),
+        ).values('service_id', 'month').annotate(
+            count=Count('id'), final_income=Sum('final_income'),
+        ).order_by('service_id', 'month')
+        self.assertEqual(
+            [
+                (row['service'], row['month'], row['count'],
+                 row['final_income'])
+                for row in rows
+            ],
+            [
+                (row['service_id'], row['month'].strftime('%Y-%m'),
+                 row['count'], row['final_income'])
+                for row in expected
+            ],
+        )
+        self.assertEqual(rows[0]['service_name'], 'Haircut')
+
+    def test_filters(self):
+        """Test rows are filtered by column values and dates."""
+        analytics.export()
+
+        rows = analytics.query(
+            metrics=['count', 'tip'],
+            branch=self.branches[0].id,
+            date_from=datetime.date(2024, 5, 1),
+            date_to=datetime.date(2024, 5, 31),
+        )
+
+        count = Appointment.objects.filter(
+            branch=self.branches[0], date__month=5,
+        ).count()
+        self.assertEqual(rows, [{
+            'count': count,
+            'tip': Decimal('1.01') * count,
+        }])
+
+    def test_missing_payment_grouped_as_none(self):
+        """Test appointments without a payment form their own group."""
+        analytics.export()
+
+        rows = analytics.query(group_by=['payment'])
+
+        self.assertEqual(rows[0], {
+            'payment': None, 'payment_name': None, 'count': 3,
+        })
+        self.assertEqual(rows[1]['payment_name'], 'Cash')
+
+    def test_unknown_column(self):
+        """Test querying a column that doesn't exist fails."""
+        analytics.export()
+
+        with self.assertRaises(ValueError):
+            analytics.query(group_by=['client'])
+
+    def test_export_keeps_newest_snapshots(self):
+        """Test old snapshots are pruned and the newest is published."""
+        names = [analytics.export(keep=2) for _ in range(3)]
+
+        directories = sorted(
+            path.name for path in analytics.get_dir().iterdir()
+            if path.is_dir()
+        )
+        self.assertEqual(directories, names[1:])
+        self.assertEqual(analytics.current().name, names[-1])
+
+    def test_export_analytics_command(self):
+        """Test the command writes a snapshot."""
+        out = StringIO()
+        call_command('export_analytics', stdout=out)
+
+        self.assertIn('12 appointments', out.getvalue())
+
+    def test_analytics_api(self):
+        """Test the endpoint answers group-by queries."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(ANALYTICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        analytics.export()
+        res = client.get(ANALYTICS_URL, {
+            'group_by': 'branch',
+            'metrics': 'count,final_income',
+            'service': f'{self.services[0].id},{self.services[1].id}',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['branch_name'], row['count']) for row in res.data['rows']],
+            [('Centro', 6), ('Norte', 6)],
+        )
+
+        res = client.get(ANALYTICS_URL, {'group_by': 'client'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,206 @@
+"""
+Tests for assigning technicians to booking requests.
+"""
+import datetime
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Service,
+    Skill,
+    Technician,
+)
+from salon import assignment
+
+
+ASSIGN_URL = reverse('salon:appointment-assign')
+SYNC_URL = reverse('salon:sync')
+BOOTSTRAP_URL = reverse('salon:bootstrap')
+
+DAY = datetime.date(2024, 5, 6)
+
+
+def at(hour, minute=0):
+    """Return a time of day."""
+    return datetime.time(hour, minute)
+
+
+class AssignmentTests(TestCase):
+    """Test the assignment engine."""
+
+    def setUp(self):
+        self.branch = Branch.objects.create(
+            name='Centro', start_time=at(9), end_time=at(13),
+        )
+        self.color = Skill.objects.create(name='Color')
+        self.nails = Skill.objects.create(name='Nails')
+        self.haircut = Service.objects.create(name='Haircut', price='10')
+        self.dye = Service.objects.create(name='Dye', price='30')
+        self.dye.required_skills.add(self.color)
+        self.ana = self.create_technician('ana@example.com', [self.color])
+        self.bea = self.create_technician('bea@example.com', [self.nails])
+
+    def create_technician(self, email, skills, branch=None):
+        user = get_user_model().objects.create_user(
+            email=email, password='test123',
+        )
+        technician = Technician.objects.get(user=user)
+        technician.skills.set(skills)
+        technician.branches.add(branch or self.branch)
+        return technician
+
+    def request(self, service, start, end=None):
+        return {
+            'service': service.id,
+            'branch': self.branch.id,
+            'start': start,
+            'end': end,
+        }
+
+    def test_required_skills(self):
+        """Test services only go to technicians with their skills."""
+        results = assignment.assign(DAY, [
+            self.request(self.dye, at(9)),
+            self.request(self.dye, at(10)),
+        ])
+
+        self.assertEqual(
+            [result['technician'] for result in results],
+            [self.ana.id, self.ana.id],
+        )
+        self.assertEqual(
+            [result['time'] for result in results], [at(9), at(10)],
+        )
+
+    def test_windows_and_conflicts(self):
+        """Test requests fit their windows around existing bookings."""
+        client = Client.objects.create(
+            name='John', last_name='Doe', phone='1234567890',
+            birthday='1990-01-01',
+        )
+        Appointment.objects.create(
+            date=DAY, time=at(9, 30), branch=self.branch, client=client,
+            service=self.dye, technician=self.ana,
+        )
+
+        results = assignment.assign(DAY, [
+            self.request(self.dye, at(9), at(11)),
+            self.request(self.dye, at(9), at(12)),
+            self.request(self.dye, at(12, 30)),
+        ])
+
+        # 9:30 takes Ana's 9:00 and 10:00 slots; 12:30 is past closing.
+        self.assertEqual(
+            sorted(result['time'] for result in results[:2]),
+            [at(11), at(12)],
+        )
+        self.assertIsNone(results[2])
+
+    def test_balanced_and_maximal(self):
+        """Test as many requests as possible, spread evenly, are met."""
+        self.bea.skills.add(self.color)
+        cleo = self.create_technician('cleo@example.com', [])
+        requests = [self.request(self.haircut, at(9), at(12))] * 6
+        # Only Ana and Bea can dye, so haircuts should go to Cleo first.
+        requests += [self.request(self.dye, at(9), at(12))] * 6
+
+        results = assignment.assign(DAY, requests)
+
+        self.assertNotIn(None, results)
+        loads = Counter(result['technician'] for result in results)
+        self.assertEqual(
+            loads, {self.ana.id: 4, self.bea.id: 4, cleo.id: 4},
+        )
+        self.assertEqual(
+            len({(r['technician'], r['time']) for r in results}), 12,
+        )
+
+    def test_technician_shared_between_branches(self):
+        """Test a technician isn't given the same slot at two branches."""
+        north = Branch.objects.create(name='Norte')
+        self.ana.branches.add(north)
+        other = dict(self.request(self.dye, at(9)), branch=north.id)
+
+        results = assignment.assign(DAY, [
+            self.request(self.dye, at(9)), other,
+        ])
+
+        self.assertEqual(sum(result is not None for result in results), 1)
+
+
+class AssignmentApiTests(TestCase):
+    """Test the assignment endpoint and required skills in the API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(user)
+        self.technician = Technician.objects.get(user=user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.technician.branches.add(self.branch)
+        self.service = Service.objects.create(name='Haircut', price='10')
+
+    def test_assign_endpoint(self):
+        """Test the endpoint proposes a technician for each request."""
+        payload = {
+            'date': DAY.isoformat(),
+            'requests': [
+                {'service': self.service.id, 'branch': self.branch.id,
+                 'start': '10:00', 'end': '11:00'},
+                {'service': self.service.id, 'branch': self.branch.id,
+                 'start': '10:00'},
+            ],
+        }
+
+        res = self.client.post(ASSIGN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['assigned'], 2)
+        self.assertEqual(res.json()['assignments'], [
+            {'technician': self.technician.id, 'time': '11:00:00'},
+            {'technician': self.technician.id, 'time': '10:00:00'},
+        ])
+
+    def test_unknown_service(self):
+        """Test requests for unknown services are rejected."""
+        payload = {
+            'date': DAY.isoformat(),
+            'requests': [
+                {'service': 0, 'branch': self.branch.id, 'start': '10:00'},
+            ],
+        }
+
+        res = self.client.post(ASSIGN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_required_skills_synced(self):
+        """Test changing required skills reaches sync and bootstrap."""
+        etag = self.client.get(BOOTSTRAP_URL)['ETag']
+        cursor = self.client.get(SYNC_URL).data['cursor']
+        skill = Skill.objects.create(name='Color')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.required_skills.add(skill)
+
+        res = self.client.get(SYNC_URL, {'since': cursor})
+        self.assertEqual(
+            res.data['changes']['services'][0]['required_skills'],
+            [skill.id],
+        )
+        res = self.client.get(BOOTSTRAP_URL)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.json()['services'][0]['required_skills'],
+                         [skill.id])
@@ -0,0 +1,97 @@
+"""
+Tests for the async salon read endpoints.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core import throttling
+from core.models import Branch, Service
+from salon import cache
+from salon.serializers import ServiceSerializer
+
+
+ASYNC_AGENDA_URL = reverse('salon:async-agenda')
+
+
+def catalog_url(name):
+    """Return the async catalog URL for name."""
+    return reverse('salon:async-catalog', args=[name])
+
+
+class AsyncSalonApiTests(TestCase):
+    """Test the async read endpoints."""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        token = Token.objects.create(user=user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def test_auth_required(self):
+        """Test a token is required."""
+        res = self.client.get(catalog_url('services'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_catalog(self):
+        """Test a catalog matches the DRF serializer output."""
+        Service.objects.create(name='Haircut', price='100.00')
+
+        res = self.client.get(catalog_url('services'), **self.auth)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        serializer = ServiceSerializer(Service.objects.all(), many=True)
+        self.assertEqual(json.loads(res.content),
+                         json.loads(json.dumps(serializer.data)))
+
+    def test_unknown_catalog(self):
+        """Test an unknown catalog returns 404."""
+        res = self.client.get(catalog_url('nothing'), **self.auth)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_agenda(self):
+        """Test the async agenda returns an empty day."""
+        branch = Branch.objects.create(name='Centro')
+
+        res = self.client.get(
+            ASYNC_AGENDA_URL,
+            {'branch': branch.id, 'date': '2024-05-01'},
+            **self.auth,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), [])
+
+    def test_agenda_bad_params(self):
+        """Test the async agenda validates its parameters."""
+        res = self.client.get(ASYNC_AGENDA_URL, {'branch': 'x'}, **self.auth)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REST_FRAMEWORK={
+        'DEFAULT_THROTTLE_CLASSES': ['core.throttling.ReadThrottle'],
+        'DEFAULT_THROTTLE_RATES': {'read': '2/min'},
+    })
+    def test_throttled(self):
+        """Test reads past the burst get 429 with Retry-After."""
+        throttling.get_store().clear()
+        self.addCleanup(throttling.get_store().clear)
+
+        for _ in range(2):
+            res = self.client.get(catalog_url('services'), **self.auth)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ASYNC_AGENDA_URL, **self.auth)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
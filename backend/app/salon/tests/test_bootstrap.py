@@ -0,0 +1,74 @@
+"""
+Tests for the bootstrap catalog bundle.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Promo, Service
+from salon import cache
+
+
+BOOTSTRAP_URL = reverse('salon:bootstrap')
+
+
+class PrivateBootstrapApiTests(TestCase):
+    """Test the bootstrap bundle."""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(user)
+
+    def test_bundle_contains_catalogs(self):
+        """Test every catalog is in the bundle."""
+        Service.objects.create(name='Haircut', price='100.00')
+
+        res = self.client.get(BOOTSTRAP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = json.loads(res.content)
+        self.assertEqual(
+            sorted(data),
+            ['branches', 'discounts', 'payments', 'promos', 'services',
+             'skills'],
+        )
+        self.assertEqual(data['services'][0]['price'], '100.00')
+
+    def test_bundle_cached(self):
+        """Test the bundle is served from memory."""
+        self.client.get(BOOTSTRAP_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(BOOTSTRAP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_not_modified(self):
+        """Test a current ETag returns 304."""
+        etag = self.client.get(BOOTSTRAP_URL)['ETag']
+
+        res = self.client.get(BOOTSTRAP_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_catalog_change_invalidates(self):
+        """Test a catalog write produces a new bundle and ETag."""
+        etag = self.client.get(BOOTSTRAP_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Promo.objects.create(weekday=2, name='Martes de color')
+        res = self.client.get(BOOTSTRAP_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(json.loads(res.content)['promos']), 1)
@@ -0,0 +1,199 @@
+"""
+Tests for importing clients.
+"""
+import datetime
+import io
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Client, ClientUpload, Job
+from salon import imports
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+IMPORT_URL = reverse('salon:client-import-clients')
+
+CSV = (
+    'Name,Last Name,Phone,Email,Birthday,Notes\n'
+    'Ana,López,(33) 1234-5678,ANA@Example.com,1990-01-31,\n'
+    'Bea,Ruiz,,bea@example.com,31/12/1985,\n'
+    ',Sin Nombre,3312345679,,1990-01-01,\n'
+    'Ana,Otra,33 1234 5678,,1990-01-01,\n'
+    'Carla,Gómez,12,carla@,2990-01-01,\n'
+    'Dora,Paz,3399999999,john.doe@EXAMPLE.com,1970-05-05,\n'
+)
+
+
+def import_csv(content, filename='clients.csv'):
+    """Import CSV text and return the report."""
+    return imports.import_clients(
+        io.BytesIO(content.encode('utf-8')), filename,
+    )
+
+
+class ClientImportTests(TestCase):
+    """Test importing clients from files."""
+
+    def setUp(self):
+        self.existing = Client.objects.create(
+            name='John',
+            last_name='Doe',
+            phone='1234567890',
+            email='john.doe@example.com',
+            birthday='1990-01-01',
+            comments='',
+        )
+
+    def test_import_csv(self):
+        """Test rows are normalized, validated and deduplicated."""
+        result = import_csv(CSV)
+
+        self.assertEqual(result['rows'], 6)
+        self.assertEqual(result['inserted'], 2)
+        self.assertEqual(result['duplicates'], 1)
+        self.assertEqual(result['invalid'], 3)
+        ana = Client.objects.get(name='Ana')
+        self.assertEqual(ana.phone, '3312345678')
+        self.assertEqual(ana.email, 'ana@example.com')
+        self.assertEqual(
+            Client.objects.get(name='Bea').birthday,
+            datetime.date(1985, 12, 31),
+        )
+
+        report = {item['row']: item for item in result['report']}
+        self.assertEqual(sorted(report), [4, 5, 6, 7])
+        self.assertIn('name', report[4]['errors'])
+        self.assertEqual(
+            report[5]['errors'], {'contact': 'Duplicate of row 2.'},
+        )
+        self.assertEqual(
+            sorted(report[6]['errors']), ['birthday', 'email', 'phone'],
+        )
+        self.assertEqual(report[7], {
+            'row': 7, 'status': 'duplicate', 'client': self.existing.id,
+        })
+
+    def test_import_twice(self):
+        """Test importing the same file again adds nothing."""
+        import_csv(CSV)
+        count = Client.objects.count()
+
+        result = import_csv(CSV)
+
+        self.assertEqual(result['inserted'], 0)
+        self.assertEqual(result['duplicates'], 3)
+        self.assertEqual(Client.objects.count(), count)
+
+    def test_semicolon_separated(self):
+        """Test files exported with semicolons are read."""
+        result = import_csv(
+            'name;last_name;phone;birthday\n'
+            'Eva;Sol;3311111111;01/02/2000\n'
+        )
+
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(Client.objects.get(name='Eva').comments, '')
+
+    def test_missing_columns(self):
+        """Test a file without the required columns is rejected."""
+        with self.assertRaises(imports.InvalidFile):
+            import_csv('name,phone\nEva,3311111111\n')
+
+    @unittest.skipIf(openpyxl is None, 'openpyxl is not installed')
+    def test_import_xlsx(self):
+        """Test Excel files are imported."""
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['name', 'last_name', 'phone', 'birthday'])
+        sheet.append(['Eva', 'Sol', 3311111111, datetime.date(2000, 2, 1)])
+        content = io.BytesIO()
+        workbook.save(content)
+        content.seek(0)
+
+        result = imports.import_clients(content, 'clients.xlsx')
+
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(Client.objects.get(name='Eva').phone, '3311111111')
+
+    def test_import_clients_command(self):
+        """Test the command imports a file and writes the report."""
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(CSV)
+        self.addCleanup(os.remove, path)
+        report = f'{path}.report.csv'
+        self.addCleanup(lambda: os.path.exists(report) and os.remove(report))
+
+        out = StringIO()
+        call_command('import_clients', path, report=report, stdout=out)
+
+        self.assertIn('6 rows: 2 imported, 1 duplicates', out.getvalue())
+        with open(report, encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 5)
+
+    def test_import_clients_command_missing_file(self):
+        """Test the command fails cleanly on a missing file."""
+        with self.assertRaises(CommandError):
+            call_command('import_clients', '/nonexistent.csv')
+
+
+class ClientImportApiTests(TestCase):
+    """Test the client import endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_endpoint(self):
+        """Test an upload is imported by a background job."""
+        upload = SimpleUploadedFile('clients.csv', CSV.encode('utf-8'))
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        jobs.run_pending()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['inserted'], 3)
+        self.assertEqual(len(job.result['report']), 3)
+        self.assertFalse(ClientUpload.objects.exists())
+
+    def test_unreadable_file_reported(self):
+        """Test a file that can't be imported fails once, with a reason."""
+        upload = SimpleUploadedFile('clients.csv', b'name\nEva\n')
+
+        self.client.post(IMPORT_URL, {'file': upload})
+        jobs.run_pending()
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertIn('Missing columns', job.result['error'])
+
+    def test_wrong_file_type(self):
+        """Test only CSV and Excel files are accepted."""
+        upload = SimpleUploadedFile('clients.pdf', b'%PDF-1.4')
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
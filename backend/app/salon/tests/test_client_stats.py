@@ -0,0 +1,300 @@
+"""
+Tests for client visit statistics.
+"""
+import datetime
+import importlib
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    ClientStats,
+    Service,
+    Technician,
+)
+from salon import client_stats
+
+
+CLIENTS_URL = reverse('salon:client-list')
+
+TODAY = datetime.date.today()
+
+
+def days_ago(days):
+    """Return the date days before today."""
+    return TODAY - datetime.timedelta(days=days)
+
+
+def create_technician(email):
+    """Create and return a technician."""
+    user = get_user_model().objects.create_user(
+        email=email, password='test123',
+    )
+    return Technician.objects.get(user=user)
+
+
+def create_client(name):
+    """Create and return a client."""
+    return Client.objects.create(
+        name=name,
+        last_name='Doe',
+        phone='1234567890',
+        email=f'{name.lower()}@example.com',
+        birthday='1990-01-01',
+    )
+
+
+class ClientStatsTests(TestCase):
+    """Test maintaining client stats."""
+
+    def setUp(self):
+        self.branch = Branch.objects.create(name='Centro')
+        self.ana = create_technician('ana@example.com')
+        self.bea = create_technician('bea@example.com')
+        self.haircut = Service.objects.create(name='Haircut', price='10')
+        self.nails = Service.objects.create(name='Nails', price='20')
+        self.john = create_client('John')
+
+    def book(self, date, technician, service, amount='10.00', client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                date=date,
+                time='10:00',
+                branch=self.branch,
+                client=client or self.john,
+                technician=technician,
+                service=service,
+                final_income=amount,
+            )
+
+    def test_stats_follow_appointments(self):
+        """Test booking visits updates the client's stats."""
+        self.book(days_ago(30), self.ana, self.nails, '20.00')
+        self.book(days_ago(20), self.bea, self.haircut)
+        self.book(days_ago(10), self.bea, self.haircut, '10.50')
+        self.book(TODAY + datetime.timedelta(days=7), self.ana, self.nails)
+
+        stats = ClientStats.objects.get(client=self.john)
+        self.assertEqual(stats.visit_count, 3)
+        self.assertEqual(stats.last_visit, days_ago(10))
+        self.assertEqual(stats.total_spend, Decimal('40.50'))
+        self.assertEqual(stats.favorite_technician, self.bea)
+        self.assertEqual(stats.favorite_service, self.haircut)
+
+    def test_moved_and_deleted_appointments(self):
+        """Test both clients of a moved appointment are updated."""
+        jane = create_client('Jane')
+        appointment = self.book(days_ago(5), self.ana, self.nails)
+
+        appointment.client = jane
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+
+        stats = ClientStats.objects.get(client=self.john)
+        self.assertEqual(stats.visit_count, 0)
+        self.assertIsNone(stats.last_visit)
+        self.assertEqual(ClientStats.objects.get(client=jane).visit_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+
+        self.assertEqual(ClientStats.objects.get(client=jane).visit_count, 0)
+
+    def test_booked_day_counts_once_it_comes(self):
+        """Test the nightly rebuild counts the day's appointments."""
+        tomorrow = TODAY + datetime.timedelta(days=1)
+        self.book(tomorrow, self.ana, self.nails)
+        self.assertEqual(self.john.stats.visit_count, 0)
+
+        with patch('django.utils.timezone.localdate', return_value=tomorrow):
+            self.assertEqual(client_stats.rebuild(tomorrow), 1)
+
+        self.assertEqual(
+            ClientStats.objects.get(client=self.john).last_visit, tomorrow,
+        )
+
+    def test_rebuild_client_stats_command(self):
+        """Test the command recomputes every client."""
+        create_client('Jane')
+        self.book(days_ago(1), self.ana, self.nails)
+        ClientStats.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_client_stats', stdout=out)
+
+        self.assertIn('Recomputed stats of 2 clients', out.getvalue())
+        self.assertEqual(
+            ClientStats.objects.get(client=self.john).visit_count, 1,
+        )
+
+    def test_archived_visits_counted(self):
+        """Test visits in archived months stay in the totals."""
+        self.book(days_ago(10), self.ana, self.nails, '20.00')
+        ClientStats.objects.filter(client=self.john).update(
+            archived_visits=4,
+            archived_spend='80.00',
+            archived_last_visit=days_ago(400),
+        )
+
+        client_stats.recompute([self.john.id])
+
+        stats = ClientStats.objects.get(client=self.john)
+        self.assertEqual(stats.visit_count, 5)
+        self.assertEqual(stats.total_spend, Decimal('100.00'))
+        self.assertEqual(stats.last_visit, days_ago(10))
+
+    def test_migration_computes_existing_clients(self):
+        """Test the migration creating the stats fills them in."""
+        jane = create_client('Jane')
+        self.book(days_ago(3), self.ana, self.nails, '20.00')
+        ClientStats.objects.all().delete()
+        migration = importlib.import_module('core.migrations.0013_clientstats')
+
+        migration.compute_client_stats(apps, None)
+
+        stats = ClientStats.objects.get(client=self.john)
+        self.assertEqual(stats.visit_count, 1)
+        self.assertEqual(stats.last_visit, days_ago(3))
+        self.assertEqual(stats.favorite_service, self.nails)
+        self.assertEqual(ClientStats.objects.get(client=jane).visit_count, 0)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Row locks require PostgreSQL.')
+class ConcurrentRecomputeTests(TransactionTestCase):
+    """Test recomputes of the same client in overlapping transactions."""
+
+    def test_overlapping_recomputes(self):
+        """Test the second recompute waits for the first and succeeds."""
+        technician = create_technician('ana@example.com')
+        john = create_client('John')
+        Appointment.objects.create(
+            date=days_ago(1), time='10:00',
+            branch=Branch.objects.create(name='Centro'), client=john,
+            technician=technician,
+            service=Service.objects.create(name='Nails', price='20'),
+            final_income='20.00',
+        )
+        ClientStats.objects.all().delete()
+        recomputed = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def first():
+            try:
+                with transaction.atomic():
+                    client_stats.recompute([john.id])
+                    recomputed.set()
+                    release.wait(5)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        def second():
+            try:
+                recomputed.wait(5)
+                client_stats.recompute([john.id])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=first),
+                   threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        recomputed.wait(5)
+        # Let the second recompute reach the first one's lock.
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(ClientStats.objects.get(client=john).visit_count, 1)
+
+
+class ClientStatsApiTests(TestCase):
+    """Test the client stats through the client API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(user)
+        self.technician = Technician.objects.get(user=user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.service = Service.objects.create(name='Haircut', price='10')
+
+    def visit(self, client, date):
+        Appointment.objects.create(
+            date=date,
+            time='10:00',
+            branch=self.branch,
+            client=client,
+            technician=self.technician,
+            service=self.service,
+            final_income='10.00',
+        )
+
+    def test_stats_listed_without_extra_queries(self):
+        """Test clients are listed with their stats in one query."""
+        for name in ['Ann', 'Ben', 'Cid']:
+            client = create_client(name)
+            self.visit(client, days_ago(3))
+        client_stats.rebuild()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(CLIENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['stats']['visit_count'], 1)
+        self.assertEqual(res.data[0]['stats']['last_visit'],
+                         days_ago(3).isoformat())
+        self.assertEqual(len(queries), 1)
+
+    def test_client_without_stats(self):
+        """Test a client never recomputed has no stats."""
+        create_client('Ann')
+
+        res = self.client.get(CLIENTS_URL)
+
+        self.assertIsNone(res.data[0]['stats'])
+
+    def test_filter_inactive_clients(self):
+        """Test listing clients who haven't visited lately."""
+        recent = create_client('Ann')
+        lapsed = create_client('Ben')
+        self.visit(recent, days_ago(10))
+        self.visit(lapsed, days_ago(120))
+        client_stats.rebuild()
+
+        res = self.client.get(CLIENTS_URL, {'inactive_days': 90})
+
+        self.assertEqual([row['id'] for row in res.data], [lapsed.id])
+
+    def test_invalid_inactive_days(self):
+        """Test inactive_days must be a number."""
+        res = self.client.get(CLIENTS_URL, {'inactive_days': 'soon'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,209 @@
+"""
+Tests for booking demand snapshots.
+"""
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    DemandSnapshot,
+    Promo,
+    Service,
+    Technician,
+)
+from salon import demand
+
+
+# 2024-05-06 was a Monday.
+MONDAY = datetime.date(2024, 5, 6)
+
+
+def day(offset):
+    """Return the date offset days after MONDAY."""
+    return MONDAY + datetime.timedelta(days=offset)
+
+
+def demand_url(branch_id):
+    """Create and return a branch demand URL."""
+    return reverse('salon:branch-demand', args=[branch_id])
+
+
+class DemandTests(TestCase):
+    """Test counting and forecasting demand."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.technician = Technician.objects.get(user=self.user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.client_obj = Client.objects.create(
+            name='John',
+            last_name='Doe',
+            phone='1234567890',
+            email='john.doe@example.com',
+            birthday='1990-01-01',
+        )
+        self.haircut = Service.objects.create(name='Haircut', price='10')
+        self.nails = Service.objects.create(name='Nails', price='20')
+
+    def book(self, date, time, service=None):
+        return Appointment.objects.create(
+            date=date,
+            time=time,
+            branch=self.branch,
+            client=self.client_obj,
+            service=service or self.haircut,
+            technician=self.technician,
+        )
+
+    def promo(self, weekday, since):
+        promo = Promo.objects.create(weekday=weekday, name='2x1')
+        Promo.objects.filter(id=promo.id).update(
+            created_at=datetime.datetime.combine(
+                since, datetime.time(), datetime.timezone.utc,
+            ),
+        )
+
+    def test_heatmap_by_weekday_and_hour(self):
+        """Test bookings are counted per weekday and hour."""
+        self.book(day(0), '10:00')
+        self.book(day(0), '10:30', self.nails)
+        self.book(day(1), '15:00')
+
+        snapshot = demand.refresh(self.branch.id, until=day(6))
+        report = demand.report(snapshot, start=day(7))
+
+        self.assertEqual(report['heatmap'][0][10], 2)
+        self.assertEqual(report['heatmap'][1][15], 1)
+        self.assertEqual(sum(map(sum, report['heatmap'])), 3)
+        self.assertEqual(report['days'], [1] * 7)
+
+        report = demand.report(snapshot, service_id=self.nails.id)
+
+        self.assertEqual(report['heatmap'][0][10], 1)
+        self.assertEqual(sum(map(sum, report['heatmap'])), 1)
+
+    def test_refresh_is_incremental(self):
+        """Test a refresh only reads the days after the last one."""
+        self.book(day(0), '10:00')
+        demand.refresh(self.branch.id, until=day(6))
+        self.book(day(2), '12:00')
+        self.book(day(7), '10:00', self.nails)
+
+        snapshot = demand.refresh(self.branch.id, until=day(7))
+        report = demand.report(snapshot)
+
+        self.assertEqual(snapshot.through, day(7))
+        self.assertEqual(report['heatmap'][0][10], 2)
+        self.assertEqual(report['heatmap'][2][12], 0)
+        self.assertEqual(report['days'][0], 2)
+
+        snapshot = demand.refresh(self.branch.id, until=day(7), full=True)
+
+        self.assertEqual(demand.report(snapshot)['heatmap'][2][12], 1)
+
+    def test_forecast_uses_promo_days(self):
+        """Test promo weekdays are forecast from past promo days."""
+        self.promo(1, day(4))
+        self.book(day(0), '10:00')
+        for _ in range(3):
+            self.book(day(7), '10:00')
+
+        snapshot = demand.refresh(self.branch.id, until=day(13))
+        forecast = demand.report(snapshot, start=day(14))['forecast']
+
+        self.assertEqual(len(forecast), 14)
+        self.assertEqual(forecast[0]['date'], day(14))
+        self.assertTrue(forecast[0]['promo'])
+        self.assertEqual(forecast[0]['bookings'][10], 3)
+        self.assertEqual(forecast[0]['staff'][10], 3)
+        self.assertFalse(forecast[1]['promo'])
+        self.assertEqual(forecast[1]['bookings'][10], 0)
+
+    def test_forecast_new_promo_weekday(self):
+        """Test a weekday never on promo before gets the promo lift."""
+        self.promo(1, day(4))
+        self.book(day(2), '09:00')
+        for _ in range(3):
+            self.book(day(7), '10:00')
+
+        snapshot = demand.refresh(self.branch.id, until=day(13))
+        self.promo(3, day(14))
+        wednesday = demand.report(snapshot, start=day(16))['forecast'][0]
+
+        self.assertTrue(wednesday['promo'])
+        self.assertGreater(wednesday['bookings'][9], 0.5)
+
+    def test_refresh_demand_command(self):
+        """Test the command refreshes every branch with appointments."""
+        Branch.objects.create(name='Empty')
+        self.book(day(0), '10:00')
+
+        out = StringIO()
+        call_command('refresh_demand', until=day(6).isoformat(), stdout=out)
+
+        self.assertIn('Refreshed demand of 1 branches.', out.getvalue())
+        self.assertEqual(
+            DemandSnapshot.objects.get().through, day(6),
+        )
+
+
+class DemandApiTests(TestCase):
+    """Test the branch demand endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+        self.branch = Branch.objects.create(name='Centro')
+
+    def test_demand_of_branch(self):
+        """Test the heatmap is built on first read, then served."""
+        Appointment.objects.create(
+            date=MONDAY,
+            time='10:00',
+            branch=self.branch,
+            client=Client.objects.create(
+                name='John',
+                last_name='Doe',
+                phone='1234567890',
+                email='john.doe@example.com',
+                birthday='1990-01-01',
+            ),
+            service=Service.objects.create(name='Haircut', price='10'),
+            technician=Technician.objects.get(user=self.user),
+        )
+
+        res = self.client.get(demand_url(self.branch.id), {'weeks': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['heatmap'][0][10], 1)
+        self.assertEqual(len(res.data['forecast']), 7)
+        self.assertTrue(DemandSnapshot.objects.exists())
+
+    def test_branch_without_appointments(self):
+        """Test a branch with no history returns 404."""
+        res = self.client.get(demand_url(self.branch.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_weeks(self):
+        """Test the forecast horizon is bounded."""
+        res = self.client.get(demand_url(self.branch.id), {'weeks': 52})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
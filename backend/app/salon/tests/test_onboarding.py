@@ -0,0 +1,125 @@
+"""
+Tests for onboarding technicians in bulk.
+"""
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Branch, Skill, Technician
+from salon import staff_index
+
+
+ONBOARD_URL = reverse('salon:technician-onboard')
+
+
+class OnboardingTests(TestCase):
+    """Test the onboarding endpoint and command."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.color = Skill.objects.create(name='Color')
+        self.nails = Skill.objects.create(name='Nails')
+        staff_index.invalidate()
+
+    def technicians(self, count):
+        return [
+            {
+                'email': f'tech{number}@EXAMPLE.com',
+                'name': f'Tech {number}',
+                'password': 'secret123',
+                'skills': [self.color.id, self.nails.id][:number % 3],
+                'branches': [self.branch.id],
+            }
+            for number in range(count)
+        ]
+
+    def test_onboard_technicians(self):
+        """Test technicians, users and links are created together."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                ONBOARD_URL, {'technicians': self.technicians(3)},
+                format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(
+            [len(row['skills']) for row in res.data], [0, 1, 2],
+        )
+        technician = Technician.objects.get(user__email='tech2@example.com')
+        self.assertTrue(technician.user.is_staff)
+        self.assertTrue(technician.user.check_password('secret123'))
+        self.assertEqual(list(technician.branches.all()), [self.branch])
+        self.assertEqual(
+            staff_index.lookup(self.branch.id, [self.nails.id]),
+            [technician.id],
+        )
+
+    def test_queries_do_not_grow(self):
+        """Test the number of queries doesn't depend on the batch size."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                ONBOARD_URL, {'technicians': self.technicians(10)},
+                format='json',
+            )
+
+        self.assertEqual(Technician.objects.count(), 11)
+        self.assertLess(len(queries), 20)
+
+    def test_invalid_batch_creates_nothing(self):
+        """Test taken emails and unknown skills reject the whole batch."""
+        for change in [
+            {'email': 'user@example.com'},
+            {'email': 'tech1@example.com'},
+            {'skills': [0]},
+        ]:
+            technicians = self.technicians(2)
+            technicians[0].update(change)
+
+            res = self.client.post(
+                ONBOARD_URL, {'technicians': technicians}, format='json',
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Technician.objects.count(), 1)
+
+    def test_onboard_technicians_command(self):
+        """Test the command creates the technicians in a CSV file."""
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(
+                'email,name,password,skills\n'
+                f'ana@example.com,Ana,secret123,{self.color.id};'
+                f'{self.nails.id}\n'
+                'bea@example.com,Bea,secret123,\n'
+            )
+        self.addCleanup(os.remove, path)
+
+        out = StringIO()
+        call_command('onboard_technicians', path, branch=[self.branch.id],
+                     stdout=out)
+
+        self.assertIn('2 technicians created', out.getvalue())
+        ana = Technician.objects.get(user__email='ana@example.com')
+        self.assertEqual(ana.skills.count(), 2)
+        self.assertEqual(list(ana.branches.all()), [self.branch])
+
+        with self.assertRaises(CommandError):
+            call_command('onboard_technicians', path, stdout=out)
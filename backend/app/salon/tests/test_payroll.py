@@ -0,0 +1,216 @@
+"""
+Tests for payroll runs.
+"""
+import datetime
+import os
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs, processes
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    PayrollRun,
+    Service,
+    Technician,
+)
+from salon import payroll
+
+
+PAYROLL_URL = reverse('salon:payrollrun-list')
+
+START = datetime.date(2024, 5, 1)
+END = datetime.date(2024, 5, 31)
+
+
+def detail_url(run_id):
+    """Create and return a payroll run detail URL."""
+    return reverse('salon:payrollrun-detail', args=[run_id])
+
+
+def create_technician(email):
+    """Create and return a technician."""
+    user = get_user_model().objects.create_user(
+        email=email, password='test123', name=email.split('@')[0],
+    )
+    return Technician.objects.get(user=user)
+
+
+def create_appointments():
+    """Create appointments of two branches in and around the period."""
+    branches = [
+        Branch.objects.create(name='Centro'),
+        Branch.objects.create(name='Norte'),
+    ]
+    technicians = [
+        create_technician('ana@example.com'),
+        create_technician('bea@example.com'),
+    ]
+    client = Client.objects.create(
+        name='John',
+        last_name='Doe',
+        phone='1234567890',
+        email='john.doe@example.com',
+        birthday='1990-01-01',
+    )
+    service = Service.objects.create(name='Haircut', price='100.00')
+    amounts = ['0.10', '0.20', '19.99', '250.05', '1.01']
+    for day, amount in enumerate(amounts * 3, start=1):
+        Appointment.objects.create(
+            date=datetime.date(2024, 5, day),
+            time='10:00:00',
+            branch=branches[day % 2],
+            technician=technicians[day % 3 % 2],
+            client=client,
+            service=service,
+            final_income=amount,
+            commission=Decimal(amount) / 10,
+            tip='0.33',
+            courtesy='0.01',
+        )
+    # Outside the period.
+    Appointment.objects.create(
+        date=datetime.date(2024, 6, 1),
+        time='10:00:00',
+        branch=branches[0],
+        technician=technicians[0],
+        client=client,
+        service=service,
+        final_income='999.99',
+    )
+    return branches, technicians
+
+
+class PayrollTests(TestCase):
+    """Test computing payroll."""
+
+    def setUp(self):
+        self.branches, self.technicians = create_appointments()
+
+    def test_totals_match_orm_aggregation(self):
+        """Test the stored lines equal a plain ORM aggregation."""
+        run = payroll.run_payroll(START, END, workers=1)
+
+        self.assertEqual(
+            payroll.line_totals(run), payroll.reference_totals(START, END),
+        )
+        self.assertEqual(run.appointment_count, 15)
+        self.assertEqual(run.gross, Decimal('814.05'))
+        self.assertEqual(run.tip, Decimal('4.95'))
+
+    @patch('salon.payroll.CHUNK_SIZE', 2)
+    def test_chunked_totals(self):
+        """Test totals don't depend on how rows are chunked."""
+        run = payroll.run_payroll(START, END, workers=1)
+
+        self.assertEqual(
+            payroll.line_totals(run), payroll.reference_totals(START, END),
+        )
+
+    def test_runs_are_immutable(self):
+        """Test stored payroll can't be edited or deleted."""
+        run = payroll.run_payroll(START, END, workers=1)
+        line = run.lines.first()
+
+        line.gross = Decimal('0.00')
+        with self.assertRaises(ValueError):
+            line.save()
+        with self.assertRaises(ValueError):
+            run.delete()
+
+    def test_lines_keep_names(self):
+        """Test lines record the branch and technician names."""
+        run = payroll.run_payroll(START, END, workers=1)
+
+        self.assertEqual(
+            sorted({line.technician_name for line in run.lines.all()}),
+            ['ana', 'bea'],
+        )
+
+    def test_command(self):
+        """Test the command computes and verifies a month."""
+        out = StringIO()
+
+        call_command(
+            'run_payroll', month='2024-05', workers=1, verify=True,
+            stdout=out,
+        )
+
+        self.assertIn('Totals match', out.getvalue())
+        run = PayrollRun.objects.get()
+        self.assertEqual((run.period_start, run.period_end), (START, END))
+
+
+class PayrollApiTests(TestCase):
+    """Test the payroll API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_queues_job(self):
+        """Test requesting payroll queues a job that stores a run."""
+        res = self.client.post(PAYROLL_URL, {
+            'period_start': '2024-05-01',
+            'period_end': '2024-05-31',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        jobs.run_pending()
+        run = PayrollRun.objects.get()
+        self.assertEqual(run.created_by, self.user)
+
+        res = self.client.get(detail_url(run.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['lines'], [])
+
+    def test_invalid_period(self):
+        """Test a period ending before it starts is rejected."""
+        res = self.client.post(PAYROLL_URL, {
+            'period_start': '2024-05-31',
+            'period_end': '2024-05-01',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Worker processes need a database they can connect to.')
+class PayrollProcessTests(TransactionTestCase):
+    """Test computing payroll in worker processes."""
+
+    def test_workers_match_orm_aggregation(self):
+        """Test branches computed in spawned workers add up the same."""
+        create_appointments()
+        # Spawned workers read their settings from the environment, so
+        # point them at the test database.
+        environ = {'DB_NAME': connection.settings_dict['NAME']}
+
+        with patch.dict(os.environ, environ), \
+                patch('core.processes.starmap',
+                      wraps=processes.starmap) as starmap:
+            run = payroll.run_payroll(START, END, workers=2)
+
+        self.assertEqual(starmap.call_args.args[2], 2)
+        self.assertEqual(
+            payroll.line_totals(run), payroll.reference_totals(START, END),
+        )
+        self.assertEqual(run.appointment_count, 15)
+        self.assertEqual(run.gross, Decimal('814.05'))
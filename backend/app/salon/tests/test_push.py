@@ -0,0 +1,163 @@
+"""
+Tests for live appointment push.
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Service,
+    Technician,
+)
+from salon import push, streams
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class BrokerTests(TestCase):
+    """Test the in-process broker."""
+
+    def test_publish_from_other_thread(self):
+        """Test events published from a worker thread reach subscribers."""
+        broker = push.InProcessBroker()
+
+        async def scenario():
+            sub = await broker.subscribe(['branch:1'])
+            other = await broker.subscribe(['branch:2'])
+            thread = threading.Thread(
+                target=broker.publish, args=('branch:1', 'hello'),
+            )
+            thread.start()
+            thread.join()
+            message = await asyncio.wait_for(sub.get(), 1)
+            return message, other.queue.empty()
+
+        message, other_empty = async_to_sync(scenario)()
+
+        self.assertEqual(message, 'hello')
+        self.assertTrue(other_empty)
+
+
+class AppointmentPushTests(TestCase):
+    """Test appointment writes are pushed to subscribers."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.technician = Technician.objects.get(user=self.user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.token = Token.objects.create(user=self.user)
+
+    def create_appointment(self):
+        return Appointment.objects.create(
+            date='2024-05-01',
+            time='10:00:00',
+            branch=self.branch,
+            technician=self.technician,
+            client=Client.objects.create(
+                name='John',
+                last_name='Doe',
+                phone='1234567890',
+                email='john.doe@example.com',
+                birthday='1990-01-01',
+                comments='',
+            ),
+            service=Service.objects.create(name='Haircut', price='100.00'),
+        )
+
+    def test_messages_for_created_appointment(self):
+        """Test a new appointment is announced to branch and technician."""
+        appointment = self.create_appointment()
+
+        messages = push.appointment_messages('create', appointment)
+
+        channels = [channel for channel, _ in messages]
+        self.assertEqual(channels, [
+            f'branch:{self.branch.id}',
+            f'technician:{self.technician.id}',
+        ])
+        event = json.loads(messages[0][1])
+        self.assertEqual(event['op'], 'create')
+        self.assertEqual(event['id'], appointment.id)
+
+    def test_moved_appointment_deleted_from_old_branch(self):
+        """Test moving an appointment notifies the branch it left."""
+        appointment = self.create_appointment()
+        old = (self.branch.id, appointment.date, self.technician.id)
+        appointment.branch = Branch.objects.create(name='Norte')
+
+        messages = push.appointment_messages('update', appointment, old)
+
+        self.assertIn(f'branch:{self.branch.id}', dict(messages))
+        event = json.loads(dict(messages)[f'branch:{self.branch.id}'])
+        self.assertEqual(event['op'], 'delete')
+
+    def run_stream(self, query_string, on_started):
+        """Run the SSE endpoint, returning the messages sent to the client."""
+        sent = []
+
+        async def scenario():
+            started = asyncio.Event()
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message['type'] == 'http.response.start':
+                    started.set()
+                elif message.get('more_body'):
+                    disconnect.set()
+
+            scope = {
+                'type': 'http',
+                'path': streams.STREAM_PATH,
+                'query_string': query_string.encode(),
+                'headers': [],
+            }
+            task = asyncio.ensure_future(
+                streams.application(scope, receive, send)
+            )
+            await asyncio.wait_for(started.wait(), 1)
+            await on_started()
+            await asyncio.wait_for(task, 1)
+
+        async_to_sync(scenario)()
+        return sent
+
+    def test_stream_requires_token(self):
+        """Test the stream rejects unauthenticated clients."""
+        async def noop():
+            pass
+
+        sent = self.run_stream(f'branch={self.branch.id}', noop)
+
+        self.assertEqual(sent[0]['status'], 401)
+
+    def test_stream_delivers_events(self):
+        """Test a subscribed client receives published events."""
+        async def publish():
+            push.get_broker().publish(
+                push.branch_channel(self.branch.id), '{"op":"create"}',
+            )
+
+        sent = self.run_stream(
+            f'branch={self.branch.id}&token={self.token.key}', publish,
+        )
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[1]['body'], b'data: {"op":"create"}\n\n')
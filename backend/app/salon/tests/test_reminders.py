@@ -0,0 +1,200 @@
+"""
+Tests for appointment reminders.
+"""
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import (
+    Appointment,
+    Branch,
+    Client,
+    Reminder,
+    Service,
+    Technician,
+)
+from salon import reminders
+
+
+DAY = datetime.date(2024, 5, 6)
+LOCMEM = {
+    'email': 'salon.reminders.LocmemBackend',
+    'sms': 'salon.reminders.LocmemBackend',
+}
+
+
+class FailingBackend:
+    """Backend that can't reach its provider."""
+
+    def send(self, message):
+        raise ConnectionError('provider down')
+
+
+@override_settings(SALON_REMINDER_BACKENDS=LOCMEM)
+class ReminderTests(TestCase):
+    """Test dispatching reminders."""
+
+    def setUp(self):
+        reminders.LocmemBackend.outbox.clear()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.technician = Technician.objects.get(user=user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.service = Service.objects.create(name='Corte', price='10')
+        self.client_obj = Client.objects.create(
+            name='John',
+            last_name='Doe',
+            phone='1234567890',
+            email='john.doe@example.com',
+            birthday='1990-01-01',
+        )
+
+    def book(self, date=DAY, client=None, time='10:00'):
+        return Appointment.objects.create(
+            date=date,
+            time=time,
+            branch=self.branch,
+            client=client or self.client_obj,
+            service=self.service,
+            technician=self.technician,
+        )
+
+    def test_dispatch_reminders(self):
+        """Test each appointment is reminded once per channel, in chunks."""
+        for _ in range(5):
+            self.book()
+        self.book(date=DAY + datetime.timedelta(days=1))
+
+        totals = reminders.dispatch(DAY, chunk_size=2)
+
+        self.assertEqual(totals['appointments'], 5)
+        self.assertEqual(totals['sent'], 10)
+        outbox = reminders.LocmemBackend.outbox
+        self.assertEqual(
+            sorted({(m.channel, m.to) for m in outbox}),
+            [('email', 'john.doe@example.com'), ('sms', '1234567890')],
+        )
+        self.assertEqual(
+            outbox[0].body,
+            'Hola John, te recordamos tu cita de Corte el 06/05/2024 '
+            'a las 10:00 en Centro.',
+        )
+        self.assertEqual(
+            Reminder.objects.filter(status=Reminder.SENT).count(), 10,
+        )
+
+    def test_rerun_does_not_resend(self):
+        """Test running twice sends every reminder only once."""
+        self.book()
+        reminders.dispatch(DAY)
+
+        totals = reminders.dispatch(DAY)
+
+        self.assertEqual(totals['sent'], 0)
+        self.assertEqual(len(reminders.LocmemBackend.outbox), 2)
+
+    def test_interrupted_reminder_not_resent(self):
+        """Test a reminder that may have gone out is not sent again."""
+        appointment = self.book()
+        Reminder.objects.create(
+            appointment=appointment,
+            channel='email',
+            recipient='john.doe@example.com',
+            status=Reminder.SENDING,
+        )
+
+        reminders.dispatch(DAY)
+
+        self.assertEqual(
+            [m.channel for m in reminders.LocmemBackend.outbox], ['sms'],
+        )
+
+    def test_missing_contact_skipped(self):
+        """Test clients are only reminded on channels they can receive."""
+        client = Client.objects.create(
+            name='Jane',
+            last_name='Doe',
+            phone='5555555555',
+            email='',
+            birthday='1990-01-01',
+        )
+        self.book(client=client)
+
+        reminders.dispatch(DAY)
+
+        self.assertEqual(
+            [m.channel for m in reminders.LocmemBackend.outbox], ['sms'],
+        )
+
+    def test_failed_reminder_retried(self):
+        """Test failed reminders are retried until attempts run out."""
+        self.book()
+        failing = {'email': FailingBackend()}
+
+        totals = reminders.dispatch(DAY, backends=failing)
+
+        self.assertEqual(totals['failed'], 1)
+        reminder = Reminder.objects.get()
+        self.assertEqual(reminder.status, Reminder.FAILED)
+        self.assertIn('provider down', reminder.error)
+
+        with self.settings(SALON_REMINDER_MAX_ATTEMPTS=2):
+            reminders.dispatch(DAY, backends=failing)
+            totals = reminders.dispatch(
+                DAY, backends={'email': reminders.LocmemBackend()},
+            )
+
+        self.assertEqual(totals['sent'], 0)
+        self.assertEqual(Reminder.objects.get().attempts, 2)
+
+        reminders.dispatch(DAY)
+
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.status, Reminder.SENT)
+        self.assertEqual(reminder.error, '')
+
+    def test_queries_per_chunk(self):
+        """Test the number of queries doesn't grow with appointments."""
+        for hour in range(30):
+            self.book(time=f'{hour % 24:02}:00')
+
+        with CaptureQueriesContext(connection) as queries:
+            totals = reminders.dispatch(DAY)
+
+        self.assertEqual(totals['sent'], 60)
+        self.assertLess(len(queries), 15)
+
+    def test_file_backend(self):
+        """Test the file backend writes one JSON line per message."""
+        self.book()
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        reminders.dispatch(
+            DAY, backends={'sms': reminders.FileBackend(path)},
+        )
+
+        with open(path, encoding='utf-8') as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['to'], '1234567890')
+
+    def test_send_reminders_command(self):
+        """Test the command reports what it sent."""
+        self.book()
+
+        out = StringIO()
+        call_command('send_reminders', date=DAY.isoformat(), stdout=out)
+
+        self.assertIn('1 appointments: 2 reminders sent', out.getvalue())
@@ -0,0 +1,67 @@
+"""
+Tests for bulk service repricing.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job, Service
+
+
+REPRICE_URL = reverse('salon:service-reprice')
+
+
+class RepriceApiTests(TestCase):
+    """Test repricing services in the background."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+        self.haircut = Service.objects.create(name='Haircut', price='100.00')
+        self.nails = Service.objects.create(name='Nails', price='80.00')
+
+    def test_reprice_returns_job(self):
+        """Test the request is accepted and points at its job."""
+        res = self.client.post(REPRICE_URL, {'percent': '10'})
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job = Job.objects.get(id=res.data['id'])
+        self.assertEqual(job.created_by, self.user)
+        self.assertEqual(
+            res['Location'],
+            'http://testserver' + reverse('job-detail', args=[job.id]),
+        )
+        self.haircut.refresh_from_db()
+        self.assertEqual(self.haircut.price, Decimal('100.00'))
+
+    def test_reprice_selected_services(self):
+        """Test only the listed services change, once the job ran."""
+        self.client.post(
+            REPRICE_URL,
+            {'percent': '12.5', 'services': [self.nails.id]},
+            format='json',
+        )
+
+        jobs.run_pending()
+
+        self.haircut.refresh_from_db()
+        self.nails.refresh_from_db()
+        self.assertEqual(self.haircut.price, Decimal('100.00'))
+        self.assertEqual(self.nails.price, Decimal('90.00'))
+
+    def test_reprice_validates_percent(self):
+        """Test absurd price changes are rejected."""
+        res = self.client.post(REPRICE_URL, {'percent': '-100'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
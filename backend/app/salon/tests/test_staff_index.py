@@ -0,0 +1,138 @@
+"""
+Tests for the index of technicians by branch and skill.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Branch, Skill, Technician
+from salon import staff_index
+
+
+TECHNICIANS_URL = reverse('salon:technician-list')
+LOOKUP_URL = reverse('salon:technician-lookup')
+
+
+def create_technician(email, branches=(), skills=()):
+    """Create and return a technician."""
+    user = get_user_model().objects.create_user(
+        email=email, password='test123',
+    )
+    technician = Technician.objects.get(user=user)
+    technician.branches.set(branches)
+    technician.skills.set(skills)
+    return technician
+
+
+class StaffIndexTests(TestCase):
+    """Test looking technicians up by branch and skill."""
+
+    def setUp(self):
+        self.centro = Branch.objects.create(name='Centro')
+        self.norte = Branch.objects.create(name='Norte')
+        self.color = Skill.objects.create(name='Color')
+        self.nails = Skill.objects.create(name='Nails')
+        self.ana = create_technician(
+            'ana@example.com', [self.centro], [self.color, self.nails],
+        )
+        self.bea = create_technician(
+            'bea@example.com', [self.centro, self.norte], [self.color],
+        )
+        self.cleo = create_technician(
+            'cleo@example.com', [self.norte], [self.nails],
+        )
+        staff_index.invalidate()
+
+    def test_lookup(self):
+        """Test branches and skills intersect."""
+        self.assertEqual(
+            staff_index.lookup(self.centro.id, [self.color.id]),
+            [self.ana.id, self.bea.id],
+        )
+        self.assertEqual(
+            staff_index.lookup(skills=[self.color.id, self.nails.id]),
+            [self.ana.id],
+        )
+        self.assertEqual(
+            staff_index.lookup(self.norte.id),
+            [self.bea.id, self.cleo.id],
+        )
+        self.assertEqual(staff_index.lookup(self.norte.id, [0]), [])
+
+    def test_rebuilt_on_changes(self):
+        """Test the index follows skills, branches and technicians."""
+        staff_index.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cleo.skills.add(self.color)
+        self.assertEqual(
+            staff_index.lookup(self.norte.id, [self.color.id]),
+            [self.bea.id, self.cleo.id],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.centro.technician_set.clear()
+        self.assertEqual(staff_index.lookup(self.centro.id), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bea.delete()
+        self.assertEqual(staff_index.lookup(self.norte.id), [self.cleo.id])
+
+    def test_index_cached(self):
+        """Test lookups reuse the index until something changes."""
+        staff_index.stats.reset()
+
+        staff_index.lookup(self.centro.id)
+        with self.assertNumQueries(0):
+            staff_index.lookup(self.norte.id, [self.nails.id])
+
+        self.assertEqual(staff_index.stats.rebuilds, 1)
+        self.assertEqual(staff_index.stats.hits, 1)
+
+
+class StaffIndexApiTests(TestCase):
+    """Test filtering technicians through the API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(user)
+        self.branch = Branch.objects.create(name='Centro')
+        self.color = Skill.objects.create(name='Color')
+        self.nails = Skill.objects.create(name='Nails')
+        self.ana = create_technician(
+            'ana@example.com', [self.branch], [self.color, self.nails],
+        )
+        create_technician('bea@example.com', [self.branch], [self.color])
+        staff_index.invalidate()
+
+    def test_filter_technicians(self):
+        """Test listing the technicians at a branch with every skill."""
+        res = self.client.get(TECHNICIANS_URL, {
+            'branch': self.branch.id,
+            'skill': f'{self.color.id},{self.nails.id}',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in res.data], [self.ana.id])
+
+    def test_lookup_ids(self):
+        """Test the lookup endpoint answers without the database."""
+        staff_index.get_index()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(LOOKUP_URL, {'skill': self.nails.id})
+
+        self.assertEqual(res.data, {'technicians': [self.ana.id]})
+
+    def test_invalid_filters(self):
+        """Test ids must be numbers."""
+        res = self.client.get(TECHNICIANS_URL, {'skill': 'color'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
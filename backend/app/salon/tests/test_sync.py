@@ -0,0 +1,104 @@
+"""
+Tests for the delta sync API.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.deletion import Collector
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Branch, Job, Skill, Technician, Tombstone
+
+
+SYNC_URL = reverse('salon:sync')
+
+
+@override_settings(SALON_SYNC_OVERLAP_SECONDS=0)
+class PrivateSyncApiTests(TestCase):
+    """Test authenticated delta sync requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_full_sync(self):
+        """Test a sync without cursor returns every row."""
+        branch = Branch.objects.create(name='Centro')
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['changes']['branches'][0]['id'], branch.id)
+        self.assertEqual(len(res.data['changes']['technicians']), 1)
+        self.assertIn('cursor', res.data)
+
+    def test_delta_sync(self):
+        """Test a sync with cursor returns only later changes."""
+        branch = Branch.objects.create(name='Centro')
+        Branch.objects.create(name='Norte')
+        cursor = self.client.get(SYNC_URL).data['cursor']
+
+        branch.name = 'Centro Histórico'
+        branch.save()
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        self.assertEqual(
+            [row['name'] for row in res.data['changes']['branches']],
+            ['Centro Histórico'],
+        )
+        self.assertEqual(res.data['changes']['technicians'], [])
+
+    def test_deleted_rows_reported(self):
+        """Test deleted rows are reported from tombstones."""
+        branch = Branch.objects.create(name='Centro')
+        cursor = self.client.get(SYNC_URL).data['cursor']
+
+        branch_id = branch.id
+        branch.delete()
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        self.assertEqual(res.data['deleted']['branches'], [branch_id])
+
+    def test_technician_skill_change_synced(self):
+        """Test adding a skill marks the technician as changed."""
+        technician = Technician.objects.get(user=self.user)
+        skill = Skill.objects.create(name='Color')
+        cursor = self.client.get(SYNC_URL).data['cursor']
+
+        technician.skills.add(skill)
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        rows = res.data['changes']['technicians']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['skills'], [skill.id])
+
+    def test_technician_user_change_synced(self):
+        """Test renaming a technician's user marks the technician changed."""
+        cursor = self.client.get(SYNC_URL).data['cursor']
+
+        self.user.name = 'Ana'
+        self.user.save()
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        rows = res.data['changes']['technicians']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['user__name'], 'Ana')
+
+    def test_other_models_fast_deleted(self):
+        """Test deleting rows that aren't synced needs no tombstones."""
+        collector = Collector(using='default')
+
+        self.assertTrue(collector.can_fast_delete(Tombstone.objects.all()))
+        self.assertTrue(collector.can_fast_delete(Job.objects.all()))
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor is rejected."""
+        res = self.client.get(SYNC_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -8,7 +8,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from salon import views
+from salon import async_views, views
 
 
 router = DefaultRouter()
@@ -21,9 +21,19 @@ router.register('promos', views.PromoViewSet)
 router.register('clients', views.ClientViewSet)
 router.register('appointments', views.AppointmentViewSet)
 router.register('technicians', views.TechnicianViewSet)
+router.register('payroll', views.PayrollRunViewSet)
 
 app_name = 'salon'
 
 urlpatterns = [
+    path('async/agenda/', async_views.agenda_view, name='async-agenda'),
+    path(
+        'async/<str:name>/',
+        async_views.catalog_view,
+        name='async-catalog',
+    ),
+    path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
     path('', include(router.urls)),
 ]
@@ -1,38 +1,86 @@
 """
 Views for the branch APIs
 """
-from rest_framework import viewsets
+import datetime
+
+from django.http import HttpResponse
+
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
 
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import (
+    PayrollRun,
     Branch,
+    DemandSnapshot,
     Skill,
     Service,
     Payment,
     Discount,
     Promo,
     Client,
+    ClientUpload,
     Appointment,
     Technician
 )
-from salon import serializers
+from core import jobs
+from core.budgets import TimeBudgetMixin
+from core.single_flight import shared, single_flight
+from core.views import job_accepted
+from salon import (
+    agenda,
+    analytics,
+    assignment,
+    bootstrap,
+    demand,
+    onboarding,
+    serializers,
+    staff_index,
+    sync,
+)
 
 
-class BranchViewSet(viewsets.ModelViewSet):
+class BranchViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage branch APIs."""
     serializer_class = serializers.BranchSerializer
     queryset = Branch.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    time_budgets = {'demand': 30}
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
         return [int(str_id) for str_id in qs.split(',')]
 
+    @action(detail=True, methods=['get'])
+    @single_flight(scope=shared)
+    def demand(self, request, pk=None):
+        """Return the booking heatmap and staffing forecast of a branch."""
+        branch = self.get_object()
+        try:
+            service = request.query_params.get('service')
+            service = int(service) if service else None
+            weeks = int(request.query_params.get('weeks', 2))
+        except ValueError:
+            raise ValidationError('service and weeks must be integers.')
+        if not 1 <= weeks <= 8:
+            raise ValidationError('weeks must be between 1 and 8.')
+        snapshot = DemandSnapshot.objects.filter(branch=branch).first()
+        if snapshot is None:
+            # Normally built by the nightly refresh_demand run.
+            snapshot = demand.refresh(branch.id)
+        if snapshot is None:
+            raise NotFound('The branch has no appointments yet.')
+        return Response(demand.report(snapshot, service, weeks))
 
-class SkillViewSet(viewsets.ModelViewSet):
+
+class SkillViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage skill APIs."""
     serializer_class = serializers.SkillSerializer
     queryset = Skill.objects.all()
@@ -40,15 +88,32 @@ class SkillViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage service APIs"""
     serializer_class = serializers.ServiceSerializer
     queryset = Service.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @action(detail=False, methods=['post'],
+            serializer_class=serializers.RepriceSerializer)
+    def reprice(self, request):
+        """Queue a price change of services and return the job."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = {'percent': str(serializer.validated_data['percent'])}
+        if 'services' in serializer.validated_data:
+            payload['services'] = [
+                service.id
+                for service in serializer.validated_data['services']
+            ]
+        job = jobs.enqueue(
+            'salon.reprice_services', payload, user=request.user,
+        )
+        return job_accepted(request, job)
+
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage payment APIs"""
     serializer_class = serializers.PaymentSerializer
     queryset = Payment.objects.all()
@@ -56,7 +121,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class DiscountViewSet(viewsets.ModelViewSet):
+class DiscountViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage discount APIs"""
     serializer_class = serializers.DiscountSerializer
     queryset = Discount.objects.all()
@@ -64,7 +129,7 @@ class DiscountViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class PromoViewSet(viewsets.ModelViewSet):
+class PromoViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage promo APIs"""
     serializer_class = serializers.PromoSerializer
     queryset = Promo.objects.all()
@@ -72,25 +137,272 @@ class PromoViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage client APIs"""
     serializer_class = serializers.ClientSerializer
     queryset = Client.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        """Filter clients by inactivity and fetch their stats."""
+        queryset = self.queryset.select_related('stats')
+        inactive_days = self.request.query_params.get('inactive_days')
+        if inactive_days:
+            try:
+                inactive_days = int(inactive_days)
+            except ValueError:
+                raise ValidationError('inactive_days must be an integer.')
+            # Clients who visited, but not in the last inactive_days days.
+            queryset = queryset.filter(
+                stats__last_visit__lt=datetime.date.today() -
+                datetime.timedelta(days=inactive_days),
+            )
+        return queryset
 
-class TechnicianViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='import',
+            serializer_class=serializers.ClientImportSerializer,
+            parser_classes=[MultiPartParser])
+    def import_clients(self, request):
+        """Queue the import of a CSV or Excel file of clients."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        upload = ClientUpload.objects.create(
+            filename=upload.name,
+            data=upload.read(),
+            created_by=request.user,
+        )
+        job = jobs.enqueue(
+            'salon.import_clients', {'upload_id': upload.id},
+            user=request.user,
+        )
+        return job_accepted(request, job)
+
+
+class TechnicianViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage technician APIs"""
     serializer_class = serializers.TechnicianSerializer
     queryset = Technician.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def _staff_filters(self):
+        """Return the branch and skills asked for, or None if neither."""
+        branch = self.request.query_params.get('branch')
+        skills = self.request.query_params.get('skill')
+        if branch is None and skills is None:
+            return None
+        try:
+            return (
+                int(branch) if branch is not None else None,
+                [int(skill) for skill in skills.split(',')] if skills else [],
+            )
+        except ValueError:
+            raise ValidationError(
+                'branch must be an id and skill a comma-separated list '
+                'of ids.'
+            )
+
+    def get_queryset(self):
+        """Filter technicians by branch and skills through the index."""
+        queryset = self.queryset.select_related('user').prefetch_related(
+            'skills', 'branches',
+        )
+        filters = self._staff_filters()
+        if self.action == 'list' and filters is not None:
+            queryset = queryset.filter(id__in=staff_index.lookup(*filters))
+        return queryset.order_by('id')
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """Return the ids of the technicians at a branch with skills."""
+        branch, skills = self._staff_filters() or (None, [])
+        return Response({
+            'technicians': staff_index.lookup(branch, skills),
+        })
+
+    @action(detail=False, methods=['post'],
+            serializer_class=serializers.OnboardingSerializer)
+    def onboard(self, request):
+        """Create a batch of technicians with their skills and branches."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = onboarding.onboard(serializer.validated_data['technicians'])
+        technicians = self.get_queryset().filter(id__in=ids)
+        return Response(
+            serializers.TechnicianSerializer(technicians, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+
+class AppointmentViewSet(TimeBudgetMixin, viewsets.ModelViewSet):
     """View for manage appointment APIs"""
     serializer_class = serializers.AppointmentSerializer
     queryset = Appointment.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    time_budgets = {'agenda': 2, 'agenda_stats': 30}
+
+    def _agenda_params(self):
+        """Return the branch id and date requested for an agenda."""
+        branch = self.request.query_params.get('branch', '')
+        date = self.request.query_params.get('date', '')
+        try:
+            return int(branch), datetime.date.fromisoformat(date)
+        except ValueError:
+            raise ValidationError(
+                'Both branch (id) and date (YYYY-MM-DD) are required.'
+            )
+
+    @action(detail=False, methods=['get'])
+    @single_flight(scope=shared)
+    def agenda(self, request):
+        """Return every appointment of a branch for one day."""
+        branch_id, date = self._agenda_params()
+        return HttpResponse(
+            agenda.get_agenda(branch_id, date),
+            content_type='application/json',
+        )
+
+    @action(detail=False, methods=['get'], url_path='agenda/stats')
+    def agenda_stats(self, request):
+        """Return the agenda cache counters of this worker."""
+        return Response(agenda.stats.as_dict())
+
+    @action(detail=False, methods=['post'],
+            serializer_class=serializers.AssignmentSerializer)
+    def assign(self, request):
+        """Propose a technician and time for each requested booking."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = assignment.assign(
+            serializer.validated_data['date'],
+            serializer.validated_data['requests'],
+        )
+        assigned = [result for result in results if result is not None]
+        return Response({
+            'assigned': len(assigned),
+            'unassigned': len(results) - len(assigned),
+            'assignments': [
+                result or {'technician': None, 'time': None}
+                for result in results
+            ],
+        })
+
+
+class PayrollRunViewSet(TimeBudgetMixin,
+                        mixins.ListModelMixin,
+                        mixins.RetrieveModelMixin,
+                        viewsets.GenericViewSet):
+    """View for payroll runs; creating one queues a background job."""
+    serializer_class = serializers.PayrollRunDetailSerializer
+    queryset = PayrollRun.objects.all()
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Fetch the lines along with a run."""
+        if self.action == 'retrieve':
+            return self.queryset.prefetch_related('lines')
+        return self.queryset
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'list':
+            return serializers.PayrollRunSerializer
+        if self.action == 'create':
+            return serializers.PayrollRequestSerializer
+        return self.serializer_class
+
+    def create(self, request):
+        """Queue a payroll run for a period and return the job."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = jobs.enqueue('salon.run_payroll', {
+            'period_start': serializer.validated_data[
+                'period_start'].isoformat(),
+            'period_end': serializer.validated_data[
+                'period_end'].isoformat(),
+            'user_id': request.user.id,
+        }, user=request.user)
+        return job_accepted(request, job)
+
+
+class SyncView(TimeBudgetMixin, APIView):
+    """View for delta sync of every salon resource."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the rows changed and deleted since the given cursor."""
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = sync.parse_cursor(since)
+            except sync.InvalidCursor:
+                raise ValidationError({'since': 'Invalid sync cursor.'})
+        return Response(sync.changes_since(since or None))
+
+
+class BootstrapView(TimeBudgetMixin, APIView):
+    """View for the bundle of every reference catalog."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return every catalog, or 304 if the client's copy is current."""
+        content, etag = bootstrap.get_bundle()
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class AnalyticsView(TimeBudgetMixin, APIView):
+    """View for group-by queries over the analytics snapshot."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    time_budget = 30
+
+    def _list(self, name):
+        value = self.request.query_params.get(name, '')
+        return [item for item in value.split(',') if item]
+
+    @single_flight(scope=shared)
+    def get(self, request):
+        """Return the metrics of the filtered appointments, by group."""
+        params = request.query_params
+        filters = {}
+        try:
+            for name in analytics.FILTERS:
+                if name not in params:
+                    continue
+                if name == 'warranty':
+                    filters[name] = params[name].lower() in ('1', 'true')
+                else:
+                    filters[name] = [int(item) for item in self._list(name)]
+            date_from = params.get('date_from')
+            date_to = params.get('date_to')
+            snapshot = analytics.current()
+            rows = analytics.query(
+                group_by=self._list('group_by'),
+                metrics=self._list('metrics') or ['count'],
+                date_from=datetime.date.fromisoformat(date_from)
+                if date_from else None,
+                date_to=datetime.date.fromisoformat(date_to)
+                if date_to else None,
+                snapshot=snapshot,
+                **filters,
+            )
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+        except analytics.NoSnapshot as exc:
+            raise NotFound(str(exc))
+        return Response({
+            'snapshot': snapshot.name,
+            'created_at': snapshot.created_at,
+            'rows': rows,
+        })
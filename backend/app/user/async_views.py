@@ -0,0 +1,11 @@
+"""
+Async read endpoints for the user API, for use under ASGI.
+"""
+from core.async_api import async_api_view, json_response
+from user.serializers import UserSerializer
+
+
+@async_api_view()
+async def me_view(request):
+    """Return the authenticated user."""
+    return json_response(UserSerializer(request.user).data)
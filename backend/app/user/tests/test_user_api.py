@@ -5,6 +5,7 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
@@ -12,6 +13,7 @@ from rest_framework import status
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
+ASYNC_ME_URL = reverse('user:async-me')
 
 
 def create_user(**params):
@@ -155,3 +157,17 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_profile_async(self):
+        """Test retrieving profile from the async endpoint."""
+        token = Token.objects.create(user=self.user)
+
+        res = self.client.get(
+            ASYNC_ME_URL, HTTP_AUTHORIZATION=f'Token {token.key}',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            'name': self.user.name,
+            'email': self.user.email,
+        })